@@ -0,0 +1,151 @@
+"""
+Benchmarks of the collection APIs against vcsim topologies of several sizes
+
+    pytest benchmarks --no-cov --mce-bench-sizes=1k,10k
+    pytest benchmarks --no-cov --mce-bench-sizes=1k --mce-bench-save   # update baselines.json
+
+A result fail if its SOAP call count is above the baseline or if its SOAP
+bytes are above baseline * --mce-bench-bytes-tolerance. Wall times depend
+on the machine: they are only checked with --mce-bench-tolerance, against
+baselines measured on the same machine. Results without baseline are only
+recorded. The vcsim benchmarks are skipped if vcsim is not installed.
+"""
+
+import json
+import os
+import resource
+import shutil
+import time
+
+import pytest
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.pytest.plugin import LOCAL_VCSIM
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+pytest_plugins = ['mce_lib_vsphere.pytest.plugin']
+
+HERE = os.path.dirname(__file__)
+BASELINES_PATH = os.path.join(HERE, "baselines.json")
+
+# vcsim create "vms" VMs in each resource pool and vApp: without child pools
+# and vApps, in the pool of the standalone host and in the root pool of each
+# cluster of a datacenter - VMs = datacenters * (1 + clusters) * vms
+# (hosts: by cluster, they don't change the VM count)
+SIZES = {
+    "100": dict(datacenters=1, clusters=1, hosts=4, vms=50, pools=0, vapps=0),
+    "1k": dict(datacenters=2, clusters=4, hosts=4, vms=100, pools=0, vapps=0),
+    "10k": dict(datacenters=4, clusters=4, hosts=8, vms=500, pools=0, vapps=0),
+    "50k": dict(datacenters=5, clusters=9, hosts=20, vms=1000, pools=0, vapps=0),
+}
+
+# Same sizes as synthetic inventories (no vcsim needed)
+SYNTHETIC_SIZES = {
+    "100": dict(vms=100),
+    "1k": dict(vms=1000, folder_depth=2),
+    "10k": dict(vms=10000, folder_depth=3, nics_per_vm=(1, 3), custom_fields=5),
+    "50k": dict(vms=50000, folder_depth=4, nics_per_vm=(1, 4), custom_fields=10),
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("mce-bench")
+    group.addoption("--mce-bench-sizes", default="1k", help="comma separated topology sizes: " + ",".join(SIZES))
+    group.addoption(
+        "--mce-bench-tolerance", type=float, default=None,
+        help="allowed wall time ratio (default: wall time not checked)",
+    )
+    group.addoption("--mce-bench-bytes-tolerance", type=float, default=1.1, help="allowed SOAP bytes ratio")
+    group.addoption("--mce-bench-save", action="store_true", help="write results to baselines.json")
+
+
+def pytest_generate_tests(metafunc):
+    if "bench_size" in metafunc.fixturenames:
+        sizes = metafunc.config.getoption("--mce-bench-sizes").split(",")
+        metafunc.parametrize("bench_size", sizes, scope="session")
+
+
+def pytest_configure(config):
+    config._mce_bench_results = {}
+
+
+def pytest_sessionfinish(session):
+    results = session.config._mce_bench_results
+    if not results:
+        return
+    print("\n" + json.dumps(results, indent=2, sort_keys=True))
+    if session.config.getoption("--mce-bench-save"):
+        baselines = load_baselines()
+        for size, apis in results.items():
+            baselines.setdefault(size, {}).update(apis)
+        with open(BASELINES_PATH, "w") as fp:
+            json.dump(baselines, fp, indent=2, sort_keys=True)
+            fp.write("\n")
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as fp:
+        return json.load(fp)
+
+
+@pytest.fixture(scope="session")
+def bench_server(request, bench_size):
+    if not shutil.which("vcsim") and not os.path.exists(LOCAL_VCSIM):
+        pytest.skip("vcsim is not installed")
+    return request.getfixturevalue("vcsim_factory")(start_timeout=300, **SIZES[bench_size])
+
+
+@pytest.fixture
+def bench_client(bench_server):
+    with core.Client(host=bench_server) as client:
+        client.connect()
+        yield client
+
+
+@pytest.fixture(scope="session")
+def synthetic_generator(bench_size):
+    return InventoryGenerator(**SYNTHETIC_SIZES[bench_size])
+
+
+@pytest.fixture
+def measure(request, bench_size):
+    """Run func with metrics and check the result against the baseline"""
+
+    def _measure(name, client, func):
+        registry = client.enable_metrics()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        func()
+        wall = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        client.disable_metrics()
+
+        operations = registry.to_dict()["operations"]
+        result = {
+            "wall": round(wall, 4),
+            "soap_calls": sum(op["count"] for op in operations.values()),
+            "request_bytes": sum(op["request_bytes"] for op in operations.values()),
+            "response_bytes": sum(op["response_bytes"] for op in operations.values()),
+            # ru_maxrss is in KB on Linux and only grows: growth of the process peak
+            "peak_rss_kb": rss_after,
+            "peak_rss_growth_kb": rss_after - rss_before,
+        }
+        request.config._mce_bench_results.setdefault(bench_size, {})[name] = result
+
+        baseline = load_baselines().get(bench_size, {}).get(name)
+        if baseline and not request.config.getoption("--mce-bench-save"):
+            assert result["soap_calls"] <= baseline["soap_calls"], \
+                f"{name}: {result['soap_calls']} SOAP calls > baseline {baseline['soap_calls']}"
+            bytes_tolerance = request.config.getoption("--mce-bench-bytes-tolerance")
+            for key in ("request_bytes", "response_bytes"):
+                assert result[key] <= baseline[key] * bytes_tolerance, \
+                    f"{name}: {result[key]} {key} > baseline {baseline[key]} * {bytes_tolerance}"
+            tolerance = request.config.getoption("--mce-bench-tolerance")
+            if tolerance is not None:
+                assert result["wall"] <= baseline["wall"] * tolerance, \
+                    f"{name}: {result['wall']}s > baseline {baseline['wall']}s * {tolerance}"
+        return result
+
+    return _measure
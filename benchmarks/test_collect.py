@@ -0,0 +1,27 @@
+from pyVmomi import vim
+
+
+def test_get_all_vms(bench_client, measure):
+    measure("get_all_vms", bench_client, bench_client.get_all_vms)
+
+
+def test_get_vm_infos(bench_client, measure):
+    vms = bench_client.get_all_vms()
+    measure("get_vm_infos", bench_client, lambda: [bench_client.get_vm_infos(vm) for vm in vms])
+
+
+def test_resource_id(bench_client, measure):
+    vms = bench_client.get_all_vms()
+    measure("resource_id", bench_client, lambda: [bench_client.resource_id(vm) for vm in vms])
+
+
+def test_collect_properties(bench_client, measure):
+    paths = ["name", "config", "guest", "summary"]
+    measure(
+        "collect_properties", bench_client,
+        lambda: list(bench_client.collect_properties([vim.VirtualMachine], paths))
+    )
+
+
+def test_build_topology(bench_client, measure):
+    measure("build_topology", bench_client, bench_client.build_topology)
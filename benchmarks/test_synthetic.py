@@ -0,0 +1,23 @@
+from pyVmomi import vim
+
+from mce_lib_vsphere.extractors import VM_INFOS
+
+PATHS = ["name", "parent", "runtime.host", "config.hardware", "guest.net", "customValue", "summary.storage"]
+
+
+def test_synthetic_collect_properties(synthetic_generator, measure):
+    client = synthetic_generator.client(path_set=PATHS)
+    result = measure(
+        "synthetic_collect_properties", client,
+        lambda: list(client.collect_properties([vim.VirtualMachine], PATHS))
+    )
+    assert result["soap_calls"] > 0
+
+
+def test_synthetic_extract_parallel(synthetic_generator, measure):
+    client = synthetic_generator.client(path_set=VM_INFOS.compile("vim.version.version11").path_set)
+    result = measure(
+        "synthetic_extract_parallel", client,
+        lambda: sum(1 for _ in client.extract_parallel("vm", encoder="json"))
+    )
+    assert result["soap_calls"] > 0
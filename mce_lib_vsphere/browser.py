@@ -0,0 +1,114 @@
+"""
+Datastore contents with SearchDatastoreSubFolders_Task and orphaned files
+
+One recursive search task by datastore, the tasks run in parallel under
+the caps of a BulkRunner (see bulk) and the files are streamed as the
+tasks complete. A file is orphaned when no VM (or template) references it
+in layoutEx.file - collected in bulk for all the VMs before the search.
+
+Example:
+    orphans = client.find_orphaned_files()
+    for datastore, report in orphan_report(orphans).items():
+        print(report.name, len(report.files), report.size)
+
+Files of the folders of VMs without layoutEx (inaccessible VMs) and of
+the first class disks folder (fcd) are never reported. On vSAN, the
+layouts name the folders by UUID: compare the results with care.
+"""
+
+import logging
+from collections import namedtuple
+from typing import Any, Iterable, Iterator, List, Mapping, Set, Tuple
+
+from pyVmomi import vim
+
+logger = logging.getLogger(__name__)
+
+# path: '[datastore name] folder/file.vmdk'
+FileRecord = namedtuple("FileRecord", ["datastore", "path", "size", "modified"])
+
+# orphaned files of a datastore - size: total in bytes
+OrphanReport = namedtuple("OrphanReport", ["datastore", "name", "files", "size"])
+
+DISK_PATTERNS = ["*.vmdk"]
+
+# datastore folders skipped by the orphans detection
+SKIPPED_FOLDERS = ["fcd"]
+
+DATASTORE_PATHS = ["name", "browser", "summary.accessible"]
+
+LAYOUT_PATHS = ["layoutEx.file", "summary.config.vmPathName"]
+
+
+def search_spec(patterns: List[str] = None) -> vim.host.DatastoreBrowser.SearchSpec:
+    """Files matching patterns (all files if None) with their size and modification time"""
+    return vim.host.DatastoreBrowser.SearchSpec(
+        matchPattern=list(patterns or ["*"]),
+        details=vim.host.DatastoreBrowser.FileInfo.Details(fileType=True, fileSize=True, modification=True),
+    )
+
+
+def join_path(folder: str, name: str) -> str:
+    """'[ds] vm' + 'vm.vmdk' -> '[ds] vm/vm.vmdk', '[ds]' + 'a.iso' -> '[ds] a.iso'"""
+    folder = folder.rstrip("/ ")
+    return f"{folder} {name}" if folder.endswith("]") else f"{folder}/{name}"
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    """'[ds] vm/vm.vmdk' -> ('ds', 'vm/vm.vmdk')"""
+    name, _, relative = path.partition("]")
+    return name.lstrip("["), relative.strip()
+
+
+def file_records(datastore: str, results: Iterable[Any]) -> Iterator[FileRecord]:
+    """FileRecords of the results of a search task (HostDatastoreBrowserSearchResults)"""
+    for result in results or []:
+        for info in result.file or []:
+            yield FileRecord(
+                datastore=datastore,
+                path=join_path(result.folderPath, info.path),
+                size=info.fileSize,
+                modified=info.modification,
+            )
+
+
+def used_files(layouts: Iterable[Tuple[Any, Mapping]]) -> Tuple[Set[str], Set[str]]:
+    """
+    (paths of the files of the VMs, folders of the VMs without layout)
+
+    Args:
+        layouts: (vm, {layoutEx.file, summary.config.vmPathName}) - collect_properties
+    """
+    paths = set()
+    folders = set()
+    for vm, props in layouts:
+        files = props.get("layoutEx.file")
+        if files:
+            paths.update(file.name for file in files)
+            continue
+        vmx = props.get("summary.config.vmPathName")
+        if vmx:
+            folders.add(vmx.rsplit("/", 1)[0] if "/" in vmx else vmx)
+    return paths, folders
+
+
+def is_orphaned(record: FileRecord, paths: Set[str], folders: Set[str]) -> bool:
+    if record.path in paths:
+        return False
+    folder = record.path.rsplit("/", 1)[0] if "/" in record.path else record.path
+    if folder in folders:
+        return False
+    _, relative = split_path(record.path)
+    return relative.split("/", 1)[0] not in SKIPPED_FOLDERS
+
+
+def orphan_report(records: Iterable[FileRecord]) -> Mapping[str, OrphanReport]:
+    """{datastore moref: OrphanReport} of orphaned files"""
+    reports = {}
+    for record in records:
+        report = reports.get(record.datastore)
+        if report is None:
+            report = OrphanReport(record.datastore, split_path(record.path)[0], [], 0)
+        report.files.append(record)
+        reports[record.datastore] = report._replace(size=report.size + (record.size or 0))
+    return reports
@@ -0,0 +1,187 @@
+"""
+Bulk power, reconfigure and clone operations
+
+Tasks are submitted in parallel under per-host and per-datastore
+concurrency caps and all of them are tracked through one TaskTracker
+(see tasks) instead of polling each task.
+
+Example:
+    for result in client.power_on_vms(vms, max_per_host=4):
+        print(result.target, result.state, result.error)
+"""
+
+import time
+from collections import namedtuple, defaultdict, deque
+from typing import Any, Callable, Iterable, Iterator, List, Mapping
+
+from pyVmomi import vim, vmodl
+
+from .exceptions import FatalError, TaskTimeoutError
+from .tasks import MAX_WAIT, task_error
+
+collector = vmodl.query.PropertyCollector
+
+# state: success, error (error: TaskError) or skipped (nothing to do)
+BulkResult = namedtuple("BulkResult", ["target", "operation", "state", "result", "error", "task"])
+
+# minimum wait for task updates (seconds): no busy loop at the end of the timeout
+POLL_INTERVAL = 1
+
+# submit: function returning the task - hosts and datastores: morefs counted by the caps
+Job = namedtuple("Job", ["target", "operation", "submit", "hosts", "datastores"])
+
+class BulkRunner:
+    """Submit jobs under concurrency caps and yield results as tasks complete"""
+
+    def __init__(
+        self,
+        tracker,
+        max_per_host: int = 4,
+        max_per_datastore: int = 8,
+        max_in_flight: int = 32,
+        timeout: float = 3600,
+    ):
+        for name, cap in (("max_per_host", max_per_host), ("max_per_datastore", max_per_datastore),
+                          ("max_in_flight", max_in_flight)):
+            if cap < 1:
+                raise ValueError(f"{name} must be at least 1 - got {cap}")
+        self.tracker = tracker
+        self.max_per_host = max_per_host
+        self.max_per_datastore = max_per_datastore
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.host_counts = defaultdict(int)
+        self.datastore_counts = defaultdict(int)
+
+    def _allowed(self, job: Job) -> bool:
+        return (
+            all(self.host_counts[host] < self.max_per_host for host in job.hosts)
+            and all(self.datastore_counts[ds] < self.max_per_datastore for ds in job.datastores)
+        )
+
+    def _acquire(self, job: Job, delta: int):
+        for host in job.hosts:
+            self.host_counts[host] += delta
+        for datastore in job.datastores:
+            self.datastore_counts[datastore] += delta
+
+    def run(self, jobs: Iterable[Job]) -> Iterator[BulkResult]:
+        pending = deque(jobs)
+        in_flight = {}  # task moref -> (job, task)
+        deadline = time.monotonic() + self.timeout
+
+        while pending or in_flight:
+            # submit every job allowed by the caps, in order
+            skipped = deque()
+            while pending and len(in_flight) < self.max_in_flight:
+                job = pending.popleft()
+                if not self._allowed(job):
+                    skipped.append(job)
+                    continue
+                try:
+                    task = job.submit()
+                except vmodl.MethodFault as err:
+                    yield BulkResult(job.target, job.operation, "error", None, task_error(None, err), None)
+                    continue
+                self._acquire(job, 1)
+                in_flight[task._moId] = (job, task)
+                self.tracker.add([task])
+            pending = skipped + pending
+
+            if not in_flight:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TaskTimeoutError(
+                    f"bulk operation timeout - {len(in_flight)} tasks running, {len(pending)} pending",
+                    tasks=[task for _, task in in_flight.values()],
+                )
+            for task, info in self.tracker.wait(max(min(remaining, MAX_WAIT), POLL_INTERVAL)):
+                job, task = in_flight.pop(task._moId)
+                self._acquire(job, -1)
+                if info.get("info.state") == vim.TaskInfo.State.error:
+                    yield BulkResult(job.target, job.operation, "error", None, task_error(task, info.get("info.error")), task)
+                else:
+                    yield BulkResult(job.target, job.operation, "success", info.get("info.result"), None, task)
+
+
+def retrieve_many(content, objects: List[Any], object_type: Any, path_set: List[str]) -> Mapping[str, Mapping]:
+    """{moref: {path: value}} of objects in one RetrievePropertiesEx call (paged)"""
+    if not objects:
+        return {}
+    filter_spec = collector.FilterSpec(
+        objectSet=[collector.ObjectSpec(obj=obj, skip=False) for obj in objects],
+        propSet=[collector.PropertySpec(type=object_type, pathSet=path_set, all=False)],
+    )
+    property_collector = content.propertyCollector
+    result = property_collector.RetrievePropertiesEx([filter_spec], collector.RetrieveOptions())
+    props = {}
+    while result:
+        for obj_content in result.objects:
+            props[obj_content.obj._moId] = {prop.name: prop.val for prop in obj_content.propSet}
+        if not result.token:
+            break
+        result = property_collector.ContinueRetrievePropertiesEx(result.token)
+    return props
+
+
+def _placement(props: Mapping):
+    host = props.get("runtime.host")
+    return [host._moId] if host else [], [ds._moId for ds in props.get("datastore") or []]
+
+
+def power_jobs(content, vms: List[vim.VirtualMachine], power_on: bool) -> Iterator[Any]:
+    """Jobs (or skipped results) to power on/off vms"""
+    operation = "power_on" if power_on else "power_off"
+    wanted = vim.VirtualMachine.PowerState.poweredOn if power_on else vim.VirtualMachine.PowerState.poweredOff
+    props = retrieve_many(content, vms, vim.VirtualMachine, ["runtime.host", "runtime.powerState", "datastore"])
+    for vm in vms:
+        vm_props = props.get(vm._moId, {})
+        if vm_props.get("runtime.powerState") == wanted:
+            yield BulkResult(vm, operation, "skipped", None, None, None)
+            continue
+        hosts, datastores = _placement(vm_props)
+        submit = vm.PowerOnVM_Task if power_on else vm.PowerOffVM_Task
+        yield Job(vm, operation, submit, hosts, datastores)
+
+
+def reconfigure_jobs(content, vms: List[vim.VirtualMachine], spec: vim.vm.ConfigSpec) -> Iterator[Job]:
+    props = retrieve_many(content, vms, vim.VirtualMachine, ["runtime.host", "datastore"])
+    for vm in vms:
+        hosts, datastores = _placement(props.get(vm._moId, {}))
+        yield Job(vm, "reconfigure", _bind(vm.ReconfigVM_Task, spec=spec), hosts, datastores)
+
+
+def clone_jobs(
+    content,
+    template: vim.VirtualMachine,
+    names: List[str],
+    folder: vim.Folder = None,
+    pool: vim.ResourcePool = None,
+    datastore: vim.Datastore = None,
+    host: vim.HostSystem = None,
+    power_on: bool = False,
+) -> Iterator[Job]:
+    props = retrieve_many(
+        content, [template], vim.VirtualMachine, ["parent", "resourcePool", "runtime.host", "datastore"]
+    ).get(template._moId, {})
+    folder = folder or props.get("parent")
+    pool = pool or props.get("resourcePool")
+    if pool is None:
+        raise FatalError(f"resource pool required to clone the template [{template._moId}]")
+    hosts, datastores = _placement(props)
+    if host is not None:
+        hosts = [host._moId]
+    if datastore is not None:
+        datastores = [datastore._moId]
+    for name in names:
+        spec = vim.vm.CloneSpec(
+            location=vim.vm.RelocateSpec(pool=pool, datastore=datastore, host=host),
+            powerOn=power_on,
+            template=False,
+        )
+        yield Job(name, "clone", _bind(template.CloneVM_Task, folder=folder, name=name, spec=spec), hosts, datastores)
+
+
+def _bind(method: Callable, **kwargs) -> Callable:
+    return lambda: method(**kwargs)
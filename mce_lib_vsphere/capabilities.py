@@ -0,0 +1,132 @@
+"""
+Properties available on a vCenter, from its API version (about.apiVersion)
+
+Example:
+    capabilities = client.capabilities
+    capabilities.version  # 'vim.version.version11' for a vCenter 6.5
+    capabilities.supports(vim.VirtualMachine, "config.createDate")  # False: since 6.7
+    capabilities.filter_paths(vim.VirtualMachine, ["name", "config.createDate"])  # ['name']
+"""
+
+import logging
+import threading
+from typing import Any, List, Tuple
+
+from pyVmomi import VmomiSupport
+
+logger = logging.getLogger(__name__)
+
+
+def property_version(object_type: Any, path: str) -> str:
+    """pyVmomi version introducing the property path or None if the path does not exist"""
+    version = None
+    _type = object_type
+    for name in path.split("."):
+        if _type is None or not hasattr(_type, "_GetPropertyInfo"):
+            return None
+        try:
+            info = _type._GetPropertyInfo(name)
+        except AttributeError:
+            return None
+        # the newest version of the path segments
+        if version is None or VmomiSupport.IsChildVersion(info.version, version):
+            version = info.version
+        _type = getattr(info.type, "Item", info.type)
+    return version
+
+
+def is_supported(object_type: Any, path: str, version: str = None) -> bool:
+    """True if path exist in version (any version if None)"""
+    if path.startswith("@"):
+        # pseudo paths of the extractors (@moref)
+        return True
+    path_version = property_version(object_type, path)
+    if path_version is None:
+        return False
+    return version is None or VmomiSupport.IsChildVersion(version, path_version)
+
+
+def _version_tuple(value: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in value.split(".") if part.isdigit())
+
+
+def pyvmomi_version(api_version: str) -> str:
+    """pyVmomi version of a vSphere API version: '6.5' -> 'vim.version.version11'
+
+    An API version unknown to pyVmomi gives the newest known version below it.
+    """
+    known = {}
+    for key, version in VmomiSupport.versionMap.items():
+        number = key[len("vim25/"):]
+        # skip update releases (vim25/2.5u2)
+        if key.startswith("vim25/") and number.replace(".", "").isdigit():
+            known[_version_tuple(number)] = version
+    wanted = _version_tuple(api_version)
+    candidates = [number for number in known if number <= wanted]
+    if not candidates:
+        return known[min(known)]
+    return known[max(candidates)]
+
+
+def oldest(version: str, other: str) -> str:
+    return version if VmomiSupport.IsChildVersion(other, version) else other
+
+
+class Capabilities:
+    """Property paths supported by an endpoint - results are cached"""
+
+    def __init__(self, api_version: str, stub_version: str = None):
+        self.api_version = api_version
+        version = pyvmomi_version(api_version)
+        # the stub can not serialize types newer than its own version
+        self.version = oldest(version, stub_version) if stub_version else version
+        self._supported = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<Capabilities {self.api_version} {self.version}>"
+
+    def supports(self, object_type: Any, path: str) -> bool:
+        key = (object_type, path)
+        supported = self._supported.get(key)
+        if supported is None:
+            supported = is_supported(object_type, path, self.version)
+            with self._lock:
+                self._supported[key] = supported
+        return supported
+
+    def filter_paths(self, object_type: Any, paths: List[str]) -> List[str]:
+        """paths supported by the endpoint: paths newer than its version are dropped
+
+        Paths unknown in every version (typos) are kept with a warning: the
+        vCenter raises InvalidProperty.
+        """
+        result = []
+        for path in paths:
+            if self.supports(object_type, path):
+                result.append(path)
+            elif property_version(object_type, path) is None:
+                logger.warning(f"unknown property path [{path}] of [{object_type._wsdlName}]")
+                result.append(path)
+        return result
+
+    def property_names(self, object_type: Any) -> List[str]:
+        """Top-level properties of object_type in the endpoint version"""
+        return [
+            info.name for info in object_type._GetPropertyList()
+            if VmomiSupport.IsChildVersion(self.version, info.version)
+        ]
+
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_capabilities(endpoint: str, api_version: str, stub_version: str = None) -> Capabilities:
+    """Capabilities shared by the clients of an endpoint (host:port)"""
+    key = (endpoint, api_version, stub_version)
+    with _CACHE_LOCK:
+        capabilities = _CACHE.get(key)
+        if capabilities is None:
+            capabilities = _CACHE[key] = Capabilities(api_version, stub_version)
+    return capabilities
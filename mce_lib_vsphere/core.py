@@ -1,8 +1,16 @@
+import contextlib
+import copy
+import functools
 import logging
 import ssl
+import sys
+import threading
+import time
 import traceback
+import weakref
 import re
 import json
+from datetime import datetime
 from typing import List, Tuple, Any, Mapping, Union
 from enum import Enum, IntEnum, unique
 
@@ -12,12 +20,36 @@ from furl import furl
 
 from pyVim.connect import Disconnect
 from pyVim.connect import SmartConnect
-from pyVmomi import vim, VmomiSupport
+from pyVim.connect import SmartStubAdapter
+from pyVmomi import vim, vmodl, VmomiSupport
 from pyVmomi import Iso8601
 
 import requests
 
 from  .exceptions import *
+from .topology import Topology, reference_paths, reference_morefs
+from .inventory import InventorySnapshot
+from .store import InventoryStore
+from .metrics import MetricsRegistry, instrument_stub, uninstrument_stub, instrument_method
+from .profiling import LazyFetchProfiler
+from .performance import PerformanceCollector, TimeSeries, REALTIME_INTERVAL
+from .events import MAX_BATCH_SIZE, build_filter_spec, to_record
+from .capabilities import Capabilities, get_capabilities
+from .extractors import (
+    Extractor, Plan, get_extractor, nics_infos, custom_fields,
+    VM_INFOS, HOST_INFOS, CLUSTER_INFOS, DATASTORE_INFOS, HOST_HARDWARE, HOST_DETAILS,
+)
+from .bulk import BulkResult, BulkRunner, Job, retrieve_many, power_jobs, reconfigure_jobs, clone_jobs
+from .tasks import TaskTracker, wait_for_tasks
+from .terraform import TerraformExport, TERRAFORM_PATHS
+from .parallel import CHUNK_SIZE, transform_pages
+from .tagging import TaggingClient
+from .permissions import PermissionIndex, PERMISSION_PATHS, permission_paths
+from .browser import (
+    DATASTORE_PATHS, DISK_PATTERNS, LAYOUT_PATHS, file_records, is_orphaned, search_spec, used_files,
+)
+from .snapshots import SnapshotRecord, SNAPSHOT_PATHS, SNAPSHOT_LAYOUT_PATHS, snapshot_records
+from . import replay
 
 #FIXME: typic.api.strict_mode()
 
@@ -51,6 +83,21 @@ class ResourceTypes(str, Enum):
             return {e.value: e.name for e in cls}
         return {e.name: e.value for e in cls}
 
+    @property
+    def vim_type(self):
+        """pyVmomi class of this resource type: vim.VirtualMachine for VIRTUAL_MACHINE"""
+        return getattr(vim, self.value.split("/", 1)[1])
+
+    @classmethod
+    def from_object(cls, obj):
+        """Return the most specific ResourceTypes of a managed object or None"""
+        values = cls.to_dict(reverse=True)
+        for klass in type(obj).__mro__:
+            value = "vmware/%s" % getattr(klass, "_wsdlName", "")
+            if value in values:
+                return cls(value)
+        return None
+
 @unique
 class EffectiveRoles(IntEnum):
     ADMINISTRATOR = -1
@@ -70,6 +117,35 @@ class EffectiveRoles(IntEnum):
         return {e.name: e.value for e in cls}
 
 
+def clone_stub(stub):
+    """Copy of a SoapStubAdapter with its own connection pool - same session (cookie)"""
+    clone = copy.copy(stub)
+    clone.pool = []
+    clone.lock = threading.Lock()
+    clone.requestModifierList = list(stub.requestModifierList)
+    # the copied metrics wrappers call the original stub
+    uninstrument_stub(clone)
+    return clone
+
+
+def release_clone(clones: list, lock: threading.Lock, stub):
+    """Forget a cloned stub and close its connections (the thread of the stub exited)"""
+    with lock:
+        if stub in clones:
+            clones.remove(stub)
+    stub.DropConnections()
+
+
+class ThreadSession:
+    """ServiceInstance and ServiceContent of a thread (thread_safe mode)"""
+
+    __slots__ = ("si", "content", "__weakref__")
+
+    def __init__(self, si, content):
+        self.si = si
+        self.content = content
+
+
 class Client:
     """Client SDK for Vcenter"""
 
@@ -85,6 +161,7 @@ class Client:
         verify: bool = True,
         debug: bool = False,
         timeout: int = 60,
+        thread_safe: bool = False,
     ):
         """
         Connect to a vCenter via the API
@@ -101,6 +178,13 @@ class Client:
         >>> print(vm.name)
         >>> cli.disconnect()
 
+        One login shared by threads - managed objects keep the stub of the thread that got them:
+
+        >>> cli = Client(host="vcenter.mydomain.com", username="adminuser", password="adminpasswd", thread_safe=True)
+        >>> cli.connect()
+        >>> with ThreadPoolExecutor(8) as executor:
+        >>>     datastores, hosts = executor.map(lambda get: get(), [cli.get_all_datastores, cli.get_all_hosts])
+
         :param host: Hostname or IP of the vCenter
         :type host: str or unicode
         :param port: Port on which the vCenter API is running (default: 443)
@@ -115,6 +199,8 @@ class Client:
         :type debug: bool
         :param timeout: Timeout in seconds (default: 60)
         :type timeout: int
+        :param thread_safe: One SOAP stub by thread, cloned from the session cookie (default: False)
+        :type thread_safe: bool
 
         """
         self.host = host or VCENTER_URL
@@ -127,15 +213,25 @@ class Client:
         self.timeout = timeout
         self.pool_size = 5
         self.debug = debug
+        self.thread_safe = thread_safe
 
         if host  and host.startswith("http"):
             self.parse_url(host)
 
+        self._clones = []
+        self._clones_lock = threading.Lock()
         self.si = None
         self.content = None
 
         self.is_connected = False
 
+        self.metrics_hooks = []
+
+        self._perf = None
+        self._capabilities = None
+        self._tagging = None
+        self._roles = None
+
     @typic.al
     def parse_url(self, url: str):
         """Parse settings with URL
@@ -171,6 +267,9 @@ class Client:
         if url.args.get('pool_size'):
             self.pool_size = int(url.args.get('pool_size'))
 
+        if url.args.get('thread_safe', '0') in ["true", "True", "1"]:
+            self.thread_safe = True
+
         return url
 
     def __enter__(self):
@@ -181,16 +280,145 @@ class Client:
     def __exit__(self, exc_type, exc_value, traceback):
         self.disconnect()
 
-    def disconnect(self):
-        """Current session disconnect"""
+    def disconnect(self, logout: bool = True):
+        """Current session disconnect
+
+        With logout=False, the session stay open on the vCenter and can be
+        reused with connect(session_cookie=...)
+        """
         try:
-            Disconnect(self.si)
+            self._drop_clones()
+            if self._tagging is not None:
+                self._tagging.logout()
+            if logout:
+                Disconnect(self._si)
+            else:
+                self._si._stub.DropConnections()
         except Exception as err:
             logger.warning(str(err))
 
+    @property
+    def si(self):
+        """ServiceInstance - with thread_safe, the one of the current thread"""
+        if not self.thread_safe or self._si is None or threading.current_thread() is self._owner:
+            return self._si
+        return self._thread_session().si
+
+    @si.setter
+    def si(self, si):
+        self._drop_clones()
+        self._si = si
+        # the Thread, not its ident: idents of exited threads are reused
+        self._owner = threading.current_thread()
+        self._local = threading.local()
+
+    @property
+    def content(self):
+        """ServiceContent - with thread_safe, the one of the current thread"""
+        if not self.thread_safe or self._si is None or threading.current_thread() is self._owner:
+            return self._content
+        return self._thread_session().content
+
+    @content.setter
+    def content(self, content):
+        self._content = content
+
+    def _thread_session(self) -> ThreadSession:
+        """ServiceInstance and ServiceContent of the current thread: a stub cloned from the session
+
+        The clone share the session cookie: RetrieveContent is the only call, no login.
+        The clone is dropped when the thread exits (end of its thread local data).
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            stub = clone_stub(self._si._stub)
+            if self.metrics_hooks:
+                instrument_stub(stub, self.metrics_hooks)
+            with self._clones_lock:
+                self._clones.append(stub)
+            si = vim.ServiceInstance("ServiceInstance", stub)
+            session = self._local.session = ThreadSession(si, si.RetrieveContent())
+            weakref.finalize(session, release_clone, self._clones, self._clones_lock, stub)
+        return session
+
+    def _drop_clones(self):
+        with self._clones_lock:
+            clones = list(self._clones)
+            self._clones.clear()
+        for stub in clones:
+            stub.DropConnections()
+
+    @property
+    def session_cookie(self) -> str:
+        """Cookie of the current session (see connect)"""
+        return self.si._stub.cookie if self.si else None
+
+    def _reuse_session(self, session_cookie: str, context) -> bool:
+        stub = SmartStubAdapter(
+            host=self.host,
+            port=self.port if self.is_ssl else -self.port,
+            path=self.path,
+            sslContext=context,
+            connectionPoolTimeout=self.timeout,
+        )
+        stub.cookie = session_cookie
+        si = vim.ServiceInstance("ServiceInstance", stub)
+        content = si.RetrieveContent()
+        if not content.sessionManager.currentSession:
+            logger.warning("session expired - new login")
+            return False
+        self.si = si
+        self.content = content
+        self.is_connected = True
+        self._instrument()
+        return True
+
+    @classmethod
+    def from_cassette(cls, cassette: Union[str, "replay.Cassette"]) -> "Client":
+        """
+        Client answering from recorded SOAP responses (see record), without server
+
+        Example:
+            client = Client.from_cassette("tests/fixtures/inventory.json.gz")
+            vms = client.get_all_vms()
+        """
+        if isinstance(cassette, str):
+            cassette = replay.Cassette.load(cassette)
+        client = cls(host="replay")
+        client.si = vim.ServiceInstance("ServiceInstance", replay.replay_stub(cassette))
+        client.content = client.si.RetrieveContent()
+        client.is_connected = True
+        return client
+
+    @contextlib.contextmanager
+    def record(self, path: str = None):
+        """
+        Record SOAP responses of the calls in the block for Client.from_cassette
+
+        Example:
+            with client.record("tests/fixtures/inventory.json.gz"):
+                client.get_all_vms()
+        """
+        stub = self.si._stub
+        cassette = replay.Cassette(version=stub.version)
+        replay.start_recording(stub, cassette)
+        try:
+            # replayed by from_cassette in place of the login
+            self.si.RetrieveContent()
+            yield cassette
+        finally:
+            replay.stop_recording(stub)
+            if path:
+                cassette.save(path)
+
     @typic.al
-    def connect(self):
-        """Connect to Vcenter Server"""
+    def connect(self, session_cookie: str = None):
+        """Connect to Vcenter Server
+
+        Args:
+            session_cookie: reuse a session still open (see session_cookie
+                and disconnect(logout=False)) - login if the session is expired
+        """
 
         context = None
         protocol = 'http'
@@ -203,6 +431,9 @@ class Client:
                 requests.packages.urllib3.disable_warnings()
 
         try:
+            if session_cookie and self._reuse_session(session_cookie, context):
+                return
+
             # TODO: certFile, certKeyFile, cacertsFile
             # TODO: connectionPoolTimeout:   Default value is 900 seconds (15 minutes).
             # TODO: mechanism='userpass'
@@ -221,6 +452,7 @@ class Client:
             self.si = si
             self.content = si.RetrieveContent()
             self.is_connected = True
+            self._instrument()
 
         except IOError as e:
             if self.debug:
@@ -245,6 +477,81 @@ class Client:
             # TODO: add fields
             raise FatalError(str(err))
 
+    # Methods not wrapped by enable_metrics
+    NOT_INSTRUMENTED = [
+        "connect", "disconnect", "parse_url", "enable_metrics", "disable_metrics",
+        "add_metrics_hook", "remove_metrics_hook", "profile", "record", "from_cassette",
+    ]
+
+    def _instrument(self):
+        if self.metrics_hooks and self._si:
+            for stub in [self._si._stub] + self._clones:
+                instrument_stub(stub, self.metrics_hooks)
+
+    def add_metrics_hook(self, hook):
+        """Add a callable receiving a metrics.CallEvent for each Client method, SOAP call and lazy property fetch"""
+        if not self.metrics_hooks:
+            for name, value in vars(Client).items():
+                if callable(value) and not name.startswith("__") and name not in self.NOT_INSTRUMENTED:
+                    setattr(self, name, instrument_method(getattr(self, name), name, self.metrics_hooks))
+        self.metrics_hooks.append(hook)
+        self._instrument()
+
+    def remove_metrics_hook(self, hook):
+        self.metrics_hooks.remove(hook)
+        if not self.metrics_hooks:
+            self.disable_metrics()
+
+    @contextlib.contextmanager
+    def profile(self, output=sys.stderr):
+        """
+        Record the properties fetched lazily (one SOAP call each) in the block
+
+        Print a report with the property set to collect in bulk instead.
+
+        Example:
+            with client.profile() as profiler:
+                for vm in client.get_all_vms():
+                    client._get_vm_infos(vm)
+            profiler.suggested_path_set()   # {'VirtualMachine': ['config', 'guest', ...]}
+
+        Args:
+            output: file for the report (None: no report)
+        """
+        profiler = LazyFetchProfiler()
+        self.add_metrics_hook(profiler)
+        try:
+            yield profiler
+        finally:
+            self.remove_metrics_hook(profiler)
+            if output:
+                print(profiler.report(), file=output)
+
+    def enable_metrics(self, registry: MetricsRegistry = None) -> MetricsRegistry:
+        """
+        Record latency, SOAP calls, bytes and lazy property fetches by Client method
+
+        Example:
+            registry = client.enable_metrics()
+            client.get_vm_infos(vm)
+            pprint(registry.to_dict()["methods"]["get_vm_infos"])
+            print(registry.to_prometheus())
+        """
+        registry = registry or MetricsRegistry()
+        self.add_metrics_hook(registry)
+        return registry
+
+    def disable_metrics(self):
+        """Remove all metrics hooks"""
+        for name in list(vars(self)):
+            if name in vars(Client):
+                delattr(self, name)
+        # cleared in place: the tagging client shares the list
+        self.metrics_hooks.clear()
+        if self._si:
+            for stub in [self._si._stub] + self._clones:
+                uninstrument_stub(stub)
+
     @typic.al
     def dump_to_dict(self, obj) -> Mapping:
         return json.loads(json.dumps(obj, cls=VmomiSupport.VmomiJSONEncoder))
@@ -353,6 +660,782 @@ class Client:
         object_view.Destroy()
         return obj_list
 
+    def collect_properties(
+        self,
+        object_types: List[Any],
+        path_set: Union[List[str], Mapping[Any, List[str]]] = None,
+        container: Any = None,
+        page_size: int = 1000,
+    ): # -> Iterator[Tuple[Any, Mapping]]
+        """
+        Retrieve properties of all objects of object_types with the PropertyCollector
+
+        One RetrievePropertiesEx call returns page_size objects with all their
+        properties instead of one call per object and per property.
+
+        Example:
+            for vm, props in client.collect_properties([vim.VirtualMachine], ["name", "runtime.host"]):
+                print(vm._moId, props["name"], props.get("runtime.host"))
+
+        Args:
+            object_types: list of pyVmomi classes (vim.VirtualMachine, ...)
+            path_set: property paths for all types or mapping {type: paths}
+            container: root of the search (default: rootFolder)
+            page_size: maximum objects returned by call
+
+        Properties not set on the server side are missing from the returned dict,
+        as properties unknown in the API version of the vCenter (see capabilities).
+        """
+        collector = vmodl.query.PropertyCollector
+        view, filter_spec = self._collection_spec(object_types, path_set, container)
+        token = None
+        try:
+            options = collector.RetrieveOptions(maxObjects=page_size)
+            property_collector = self.content.propertyCollector
+            result = property_collector.RetrievePropertiesEx([filter_spec], options)
+            while result:
+                token = result.token
+                for obj_content in result.objects:
+                    yield obj_content.obj, {prop.name: prop.val for prop in obj_content.propSet}
+                if not token:
+                    break
+                result = property_collector.ContinueRetrievePropertiesEx(token)
+                token = None
+        finally:
+            if token:
+                # generator closed before the end of pages
+                self.content.propertyCollector.CancelRetrievePropertiesEx(token)
+            view.Destroy()
+
+    def _collection_spec(
+        self, object_types: List[Any], path_set: Union[List[str], Mapping[Any, List[str]]], container: Any = None
+    ) -> Tuple[Any, Any]:
+        """(ContainerView, FilterSpec) of a bulk collection - the caller destroys the view"""
+        collector = vmodl.query.PropertyCollector
+        object_types = list(object_types)
+
+        prop_specs = []
+        for object_type in object_types:
+            if isinstance(path_set, Mapping):
+                paths = path_set.get(object_type) or []
+            else:
+                paths = path_set or []
+            # the vCenter fails the whole call for a property unknown in its version
+            prop_specs.append(collector.PropertySpec(
+                type=object_type, pathSet=self.capabilities.filter_paths(object_type, paths), all=False
+            ))
+
+        view = self.content.viewManager.CreateContainerView(
+            container or self.content.rootFolder, object_types, True
+        )
+        traversal = collector.TraversalSpec(
+            name="traverseView", path="view", skip=False, type=vim.view.ContainerView
+        )
+        obj_spec = collector.ObjectSpec(obj=view, skip=True, selectSet=[traversal])
+        return view, collector.FilterSpec(objectSet=[obj_spec], propSet=prop_specs)
+
+    def sync_inventory(
+        self,
+        store: InventoryStore,
+        resource_types: List[ResourceTypes] = None,
+        path_set: Mapping[Any, List[str]] = None,
+        wait_seconds: int = 0,
+        max_updates: int = 1000,
+    ) -> Mapping:
+        """
+        Synchronize store with the vCenter with WaitForUpdatesEx
+
+        The first call fetch all objects, next calls only the changes since the
+        version saved in the store. A call with other resource_types or path_set
+        replaces the filter and does a full pass. The PropertyFilter and its
+        ContainerView belong to the session (see stop_sync):
+        to resume after a restart, reconnect with the saved session cookie
+        (disconnect(logout=False) then connect(session_cookie=...)),
+        otherwise a full pass is done and only changed rows are rewritten.
+
+        Example:
+            store = InventoryStore("inventory.db")
+            client.connect(session_cookie=store.get_meta("session"))
+            client.sync_inventory(store)
+            store.set_meta("session", client.session_cookie)
+            client.disconnect(logout=False)
+
+        Args:
+            path_set: {type: paths} (default: name and topology references)
+            wait_seconds: maximum wait for changes (0: return immediately)
+
+        Return counters of changes
+        """
+        collector = vmodl.query.PropertyCollector
+        property_collector = self.content.propertyCollector
+
+        resource_types = list(resource_types or ResourceTypes)
+        object_types = [resource_type.vim_type for resource_type in resource_types]
+        if path_set is None:
+            path_set = {
+                object_type: ["name"] + list(reference_paths(object_type).values())
+                for object_type in object_types
+            }
+        path_set = {object_type: list(path_set.get(object_type) or []) for object_type in object_types}
+
+        property_filter, version = self._sync_filter(store, path_set)
+        stats = {"changed": 0, "removed": 0, "unchanged": 0}
+        generation = store.begin_full_sync() if not version else None
+        options = collector.WaitOptions(maxWaitSeconds=wait_seconds, maxObjectUpdates=max_updates)
+
+        while True:
+            update_set = property_collector.WaitForUpdatesEx(version, options)
+            if update_set is None:
+                break
+            with store:
+                self._apply_updates(store, property_filter, update_set, stats)
+                version = update_set.version
+                store.set_meta("version", version)
+            if not update_set.truncated:
+                break
+
+        if generation is not None:
+            stats["removed"] += store.end_full_sync(generation)
+        stats["version"] = version
+        return stats
+
+    def _sync_filter(self, store: InventoryStore, path_set: Mapping[Any, List[str]]) -> Tuple[Any, str]:
+        """(PropertyFilter, version) of sync_inventory - a new filter and an empty version if the saved one is lost"""
+        collector = vmodl.query.PropertyCollector
+        property_collector = self.content.propertyCollector
+        spec = json.dumps({object_type._wsdlName: paths for object_type, paths in path_set.items()}, sort_keys=True)
+
+        filter_moref = store.get_meta("filter")
+        property_filter = None
+        if filter_moref:
+            property_filter = next(
+                (f for f in property_collector.filter if f._moId == filter_moref), None
+            )
+        if property_filter is not None and store.get_meta("spec") != spec:
+            logger.info("sync_inventory: resource_types or path_set changed - new filter, full pass")
+            property_filter.DestroyPropertyFilter()
+            property_filter = None
+        if property_filter is not None:
+            return property_filter, store.version
+
+        # the view of a lost or replaced filter, if the session still has it
+        view_moref = store.get_meta("view")
+        view = next((v for v in self.content.viewManager.viewList or [] if v._moId == view_moref), None)
+        if view is not None:
+            view.DestroyView()
+
+        view = self.content.viewManager.CreateContainerView(
+            self.content.rootFolder, list(path_set), True
+        )
+        traversal = collector.TraversalSpec(
+            name="traverseView", path="view", skip=False, type=vim.view.ContainerView
+        )
+        filter_spec = collector.FilterSpec(
+            objectSet=[collector.ObjectSpec(obj=view, skip=True, selectSet=[traversal])],
+            propSet=[
+                collector.PropertySpec(type=object_type, pathSet=paths) for object_type, paths in path_set.items()
+            ],
+        )
+        try:
+            property_filter = property_collector.CreateFilter(filter_spec, partialUpdates=False)
+        except Exception:
+            view.DestroyView()
+            raise
+        store.set_meta("filter", property_filter._moId)
+        store.set_meta("view", view._moId)
+        store.set_meta("spec", spec)
+        store.set_meta("version", "")
+        return property_filter, ""
+
+    def _apply_updates(self, store: InventoryStore, property_filter: Any, update_set: Any, stats: dict):
+        """Write the object updates of property_filter in store (in a transaction) and count them in stats"""
+        current_generation = store.generation
+        for filter_update in update_set.filterSet:
+            if filter_update.filter._moId != property_filter._moId:
+                continue
+            for object_update in filter_update.objectSet:
+                obj = object_update.obj
+                resource_type = ResourceTypes.from_object(obj)
+                changed = store.apply(
+                    obj._moId,
+                    resource_type and resource_type.value,
+                    object_update.kind,
+                    [(change.name, change.op, change.val) for change in object_update.changeSet],
+                    current_generation,
+                )
+                if object_update.kind == "leave":
+                    stats["removed"] += int(changed)
+                else:
+                    stats["changed" if changed else "unchanged"] += 1
+
+    def stop_sync(self, store: InventoryStore):
+        """Destroy the PropertyFilter and the ContainerView of sync_inventory - the next sync is a full pass"""
+        filter_moref, view_moref = store.get_meta("filter"), store.get_meta("view")
+        for property_filter in self.content.propertyCollector.filter:
+            if property_filter._moId == filter_moref:
+                property_filter.DestroyPropertyFilter()
+        for view in self.content.viewManager.viewList or []:
+            if view._moId == view_moref:
+                view.DestroyView()
+        with store:
+            for key in ("filter", "view", "spec"):
+                store.delete_meta(key)
+            store.set_meta("version", "")
+
+    def build_topology(self, resource_types: List[ResourceTypes] = None) -> Topology:
+        """
+        Build the graph of the inventory in one bulk collection
+
+        Collect parent, host, datastore, network and resourcePool references
+        of all ResourceTypes and return a Topology for neighbors, ancestors
+        and subtree queries without any other call to the vCenter.
+
+        Example:
+            topology = client.build_topology()
+            topology.neighbors("vm-231", kind="datastore")
+            topology.resource_id("vm-231") # 'group-d1/datacenter-2/folder-3/vm-231'
+        """
+        resource_types = list(resource_types or ResourceTypes)
+        object_types = [resource_type.vim_type for resource_type in resource_types]
+        path_set = {
+            object_type: ["name"] + list(reference_paths(object_type).values())
+            for object_type in object_types
+        }
+
+        records = []
+        referenced = {}
+        for obj, props in self.collect_properties(object_types, path_set):
+            resource_type = ResourceTypes.from_object(obj)
+            refs = {}
+            for kind, path in reference_paths(type(obj)).items():
+                targets = reference_morefs(props.get(path))
+                for target in targets:
+                    referenced[target._moId] = target
+                refs[kind] = [target._moId for target in targets]
+            records.append((obj._moId, resource_type and resource_type.value, props.get("name"), refs))
+
+        # objects outside of the view (rootFolder, excluded types)
+        collected = {record[0] for record in records}
+        for moref, obj in referenced.items():
+            if moref not in collected:
+                resource_type = ResourceTypes.from_object(obj)
+                records.append((moref, resource_type and resource_type.value, None, {}))
+
+        return Topology.from_records(records)
+
+    @property
+    def roles(self) -> List[vim.AuthorizationManager.Role]:
+        """authorizationManager.roleList, system and custom roles - loaded once"""
+        if self._roles is None:
+            self._roles = self.content.authorizationManager.roleList
+        return self._roles
+
+    def permissions(self, resource_types: List[ResourceTypes] = None, container: Any = None) -> PermissionIndex:
+        """
+        Permissions of all the entities of resource_types, for "who can do what where" queries
+
+        One call for the permissions (RetrieveAllPermissions) and one bulk
+        collection of name, parents and effectiveRole (see permissions).
+
+        Example:
+            index = client.permissions()
+            index.who("vm-42")  # {'VSPHERE.LOCAL\\Administrators': 'Admin'}
+            for moref, principal, role in index.matrix():
+                print(moref, principal, role)
+        """
+        resource_types = list(resource_types or ResourceTypes)
+        object_types = [resource_type.vim_type for resource_type in resource_types]
+        root = container or self.content.rootFolder
+        entities = [(root, self.retrieve_properties(root, PERMISSION_PATHS))]
+        entities.extend(self.collect_properties(object_types, permission_paths(object_types), container))
+        permissions = self.content.authorizationManager.RetrieveAllPermissions()
+        return PermissionIndex(self.roles, permissions, entities)
+
+    def terraform_export(self, container: Any = None, page_size: int = 1000) -> TerraformExport:
+        """
+        Terraform configuration and import blocks of the folders and VMs in one bulk collection
+
+        Example:
+            export = client.terraform_export()
+            export.write("terraform/")  # inventory.tf and imports.tf
+            export.skipped  # [(moref, reason)] - templates, VMs without pool or datastore
+        """
+        object_types = list(TERRAFORM_PATHS)
+        return TerraformExport(self.collect_properties(object_types, TERRAFORM_PATHS, container, page_size))
+
+    @property
+    def perf(self) -> PerformanceCollector:
+        """PerformanceCollector of the session (counter ids are cached)"""
+        if self._perf is None or self._perf.perf_manager is not self.content.perfManager:
+            self._perf = PerformanceCollector(self.content.perfManager)
+        return self._perf
+
+    def query_perf(
+        self,
+        entities: List[Any],
+        counters: List[str],
+        interval: int = REALTIME_INTERVAL,
+        start: datetime = None,
+        end: datetime = None,
+        max_sample: int = None,
+        instance: str = "",
+    ) -> Mapping[Tuple[str, str, str], TimeSeries]:
+        """
+        Performance counters of entities (hosts, VMs, ...) with batched QueryPerf calls
+
+        Example:
+            hosts = client.get_all_hosts()
+            series = client.query_perf(hosts, ["cpu.usage.average", "net.usage.average"], max_sample=15)
+            series[(hosts[0]._moId, "cpu.usage.average", "")].values
+
+            # historical: past day (5 minutes samples)
+            client.query_perf(vms, ["mem.usage.average"], interval=300, start=start, end=end)
+
+        Args:
+            counters: counter names group.name.rollup
+            interval: 20 (real-time) or a historical sampling period (300, 1800, 7200, 86400)
+            instance: "" for the aggregate, "*" for all instances
+
+        Return {(moref, counter, instance): TimeSeries}
+        """
+        return self.perf.query(entities, counters, interval, start, end, max_sample, instance)
+
+    def events(
+        self,
+        event_types: List[Any] = None,
+        entity: Any = None,
+        recursion: str = "all",
+        begin_time: datetime = None,
+        end_time: datetime = None,
+        checkpoint: InventoryStore = None,
+        checkpoint_name: str = "events",
+        batch_size: int = MAX_BATCH_SIZE,
+        follow: bool = False,
+        poll_interval: float = 5.0,
+    ): # -> Iterator[EventRecord]
+        """
+        Stream events with an EventHistoryCollector, oldest first
+
+        Filters are applied by the vCenter. With checkpoint, the key and time
+        of the last event are saved in the store (meta) after each batch and
+        the next call start after this event.
+
+        Example:
+            store = InventoryStore("inventory.db")
+            types = [vim.event.VmCreatedEvent, vim.event.VmMigratedEvent, vim.event.VmPoweredOnEvent]
+            for event in client.events(types, checkpoint=store, follow=True):
+                print(event.created, event.type, event.vm_name)
+
+        Args:
+            event_types: event classes or type names (VmPoweredOnEvent, com.vmware.vc.*)
+            entity: events of this entity and of its children (recursion)
+            batch_size: events by ReadNextEvents call (max 1000)
+            follow: wait for new events (poll_interval seconds) instead of stopping
+        """
+        last_key = None
+        if checkpoint is not None:
+            value = checkpoint.get_meta(f"{checkpoint_name}.key")
+            last_key = int(value) if value else None
+            value = checkpoint.get_meta(f"{checkpoint_name}.time")
+            if value:
+                last_time = Iso8601.ParseISO8601(value)
+                if begin_time is None or last_time > begin_time:
+                    begin_time = last_time
+
+        spec = build_filter_spec(event_types, entity, recursion, begin_time, end_time)
+        event_collector = self.content.eventManager.CreateCollectorForEvents(spec)
+        try:
+            event_collector.RewindCollector()
+            while True:
+                events = event_collector.ReadNextEvents(min(batch_size, MAX_BATCH_SIZE))
+                if not events:
+                    if not follow:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                for event in events:
+                    # the checkpoint time is inclusive
+                    if last_key is not None and event.key <= last_key:
+                        continue
+                    yield to_record(event)
+                last = events[-1]
+                if last_key is None or last.key > last_key:
+                    last_key = last.key
+                    if checkpoint is not None:
+                        with checkpoint:
+                            checkpoint.set_meta(f"{checkpoint_name}.key", str(last.key))
+                            checkpoint.set_meta(f"{checkpoint_name}.time", Iso8601.ISO8601Format(last.createdTime))
+        finally:
+            event_collector.DestroyCollector()
+
+    @property
+    def capabilities(self) -> Capabilities:
+        """
+        Property paths supported by the vCenter, from about.apiVersion - cached by endpoint
+
+        Example:
+            client.capabilities.supports(vim.VirtualMachine, "config.createDate")
+        """
+        if self._capabilities is None:
+            self._capabilities = get_capabilities(
+                f"{self.host}:{self.port}", self.content.about.apiVersion, self.si._stub.version
+            )
+        return self._capabilities
+
+    @property
+    def tagging(self) -> TaggingClient:
+        """
+        vSphere tags with the REST API, same credentials - categories and tags are cached
+
+        Example:
+            for vm, infos in client.tagging.join(client.extract_all("vm")):
+                print(infos["name"], infos["tags"])
+        """
+        if self._tagging is None:
+            scheme = "https" if self.is_ssl else "http"
+            self._tagging = TaggingClient(
+                f"{scheme}://{self.host}:{self.port}", self.username, self.password,
+                verify=self.verify, timeout=self.timeout, metrics_hooks=self.metrics_hooks,
+            )
+        return self._tagging
+
+    def _plan(self, extractor: Union[str, Extractor]) -> Tuple[Extractor, Plan]:
+        if isinstance(extractor, str):
+            extractor = get_extractor(extractor)
+        return extractor, extractor.compile(self.capabilities.version)
+
+    def retrieve_properties(self, obj: Any, path_set: List[str], object_type: Any = None) -> Mapping:
+        """Properties {path: value} of one object in one RetrievePropertiesEx call"""
+        collector = vmodl.query.PropertyCollector
+        filter_spec = collector.FilterSpec(
+            objectSet=[collector.ObjectSpec(obj=obj, skip=False)],
+            propSet=[collector.PropertySpec(type=object_type or type(obj), pathSet=list(path_set), all=False)],
+        )
+        result = self.content.propertyCollector.RetrievePropertiesEx([filter_spec], collector.RetrieveOptions())
+        if not result or not result.objects:
+            return {}
+        return {prop.name: prop.val for prop in result.objects[0].propSet}
+
+    def extract(self, obj: Any, extractor: Union[str, Extractor]) -> Mapping:
+        """
+        Infos of one object with an extractor (see extractors) in one call
+
+        Example:
+            client.extract(vm, "vm") # same as client._get_vm_infos(vm)
+        """
+        extractor, plan = self._plan(extractor)
+        props = self.retrieve_properties(obj, plan.path_set, extractor.object_type)
+        return plan(props, obj._moId)
+
+    def extract_all(
+        self, extractor: Union[str, Extractor], container: Any = None, page_size: int = 1000
+    ): # -> Iterator[Tuple[Any, Mapping]]
+        """
+        Infos of all objects of the extractor type with bulk collections
+
+        Example:
+            for vm, infos in client.extract_all("vm"):
+                print(vm._moId, infos["name"], infos["state"])
+        """
+        extractor, plan = self._plan(extractor)
+        for obj, props in self.collect_properties([extractor.object_type], plan.path_set, container, page_size):
+            yield obj, plan(props, obj._moId)
+
+    def extract_parallel(
+        self,
+        extractor: Union[str, Extractor],
+        container: Any = None,
+        encoder: str = None,
+        page_size: int = CHUNK_SIZE,
+        workers: int = None,
+        executor: Any = None,
+    ): # -> Iterator[Tuple[str, Any]]
+        """
+        extract_all with the SOAP parsing, the plan and the encoding in a process pool
+
+        This process only requests the pages, the workers deserialize them
+        (see parallel). Results are yielded in collection order.
+
+        Example:
+            with open("vms.ndjson", "wb") as fp:
+                for moref, line in client.extract_parallel("vm", encoder="orjson"):
+                    fp.write(line + b"\n")
+
+        Args:
+            encoder: encoder name (see encoders.get_encoder) - yield (moref, JSON bytes) instead of (moref, infos)
+            page_size: objects by page, a page is a task of the pool
+            workers: processes of the pool (default: number of CPUs)
+            executor: an existing concurrent.futures executor instead of a new pool
+
+        Return (moref, infos) - morefs: managed objects are not sent back by the workers
+        """
+        extractor, plan = self._plan(extractor)
+        view, filter_spec = self._collection_spec([extractor.object_type], plan.path_set, container)
+        try:
+            yield from transform_pages(
+                self.content.propertyCollector, filter_spec, plan, encoder, page_size, workers, executor
+            )
+        finally:
+            view.Destroy()
+
+    def wait_for_tasks(
+        self, tasks: List[vim.Task], timeout: float = None, raise_on_error: bool = True
+    ): # -> Iterator[Tuple[vim.Task, Any]]
+        """
+        Wait for tasks with one PropertyFilter - yield (task, result) as they complete
+
+        The filter is destroyed when the iteration ends (completion, error or close).
+
+        Example:
+            tasks = [vm.PowerOffVM_Task() for vm in vms]
+            for task, result in client.wait_for_tasks(tasks, timeout=300):
+                print(task._moId, "done")
+
+        Args:
+            timeout: seconds to complete all the tasks (TaskTimeoutError), None: no limit
+            raise_on_error: raise the TaskError of a failed task, else yield (task, TaskError)
+        """
+        return wait_for_tasks(self.content, tasks, timeout, raise_on_error)
+
+    def _run_bulk(
+        self,
+        jobs: List[Any],
+        max_per_host: int,
+        max_per_datastore: int,
+        max_in_flight: int,
+        timeout: float,
+    ): # -> Iterator[BulkResult]
+        """Yield skipped results, then run the jobs with one TaskTracker"""
+        runnable = []
+        for job in jobs:
+            if isinstance(job, BulkResult):
+                yield job
+            else:
+                runnable.append(job)
+        if not runnable:
+            return
+        tracker = TaskTracker(self.content)
+        try:
+            runner = BulkRunner(tracker, max_per_host, max_per_datastore, max_in_flight, timeout)
+            yield from runner.run(runnable)
+        finally:
+            tracker.close()
+
+    def power_on_vms(
+        self,
+        vms: List[vim.VirtualMachine],
+        max_per_host: int = 4,
+        max_per_datastore: int = 8,
+        max_in_flight: int = 32,
+        timeout: float = 3600,
+    ): # -> Iterator[BulkResult]
+        """
+        Power on VMs in parallel - results are yielded as the tasks complete
+
+        VMs already powered on are skipped (state skipped).
+
+        Example:
+            for result in client.power_on_vms(vms, max_per_host=2):
+                if result.state == "error":
+                    print(result.target.name, result.error.msg)
+
+        Args:
+            max_per_host: tasks running at the same time on a host
+            max_per_datastore: tasks running at the same time on a datastore
+            max_in_flight: tasks running at the same time
+            timeout: seconds to complete all the tasks (TaskTimeoutError)
+        """
+        jobs = list(power_jobs(self.content, vms, power_on=True))
+        return self._run_bulk(jobs, max_per_host, max_per_datastore, max_in_flight, timeout)
+
+    def power_off_vms(
+        self,
+        vms: List[vim.VirtualMachine],
+        max_per_host: int = 4,
+        max_per_datastore: int = 8,
+        max_in_flight: int = 32,
+        timeout: float = 3600,
+    ): # -> Iterator[BulkResult]
+        """Power off VMs in parallel (hard power off) - see power_on_vms"""
+        jobs = list(power_jobs(self.content, vms, power_on=False))
+        return self._run_bulk(jobs, max_per_host, max_per_datastore, max_in_flight, timeout)
+
+    def reconfigure_vms(
+        self,
+        vms: List[vim.VirtualMachine],
+        num_cpus: int = None,
+        memory_mb: int = None,
+        spec: vim.vm.ConfigSpec = None,
+        max_per_host: int = 4,
+        max_per_datastore: int = 8,
+        max_in_flight: int = 32,
+        timeout: float = 3600,
+    ): # -> Iterator[BulkResult]
+        """
+        Apply the same ConfigSpec to VMs in parallel - see power_on_vms
+
+        Example:
+            for result in client.reconfigure_vms(vms, num_cpus=2, memory_mb=4096):
+                print(result.target._moId, result.state)
+        """
+        spec = spec or vim.vm.ConfigSpec()
+        if num_cpus is not None:
+            spec.numCPUs = num_cpus
+        if memory_mb is not None:
+            spec.memoryMB = memory_mb
+        jobs = list(reconfigure_jobs(self.content, vms, spec))
+        return self._run_bulk(jobs, max_per_host, max_per_datastore, max_in_flight, timeout)
+
+    def clone_vms(
+        self,
+        template: vim.VirtualMachine,
+        names: List[str],
+        folder: vim.Folder = None,
+        pool: vim.ResourcePool = None,
+        datastore: vim.Datastore = None,
+        host: vim.HostSystem = None,
+        power_on: bool = False,
+        max_per_host: int = 4,
+        max_per_datastore: int = 8,
+        max_in_flight: int = 32,
+        timeout: float = 3600,
+    ): # -> Iterator[BulkResult]
+        """
+        Clone a VM (or template) once by name in parallel - see power_on_vms
+
+        The target of the results is the name, result the new VM.
+        folder and pool default to the ones of the template.
+
+        Example:
+            template = client.get_vm_by_name("centos-template")
+            names = [f"web{i:02d}" for i in range(20)]
+            clones = [r.result for r in client.clone_vms(template, names, power_on=True) if r.state == "success"]
+        """
+        jobs = list(clone_jobs(self.content, template, names, folder, pool, datastore, host, power_on))
+        return self._run_bulk(jobs, max_per_host, max_per_datastore, max_in_flight, timeout)
+
+    def search_datastores(
+        self,
+        datastores: List[vim.Datastore] = None,
+        patterns: List[str] = DISK_PATTERNS,
+        max_in_flight: int = 8,
+        timeout: float = 3600,
+    ): # -> Iterator[FileRecord]
+        """
+        Files of datastores (default: all) matching patterns, searched recursively
+
+        One SearchDatastoreSubFolders_Task by datastore, max_in_flight in
+        parallel. Files are yielded as the tasks complete, inaccessible and
+        failed datastores are skipped with a warning (see browser).
+
+        Example:
+            for record in client.search_datastores(patterns=["*.iso"]):
+                print(record.path, record.size)
+        """
+        if datastores is None:
+            targets = list(self.collect_properties([vim.Datastore], DATASTORE_PATHS))
+        else:
+            props = retrieve_many(self.content, datastores, vim.Datastore, DATASTORE_PATHS)
+            targets = [(datastore, props.get(datastore._moId, {})) for datastore in datastores]
+
+        spec = search_spec(patterns)
+        jobs = []
+        for datastore, props in targets:
+            if not props.get("summary.accessible"):
+                logger.warning(f"datastore [{props.get('name') or datastore._moId}] not accessible - skipped")
+                continue
+            submit = functools.partial(
+                props["browser"].SearchDatastoreSubFolders_Task, datastorePath=f"[{props['name']}]", searchSpec=spec
+            )
+            jobs.append(Job(datastore, "search", submit, [], [datastore._moId]))
+
+        for result in self._run_bulk(jobs, max_in_flight, 1, max_in_flight, timeout):
+            if result.state == "error":
+                logger.warning(f"search of datastore [{result.target._moId}] failed: {result.error}")
+                continue
+            yield from file_records(result.target._moId, result.result)
+
+    def find_orphaned_files(
+        self,
+        datastores: List[vim.Datastore] = None,
+        patterns: List[str] = DISK_PATTERNS,
+        max_in_flight: int = 8,
+        timeout: float = 3600,
+    ): # -> Iterator[FileRecord]
+        """
+        Files of datastores referenced by no VM (layoutEx.file of all VMs in one bulk collection)
+
+        Example:
+            from mce_lib_vsphere.browser import orphan_report
+
+            for moref, report in orphan_report(client.find_orphaned_files()).items():
+                print(report.name, len(report.files), report.size)
+        """
+        paths, folders = used_files(self.collect_properties([vim.VirtualMachine], LAYOUT_PATHS))
+        for record in self.search_datastores(datastores, patterns, max_in_flight, timeout):
+            if is_orphaned(record, paths, folders):
+                yield record
+
+    def snapshots(self, container: Any = None, sizes: bool = True, page_size: int = 1000) -> List[SnapshotRecord]:
+        """
+        Snapshots of all the VMs, flattened (see snapshots)
+
+        The snapshot trees of all the VMs in one bulk collection, then the
+        layouts (layoutEx) of the VMs with snapshots only.
+
+        Example:
+            from mce_lib_vsphere.snapshots import oldest, largest
+
+            records = client.snapshots()
+            for record in largest(records, 20):
+                print(record.vm_name, record.name, record.created, record.size)
+
+        Args:
+            sizes: collect the layouts for the sizes - size is None otherwise
+        """
+        vms = [
+            (vm, props)
+            for vm, props in self.collect_properties([vim.VirtualMachine], SNAPSHOT_PATHS, container, page_size)
+            if props.get("snapshot.rootSnapshotList")
+        ]
+        layouts = {}
+        if sizes:
+            layouts = retrieve_many(self.content, [vm for vm, _ in vms], vim.VirtualMachine, SNAPSHOT_LAYOUT_PATHS)
+        records = []
+        for vm, props in vms:
+            records.extend(snapshot_records(vm, props, layouts.get(vm._moId, {}) if sizes else None))
+        return records
+
+    def host_inventory(
+        self, details: bool = False, container: Any = None, page_size: int = 1000
+    ) -> List[Tuple[vim.HostSystem, Mapping]]:
+        """
+        Hardware, health and load of all the hosts in one bulk collection of narrow paths
+
+        config is never collected whole: config.product only (see extractors.HOST_HARDWARE).
+
+        Example:
+            for host, infos in client.host_inventory(details=True):
+                print(infos["name"], infos["model"], infos["connection_state"], len(infos["nics"]))
+
+        Args:
+            details: second call for the sensors, NICs and HBAs of the connected hosts (HOST_DETAILS)
+        """
+        hosts = list(self.extract_all(HOST_HARDWARE, container, page_size))
+        if not details:
+            return hosts
+
+        _, plan = self._plan(HOST_DETAILS)
+        connected = [
+            host for host, infos in hosts
+            if infos["connection_state"] == vim.HostSystem.ConnectionState.connected
+        ]
+        props = retrieve_many(self.content, connected, vim.HostSystem, plan.path_set)
+        for host, infos in hosts:
+            # empty lists for the hosts not connected
+            infos.update(plan(props.get(host._moId, {}), host._moId))
+        return hosts
+
     @typic.al
     def get_all_folders(self) -> List[vim.Folder]:
         """Return List of folders children"""
@@ -509,33 +1592,18 @@ class Client:
     @typic.al
     def get_vm_roles(self, vm: vim.VirtualMachine) -> List[Any]:
         roles_by_value = EffectiveRoles.to_dict(True)
-        roles = []
-        for role in vm.effectiveRole:
-            roles.append(roles_by_value[role])
-        return roles
+        effective_roles = vm.effectiveRole
+        if any(role not in roles_by_value for role in effective_roles):
+            # custom roles: names of roleList, the built-in names are kept
+            for custom in self.roles:
+                roles_by_value.setdefault(custom.roleId, custom.name)
+        return [roles_by_value[role] for role in effective_roles]
 
     def get_cluster_infos(self, cluster) -> Mapping:
-        return {
-            "name": cluster.name,
-            "totalCpu": cluster.summary.totalCpu,
-            "numCpuCores": cluster.summary.numCpuCores,
-            "totalMemory": cluster.summary.totalMemory,
-            "numCpuThreads": cluster.summary.numCpuThreads,
-            "effectiveCpu": cluster.summary.effectiveCpu,
-            "effectiveMemory": cluster.summary.effectiveMemory,
-            "numHosts": cluster.summary.numHosts,
-            "numEffectiveHosts": cluster.summary.numEffectiveHosts,
-        }
+        return self.extract(cluster, CLUSTER_INFOS)
 
     def get_host_infos(self, host) -> Mapping:
-        product = host.config.product
-        return {
-            "name": host.name,
-            "managementServerIp": host.summary.managementServerIp,
-            "fullName": product.fullName,  # 'VMware ESXi 6.0.0 build-10474991',
-            "version": product.version,  # '6.0.0',
-            "apiVersion": product.apiVersion,  # '6.0',
-        }
+        return self.extract(host, HOST_INFOS)
 
     def get_pool_infos(self, pool) -> Mapping:
         return {
@@ -559,122 +1627,23 @@ class Client:
             'maintenance_mode': 'normal'
         }
         """
-
-        ds_capacity = datastore.summary.capacity
-        ds_freespace = datastore.summary.freeSpace
-        ds_uncommitted = datastore.summary.uncommitted or 0
-
-        return {
-            "id": datastore._moId,
-            "name": datastore.name,
-            "capacity": ds_capacity,
-            "freespace": ds_freespace,
-            "uncommitted": ds_uncommitted,
-            "provisioned": (ds_capacity - ds_freespace) + ds_uncommitted,
-            "type": datastore.summary.type,
-            "accessible": datastore.summary.accessible,
-            "maintenance_mode": datastore.summary.maintenanceMode
-        }
+        return self.extract(datastore, DATASTORE_INFOS)
 
     @typic.al
     def get_custom_fields(self, vm: vim.VirtualMachine) -> Mapping:
-        fields = {}
-        for availableField in vm.availableField:
+        return custom_fields(vm.availableField, vm.customValue)
 
-            if availableField.managedObjectType != vim.VirtualMachine:
-                continue
-
-            for customValue in vm.customValue:
-                if availableField.key == customValue.key:
-                    fields[availableField.name] = customValue.value
+    def get_tags(self, obj: Any) -> Mapping:
+        """Tags {category name: [tag name]} of a managed object (see tagging)"""
+        return self.tagging.tags_by_object([obj])[obj._moId]
 
-        return fields
-
-    @typic.al
     @typic.al
     def getNICs(self, vm: vim.VirtualMachine) -> Mapping:
-        nics = {}
-        for nic in vm.guest.net:
-            if nic.network:  # Only return adapter backed interfaces
-                if nic.ipConfig is not None and nic.ipConfig.ipAddress is not None:
-                    nics[nic.macAddress] = {}  # Use mac as uniq ID for nic
-                    nics[nic.macAddress]['netlabel'] = nic.network
-                    ipconf = nic.ipConfig.ipAddress
-                    i = 0
-                    nics[nic.macAddress]['ipAddress'] = {}
-                    for ip in ipconf:
-                        if ":" not in ip.ipAddress:  # Only grab ipv4 addresses
-                            nics[nic.macAddress]['ipAddress'][i] = ip.ipAddress
-                            nics[nic.macAddress]['prefixLength'] = ip.prefixLength
-                            nics[nic.macAddress]['connected'] = nic.connected
-                            nics[nic.macAddress]['origin'] = ip.origin
-                            nics[nic.macAddress]['state'] = ip.state
-                    i = i+1
-        return nics
+        return nics_infos(vm.guest.net)
 
     @typic.al
     def _get_vm_infos(self, vm: vim.VirtualMachine) -> Mapping:
-
-        vmsum = {
-            "boot_time": None,
-            "create_date": None # Since vSphere API 6.7
-        }
-        vmsum['vm_path_name'] = vm.summary.config.vmPathName # '[LocalDS_0] DC0_H0_VM0/DC0_H0_VM0.vmx'
-
-        vmsum['name'] = vm.name # TODO: vérifier si vm.name et config.name sont toujours pareil
-        vmsum['uuid'] = vm.config.instanceUuid
-        vmsum['bios_uuid'] = vm.config.uuid
-        vmsum['hostname'] = vm.guest.hostName
-
-        vmsum['is_template'] = vm.config.template
-
-        vmsum['diskGB'] = vm.summary.storage.committed / 1024**3
-
-        hardware = vm.config.hardware
-        vmsum['cpu_count'] = hardware.numCPU
-        vmsum['cpu_cores'] = hardware.numCoresPerSocket
-        vmsum['mem_mb'] = hardware.memoryMB
-
-        #vmsum['mem'] = vm.summary.config.memorySizeMB / 1024
-
-        vmsum['ostype'] = vm.config.guestFullName
-
-        vmsum['state'] = vm.summary.runtime.powerState
-
-        vmsum['annotation'] = vm.config.annotation if vm.config.annotation else ''
-
-        if not vm.config.template and getattr(vm.summary.runtime, "bootTime", None):
-            vmsum['boot_time'] = Iso8601.ISO8601Format(vm.summary.runtime.bootTime)
-
-        if getattr(vm.config, "createDate", None):
-            vmsum['create_date'] = Iso8601.ISO8601Format(vm.config.createDate)
-
-        vmsum['guestFamily'] = vm.guest.guestFamily    # 'otherGuestFamily',
-
-        vmsum['toolsVersion'] = vm.guest.toolsVersion  # '2147483647',
-
-        if getattr(vm.guest, 'toolsVersionStatus2', None):
-            vmsum['toolsVersionStatus'] = vm.guest.toolsVersionStatus2
-        elif getattr(vm.guest, 'toolsVersionStatus', None):
-            vmsum['toolsVersionStatus'] = vm.guest.toolsVersionStatus
-
-        if hasattr(vm.guest, 'toolsStatus2'):
-            vmsum['toolsStatus'] = vm.guest.toolsStatus2    # 'toolsOk',
-        elif hasattr(vm.guest, 'toolsStatus'):
-            vmsum['toolsStatus'] = vm.guest.toolsStatus    # 'toolsOk',
-
-        vmsum['toolsRunningStatus'] = vm.guest.toolsRunningStatus    # ?
-        vmsum['guestState'] = vm.guest.guestState      # 'running',
-        vmsum['guestOperationsReady'] = vm.guest.guestOperationsReady # true
-        vmsum['interactiveGuestOperationsReady'] = vm.guest.interactiveGuestOperationsReady    # false,
-        vmsum['guestStateChangeSupported'] = vm.guest.guestStateChangeSupported  # true,
-
-        vmsum['net'] = self.getNICs(vm)
-
-        vmsum['fields'] = self.get_custom_fields(vm)
-
-
-        return vmsum
+        return self.extract(vm, VM_INFOS)
 
     @typic.al
     def get_vm_infos(self, vm: vim.VirtualMachine) -> Mapping:
@@ -682,3 +1651,26 @@ class Client:
             "vm": self._get_vm_infos(vm),
             "properties": self.dump_to_dict(vm)
         }
+
+    def get_inventory_snapshot(self, vms: List[vim.VirtualMachine] = None) -> InventorySnapshot:
+        """
+        Snapshot of the VM_INFOS records of all VMs, keyed by resource_id
+
+        Two bulk collections: the records (extract_all("vm")) and the topology
+        for the resource_ids. The records have no volatile values (quickStats,
+        uptime) so an unchanged VM keeps its content hash between runs.
+
+        Example:
+            previous = InventorySnapshot.load("last-run.json")
+            current = client.get_inventory_snapshot()
+            diff = previous.diff(current)
+            print(diff.added, diff.removed, diff.changed)
+            current.save("last-run.json")
+        """
+        morefs = {vm._moId for vm in vms} if vms is not None else None
+        topology = self.build_topology()
+        return InventorySnapshot.from_records(
+            (topology.resource_id(vm._moId), infos)
+            for vm, infos in self.extract_all("vm")
+            if morefs is None or vm._moId in morefs
+        )
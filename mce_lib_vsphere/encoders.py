@@ -0,0 +1,162 @@
+"""
+JSON encoders of records and collected properties (pyVmomi objects included)
+
+The output is the one of json.dumps(record, cls=ReferenceJSONEncoder):
+managed objects are moref strings ('vim.HostSystem:host-1'), data objects
+are dicts with a _vimtype key and datetimes use Iso8601.ISO8601Format.
+
+Example:
+    encoder = get_encoder()  # orjson, msgspec or json: the first installed
+    payload = encoder.encode(client.get_vm_infos(vm))
+    lines = encoder.encode_lines(props for vm, props in client.collect_properties([vim.VirtualMachine], paths))
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Iterable
+
+from pyVmomi import VmomiSupport, Iso8601
+
+from .store import ReferenceJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+ManagedObject = VmomiSupport.ManagedObject
+DataObject = VmomiSupport.DataObject
+
+
+def format_datetime(dt: datetime) -> str:
+    """Same output as Iso8601.ISO8601Format, without strftime"""
+    offset = dt.utcoffset()
+    if offset is None:
+        # local offset of the host
+        return Iso8601.ISO8601Format(dt)
+    text = "%04d-%02d-%02dT%02d:%02d:%02d" % (dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    if dt.microsecond:
+        text += (".%06d" % dt.microsecond).rstrip("0")
+    minutes = int(offset.total_seconds()) // 60
+    if not minutes:
+        return text + "Z"
+    sign = "-" if minutes < 0 else "+"
+    return text + "%s%02d:%02d" % (sign, *divmod(abs(minutes), 60))
+
+
+def default(obj: Any) -> Any:
+    """Convert a value unknown to the JSON libraries (same rules as ReferenceJSONEncoder)"""
+    if isinstance(obj, ManagedObject):
+        return f"{obj.__class__.__name__}:{obj._moId}"
+    if isinstance(obj, DataObject):
+        result = dict(obj.__dict__)
+        result["_vimtype"] = obj.__class__.__name__
+        return result
+    if isinstance(obj, datetime):
+        return format_datetime(obj)
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("utf-8")
+    if isinstance(obj, type):
+        return obj.__name__
+    if isinstance(obj, (VmomiSupport.ManagedMethod, VmomiSupport.UncallableManagedMethod)):
+        return getattr(obj, "name", str(obj))
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonEncoder:
+    """Standard library json - always available"""
+
+    name = "json"
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, cls=ReferenceJSONEncoder, separators=(",", ":")).encode("utf-8")
+
+    def encode_lines(self, records: Iterable[Any]) -> bytes:
+        """Newline-delimited JSON of records"""
+        return b"".join(self.encode(record) + b"\n" for record in records)
+
+
+class OrjsonEncoder(JsonEncoder):
+    """orjson - datetimes are passed to default to keep the ISO8601Format output"""
+
+    name = "orjson"
+
+    def __init__(self):
+        self.option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=default, option=self.option)
+
+    def encode_lines(self, records: Iterable[Any]) -> bytes:
+        option = self.option | orjson.OPT_APPEND_NEWLINE
+        return b"".join(orjson.dumps(record, default=default, option=option) for record in records)
+
+
+def _convert_datetimes(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return format_datetime(obj)
+    if isinstance(obj, dict):
+        return {key: _convert_datetimes(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_datetimes(value) for value in obj]
+    return obj
+
+
+class MsgspecEncoder(JsonEncoder):
+    """msgspec - datetimes are converted before the encoding
+
+    msgspec encode datetimes itself (trailing zeros of microseconds, no
+    offset for naive datetimes): the datetimes of the records, nested
+    ones included, are converted with ISO8601Format by a walk of the record.
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        self.encoder = msgspec.json.Encoder(enc_hook=self._hook)
+
+    @staticmethod
+    def _hook(obj: Any) -> Any:
+        if isinstance(obj, DataObject):
+            result = {
+                key: _convert_datetimes(value) if isinstance(value, (datetime, list, dict)) else value
+                for key, value in obj.__dict__.items()
+            }
+            result["_vimtype"] = obj.__class__.__name__
+            return result
+        return default(obj)
+
+    def encode(self, obj: Any) -> bytes:
+        return self.encoder.encode(_convert_datetimes(obj))
+
+    def encode_lines(self, records: Iterable[Any]) -> bytes:
+        buffer = bytearray()
+        for record in records:
+            self.encoder.encode_into(_convert_datetimes(record), buffer, -1)
+            buffer.extend(b"\n")
+        return bytes(buffer)
+
+
+ENCODERS = {
+    "orjson": (OrjsonEncoder, orjson),
+    "msgspec": (MsgspecEncoder, msgspec),
+    "json": (JsonEncoder, json),
+}
+
+
+def get_encoder(name: str = "auto") -> JsonEncoder:
+    """Encoder by name (orjson, msgspec, json) - auto: the fastest installed"""
+    if name == "auto":
+        name = next(name for name, (_, module) in ENCODERS.items() if module is not None)
+    if name not in ENCODERS:
+        raise ValueError(f"unknown encoder [{name}] - choices: {', '.join(ENCODERS)}")
+    encoder_class, module = ENCODERS[name]
+    if module is None:
+        raise ImportError(f"encoder [{name}] require the {name} package")
+    return encoder_class()
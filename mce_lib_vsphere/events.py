@@ -0,0 +1,70 @@
+from collections import namedtuple
+from datetime import datetime
+from typing import List, Any
+
+from pyVmomi import vim
+
+# Lightweight copy of a vim.event.Event: morefs and names instead of pyVmomi objects
+EventRecord = namedtuple("EventRecord", [
+    "key", "chain_id", "type", "created", "user", "message",
+    "datacenter", "host", "vm", "vm_name", "host_name",
+])
+
+# Maximum events by ReadNextEvents call
+MAX_BATCH_SIZE = 1000
+
+
+def _argument(event, name: str, attr: str):
+    argument = getattr(event, name, None)
+    obj = getattr(argument, attr, None) if argument else None
+    return obj._moId if obj is not None else None
+
+
+def event_type(event) -> str:
+    """Type of an event: class name (VmPoweredOnEvent) or eventTypeId of EventEx/ExtendedEvent"""
+    return getattr(event, "eventTypeId", None) or event._wsdlName
+
+
+def to_record(event: vim.event.Event) -> EventRecord:
+    return EventRecord(
+        key=event.key,
+        chain_id=event.chainId,
+        type=event_type(event),
+        created=event.createdTime,
+        user=event.userName or None,
+        message=event.fullFormattedMessage,
+        datacenter=_argument(event, "datacenter", "datacenter"),
+        host=_argument(event, "host", "host"),
+        vm=_argument(event, "vm", "vm"),
+        vm_name=event.vm.name if event.vm else None,
+        host_name=event.host.name if event.host else None,
+    )
+
+
+def build_filter_spec(
+    event_types: List[Any] = None,
+    entity: vim.ManagedEntity = None,
+    recursion: str = "all",
+    begin_time: datetime = None,
+    end_time: datetime = None,
+    users: List[str] = None,
+) -> vim.event.EventFilterSpec:
+    """EventFilterSpec of the server side filters
+
+    Args:
+        event_types: event classes (vim.event.VmPoweredOnEvent) or type names ("VmPoweredOnEvent")
+        recursion: all, children or self (events of entity only)
+    """
+    spec = vim.event.EventFilterSpec()
+    if event_types:
+        spec.eventTypeId = [
+            event_type if isinstance(event_type, str) else event_type._wsdlName
+            for event_type in event_types
+        ]
+    if entity is not None:
+        spec.entity = vim.event.EventFilterSpec.ByEntity(entity=entity, recursion=recursion)
+    if begin_time or end_time:
+        spec.time = vim.event.EventFilterSpec.ByTime(beginTime=begin_time, endTime=end_time)
+    if users:
+        spec.userName = vim.event.EventFilterSpec.ByUsername(userList=users, systemUser=False)
+    return spec
@@ -5,6 +5,11 @@ __all__ = [
     "NotPoweredError",
     "NotValidToolsError",
     "AuthenticationError",
+    "ReplayError",
+    "UnknownCounterError",
+    "TaskError",
+    "TaskCancelledError",
+    "TaskTimeoutError",
 ]
 
 class FatalError(Exception):
@@ -30,3 +35,31 @@ class NotValidToolsError(FatalError):
 class AuthenticationError(FatalError):
     pass
 
+
+class ReplayError(FatalError):
+    pass
+
+
+class UnknownCounterError(FatalError):
+    pass
+
+
+class TaskError(FatalError):
+    """Task in error - fault: the vmodl.MethodFault of the task"""
+
+    def __init__(self, message: str, task=None, fault=None):
+        super().__init__(message)
+        self.task = task
+        self.fault = fault
+
+
+class TaskCancelledError(TaskError):
+    pass
+
+
+class TaskTimeoutError(TaskError):
+    """Tasks not completed before the timeout - tasks: the running tasks"""
+
+    def __init__(self, message: str, tasks=None):
+        super().__init__(message)
+        self.tasks = tasks or []
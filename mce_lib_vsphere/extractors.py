@@ -0,0 +1,359 @@
+"""
+Declarative info extractors: output field -> property path (+ transform)
+
+An Extractor compiles, once by API version, to a Plan: the minimal path
+set of a PropertySpec and a mapper of the collected properties
+({path: value}) to the info dict. The same plan serves one object
+(Client.extract) and bulk collections (Client.extract_all).
+
+Example:
+    plan = VM_INFOS.compile("vim.version.version11")
+    plan.path_set  # ['summary.config.vmPathName', 'name', 'config.instanceUuid', ...]
+    for vm, props in client.collect_properties([vim.VirtualMachine], plan.path_set):
+        infos = plan(props, vm._moId)
+
+Plans only hold names and module functions: they can be pickled (process pools).
+"""
+
+from typing import Any, Callable, List, Mapping, Tuple
+
+from pyVmomi import vim, Iso8601
+
+from .capabilities import is_supported
+
+# Pseudo path of the managed object id
+MOREF = "@moref"
+
+
+class Field:
+    """Output field from one or several property paths
+
+    Args:
+        paths: property paths, values passed to transform in this order
+        transform: function of the values (default: the value of the first path)
+        first: paths are fallbacks, the value is the first truthy value (then transform)
+        omit_none: the field is missing from the output if its value is None
+    """
+
+    __slots__ = ("paths", "transform", "first", "omit_none")
+
+    def __init__(self, *paths: str, transform: Callable = None, first: bool = False, omit_none: bool = False):
+        self.paths = paths
+        self.transform = transform
+        self.first = first
+        self.omit_none = omit_none
+
+
+class Plan:
+    """Compiled extractor: path_set to collect and mapper of the collected properties"""
+
+    def __init__(self, type_name: str, path_set: List[str], fields: List[Tuple]):
+        self.type_name = type_name
+        self.path_set = path_set
+        # (name, [(path, attrs)], transform, first, omit_none)
+        self.fields = fields
+
+    @staticmethod
+    def _resolve(props: Mapping, moref: str, path: str, attrs: Tuple[str]) -> Any:
+        if path is None:
+            # not supported by the API version
+            return None
+        if path == MOREF:
+            return moref
+        value = props.get(path)
+        for attr in attrs:
+            if value is None:
+                return None
+            value = getattr(value, attr, None)
+        return value
+
+    def __call__(self, props: Mapping, moref: str = None) -> Mapping:
+        result = {}
+        resolve = self._resolve
+        for name, resolvers, transform, first, omit_none in self.fields:
+            if first:
+                value = None
+                for path, attrs in resolvers:
+                    value = resolve(props, moref, path, attrs)
+                    if value:
+                        break
+                if transform is not None:
+                    value = transform(value)
+            elif transform is not None:
+                value = transform(*(resolve(props, moref, path, attrs) for path, attrs in resolvers))
+            else:
+                path, attrs = resolvers[0]
+                value = resolve(props, moref, path, attrs)
+            if value is None and omit_none:
+                continue
+            result[name] = value
+        return result
+
+
+class Extractor:
+    """Info shape of a managed object type: {output field: Field}"""
+
+    def __init__(self, object_type: Any, fields: Mapping[str, Field]):
+        self.object_type = object_type
+        self.fields = fields
+        self._plans = {}
+
+    def compile(self, version: str = None) -> Plan:
+        """Plan for a pyVmomi version (vim.version.version11) - paths missing from version are dropped
+
+        Client.extract use the version of the endpoint (Client.capabilities).
+        """
+        plan = self._plans.get(version)
+        if plan is not None:
+            return plan
+
+        paths = []
+        for field in self.fields.values():
+            for path in field.paths:
+                if path not in paths and path != MOREF and is_supported(self.object_type, path, version):
+                    paths.append(path)
+        # a path under another collected path is read from the value of its ancestor
+        path_set = [
+            path for path in paths
+            if not any(path.startswith(other + ".") for other in paths)
+        ]
+
+        def resolver(path):
+            if not is_supported(self.object_type, path, version):
+                return None, ()
+            if path == MOREF or path in path_set:
+                return path, ()
+            ancestor = next(other for other in path_set if path.startswith(other + "."))
+            return ancestor, tuple(path[len(ancestor) + 1:].split("."))
+
+        fields = [
+            (name, [resolver(path) for path in field.paths], field.transform, field.first, field.omit_none)
+            for name, field in self.fields.items()
+        ]
+        plan = Plan(self.object_type._wsdlName, path_set, fields)
+        self._plans[version] = plan
+        return plan
+
+
+EXTRACTORS = {}
+
+
+def register(name: str, extractor: Extractor) -> Extractor:
+    EXTRACTORS[name] = extractor
+    return extractor
+
+
+def get_extractor(name: str) -> Extractor:
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"unknown extractor [{name}] - choices: {', '.join(EXTRACTORS)}")
+
+
+# Transforms (module functions: picklable)
+
+def iso8601(value):
+    return Iso8601.ISO8601Format(value) if value else None
+
+
+def boot_time(template, value):
+    return Iso8601.ISO8601Format(value) if not template and value else None
+
+
+def gigabytes(value):
+    return value / 1024**3 if value is not None else None
+
+
+def or_empty(value):
+    return value if value else ''
+
+
+def or_zero(value):
+    return value or 0
+
+
+def provisioned(capacity, freespace, uncommitted):
+    return (capacity - freespace) + (uncommitted or 0)
+
+
+def nics_infos(net) -> Mapping:
+    """IPv4 configuration of the adapter backed interfaces by MAC address (vm.guest.net)"""
+    nics = {}
+    for nic in net or []:
+        if nic.network:  # Only return adapter backed interfaces
+            if nic.ipConfig is not None and nic.ipConfig.ipAddress is not None:
+                nics[nic.macAddress] = {}  # Use mac as uniq ID for nic
+                nics[nic.macAddress]['netlabel'] = nic.network
+                ipconf = nic.ipConfig.ipAddress
+                i = 0
+                nics[nic.macAddress]['ipAddress'] = {}
+                for ip in ipconf:
+                    if ":" not in ip.ipAddress:  # Only grab ipv4 addresses
+                        nics[nic.macAddress]['ipAddress'][i] = ip.ipAddress
+                        nics[nic.macAddress]['prefixLength'] = ip.prefixLength
+                        nics[nic.macAddress]['connected'] = nic.connected
+                        nics[nic.macAddress]['origin'] = ip.origin
+                        nics[nic.macAddress]['state'] = ip.state
+                i = i+1
+    return nics
+
+
+def sensors_infos(sensors) -> List[Mapping]:
+    """Numeric sensors of a host (runtime.healthSystemRuntime.systemHealthInfo.numericSensorInfo)"""
+    return [
+        {
+            "name": sensor.name,
+            "type": sensor.sensorType,
+            "state": sensor.healthState.key if sensor.healthState else None,
+            "value": sensor.currentReading * 10 ** sensor.unitModifier,
+            "unit": sensor.baseUnits,
+        }
+        for sensor in sensors or []
+    ]
+
+
+def pnics_infos(pnics) -> List[Mapping]:
+    """Physical NICs of a host (config.network.pnic) - speed in Mb/s, None if the link is down"""
+    return [
+        {
+            "device": pnic.device,
+            "driver": pnic.driver,
+            "mac": pnic.mac,
+            "pci": pnic.pci,
+            "speed": pnic.linkSpeed.speedMb if pnic.linkSpeed else None,
+        }
+        for pnic in pnics or []
+    ]
+
+
+def wwn(value) -> str:
+    return ":".join(f"{value & (2**64 - 1):016x}"[i:i + 2] for i in range(0, 16, 2)) if value else None
+
+
+def hbas_infos(hbas) -> List[Mapping]:
+    """Storage adapters of a host (config.storageDevice.hostBusAdapter) - wwpn of Fibre Channel HBAs"""
+    return [
+        {
+            "device": hba.device,
+            "type": hba._wsdlName,
+            "model": hba.model,
+            "driver": hba.driver,
+            "pci": hba.pci,
+            "status": hba.status,
+            "wwpn": wwn(getattr(hba, "portWorldWideName", None)),
+        }
+        for hba in hbas or []
+    ]
+
+
+def custom_fields(available_fields, custom_values) -> Mapping:
+    """{field name: value} of the VM custom fields"""
+    fields = {}
+    for availableField in available_fields or []:
+
+        if availableField.managedObjectType != vim.VirtualMachine:
+            continue
+
+        for customValue in custom_values or []:
+            if availableField.key == customValue.key:
+                fields[availableField.name] = customValue.value
+
+    return fields
+
+
+VM_INFOS = register("vm", Extractor(vim.VirtualMachine, {
+    "boot_time": Field("config.template", "summary.runtime.bootTime", transform=boot_time),
+    "create_date": Field("config.createDate", transform=iso8601),  # Since vSphere API 6.7
+    "vm_path_name": Field("summary.config.vmPathName"),  # '[LocalDS_0] DC0_H0_VM0/DC0_H0_VM0.vmx'
+    "name": Field("name"),
+    "uuid": Field("config.instanceUuid"),
+    "bios_uuid": Field("config.uuid"),
+    "hostname": Field("guest.hostName"),
+    "is_template": Field("config.template"),
+    "diskGB": Field("summary.storage.committed", transform=gigabytes),
+    "cpu_count": Field("config.hardware.numCPU"),
+    "cpu_cores": Field("config.hardware.numCoresPerSocket"),
+    "mem_mb": Field("config.hardware.memoryMB"),
+    "ostype": Field("config.guestFullName"),
+    "state": Field("summary.runtime.powerState"),
+    "annotation": Field("config.annotation", transform=or_empty),
+    "guestFamily": Field("guest.guestFamily"),  # 'otherGuestFamily',
+    "toolsVersion": Field("guest.toolsVersion"),  # '2147483647',
+    "toolsVersionStatus": Field(
+        "guest.toolsVersionStatus2", "guest.toolsVersionStatus", first=True, omit_none=True
+    ),
+    "toolsStatus": Field("guest.toolsStatus2", "guest.toolsStatus", first=True),  # 'toolsOk',
+    "toolsRunningStatus": Field("guest.toolsRunningStatus"),
+    "guestState": Field("guest.guestState"),  # 'running',
+    "guestOperationsReady": Field("guest.guestOperationsReady"),
+    "interactiveGuestOperationsReady": Field("guest.interactiveGuestOperationsReady"),
+    "guestStateChangeSupported": Field("guest.guestStateChangeSupported"),
+    "net": Field("guest.net", transform=nics_infos),
+    "fields": Field("availableField", "customValue", transform=custom_fields),
+}))
+
+HOST_INFOS = register("host", Extractor(vim.HostSystem, {
+    "name": Field("name"),
+    "managementServerIp": Field("summary.managementServerIp"),
+    "fullName": Field("config.product.fullName"),  # 'VMware ESXi 6.0.0 build-10474991',
+    "version": Field("config.product.version"),  # '6.0.0',
+    "apiVersion": Field("config.product.apiVersion"),  # '6.0',
+}))
+
+CLUSTER_INFOS = register("cluster", Extractor(vim.ClusterComputeResource, {
+    "name": Field("name"),
+    "totalCpu": Field("summary.totalCpu"),
+    "numCpuCores": Field("summary.numCpuCores"),
+    "totalMemory": Field("summary.totalMemory"),
+    "numCpuThreads": Field("summary.numCpuThreads"),
+    "effectiveCpu": Field("summary.effectiveCpu"),
+    "effectiveMemory": Field("summary.effectiveMemory"),
+    "numHosts": Field("summary.numHosts"),
+    "numEffectiveHosts": Field("summary.numEffectiveHosts"),
+}))
+
+DATASTORE_INFOS = register("datastore", Extractor(vim.Datastore, {
+    "id": Field(MOREF),
+    "name": Field("name"),
+    "capacity": Field("summary.capacity"),
+    "freespace": Field("summary.freeSpace"),
+    "uncommitted": Field("summary.uncommitted", transform=or_zero),
+    "provisioned": Field("summary.capacity", "summary.freeSpace", "summary.uncommitted", transform=provisioned),
+    "type": Field("summary.type"),
+    "accessible": Field("summary.accessible"),
+    "maintenance_mode": Field("summary.maintenanceMode"),
+}))
+
+# Narrow paths of the host hardware, health and load: no config but config.product
+HOST_HARDWARE = register("host_hardware", Extractor(vim.HostSystem, {
+    "id": Field(MOREF),
+    "name": Field("name"),
+    "vendor": Field("summary.hardware.vendor"),
+    "model": Field("summary.hardware.model"),
+    "uuid": Field("summary.hardware.uuid"),
+    "cpu_model": Field("summary.hardware.cpuModel"),
+    "cpu_mhz": Field("summary.hardware.cpuMhz"),
+    "cpu_packages": Field("summary.hardware.numCpuPkgs"),
+    "cpu_cores": Field("summary.hardware.numCpuCores"),
+    "cpu_threads": Field("summary.hardware.numCpuThreads"),
+    "memory": Field("summary.hardware.memorySize"),
+    "nics_count": Field("summary.hardware.numNics"),
+    "hbas_count": Field("summary.hardware.numHBAs"),
+    "cpu_usage_mhz": Field("summary.quickStats.overallCpuUsage"),
+    "memory_usage_mb": Field("summary.quickStats.overallMemoryUsage"),
+    "uptime": Field("summary.quickStats.uptime"),
+    "overall_status": Field("summary.overallStatus"),
+    "connection_state": Field("runtime.connectionState"),
+    "maintenance_mode": Field("runtime.inMaintenanceMode"),
+    "power_state": Field("runtime.powerState"),
+    "full_name": Field("config.product.fullName"),
+    "version": Field("config.product.version"),
+    "build": Field("config.product.build"),
+}))
+
+# Second pass of Client.host_inventory(details=True): large values, connected hosts only
+HOST_DETAILS = register("host_details", Extractor(vim.HostSystem, {
+    "sensors": Field("runtime.healthSystemRuntime.systemHealthInfo.numericSensorInfo", transform=sensors_infos),
+    "nics": Field("config.network.pnic", transform=pnics_infos),
+    "hbas": Field("config.storageDevice.hostBusAdapter", transform=hbas_infos),
+}))
@@ -0,0 +1,163 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Mapping, Iterable, Tuple, Any, List
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Marker for a field missing on one side of a delta
+MISSING = None
+
+
+def _canonical(record: Mapping) -> str:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _hash(data: str) -> str:
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_hash(record: Mapping) -> str:
+    """Stable hash of a record (key order independent)"""
+    return _hash(_canonical(record))
+
+
+def field_deltas(old: Any, new: Any, prefix: str = "") -> Mapping[str, Tuple[Any, Any]]:
+    """Return {dotted field path: (old value, new value)} of changed fields
+
+    Nested mappings are compared field by field, other values as a whole.
+    """
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        deltas = {}
+        for key in old.keys() | new.keys():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in new:
+                deltas[path] = (old[key], MISSING)
+            elif key not in old:
+                deltas[path] = (MISSING, new[key])
+            elif old[key] != new[key]:
+                deltas.update(field_deltas(old[key], new[key], path))
+        return deltas
+    if old != new:
+        return {prefix: (old, new)}
+    return {}
+
+
+class InventorySnapshot:
+    """Inventory records keyed by resource_id with a content hash per object
+
+    Example:
+        snapshot = client.get_inventory_snapshot()
+        snapshot.save("inventory.json")
+        ...
+        diff = InventorySnapshot.load("inventory.json").diff(client.get_inventory_snapshot())
+    """
+
+    def __init__(self, created: str = None):
+        self.created = created or datetime.now(timezone.utc).isoformat()
+        self.records: Mapping[str, Mapping] = {}
+        self.hashes: Mapping[str, str] = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, resource_id):
+        return resource_id in self.records
+
+    def __getitem__(self, resource_id):
+        return self.records[resource_id]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, Mapping]]) -> "InventorySnapshot":
+        snapshot = cls()
+        for resource_id, record in records:
+            snapshot.add(resource_id, record)
+        return snapshot
+
+    def add(self, resource_id: str, record: Mapping):
+        # stored as JSON types so a loaded snapshot compares equal to a live one
+        data = _canonical(record)
+        self.records[resource_id] = json.loads(data)
+        self.hashes[resource_id] = _hash(data)
+
+    def to_dict(self) -> Mapping:
+        return {
+            "version": SNAPSHOT_FORMAT_VERSION,
+            "created": self.created,
+            "objects": {
+                resource_id: {"hash": self.hashes[resource_id], "data": record}
+                for resource_id, record in self.records.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "InventorySnapshot":
+        if data.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"unsupported snapshot version [{data.get('version')}]")
+        snapshot = cls(created=data["created"])
+        for resource_id, obj in data["objects"].items():
+            snapshot.records[resource_id] = obj["data"]
+            snapshot.hashes[resource_id] = obj["hash"]
+        return snapshot
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(self.to_dict(), fp, default=str)
+
+    @classmethod
+    def load(cls, path: str) -> "InventorySnapshot":
+        with open(path, encoding="utf-8") as fp:
+            return cls.from_dict(json.load(fp))
+
+    def diff(self, other: "InventorySnapshot") -> "InventoryDiff":
+        """Changes from this snapshot to other"""
+        return diff_snapshots(self, other)
+
+
+class InventoryDiff:
+    """Result of diff_snapshots"""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        self.changed: Mapping[str, Mapping[str, Tuple[Any, Any]]] = {}
+        self.unchanged: int = 0
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def to_dict(self) -> Mapping:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": {
+                resource_id: {field: {"old": old, "new": new} for field, (old, new) in deltas.items()}
+                for resource_id, deltas in self.changed.items()
+            },
+            "unchanged": self.unchanged,
+        }
+
+
+def diff_snapshots(old: InventorySnapshot, new: InventorySnapshot) -> InventoryDiff:
+    """Report added, removed and changed objects between two snapshots
+
+    Objects with the same content hash are skipped without comparing their fields.
+    """
+    diff = InventoryDiff()
+    old_hashes, new_hashes = old.hashes, new.hashes
+
+    for resource_id, new_hash in new_hashes.items():
+        old_hash = old_hashes.get(resource_id)
+        if old_hash is None:
+            diff.added.append(resource_id)
+        elif old_hash == new_hash:
+            diff.unchanged += 1
+        else:
+            deltas = field_deltas(old.records[resource_id], new.records[resource_id])
+            if deltas:
+                diff.changed[resource_id] = deltas
+            else:
+                diff.unchanged += 1
+
+    diff.removed = [resource_id for resource_id in old_hashes if resource_id not in new_hashes]
+    return diff
@@ -0,0 +1,361 @@
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import namedtuple, defaultdict
+from typing import Mapping, List, Callable
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# kind: "method" (Client method), "soap" (SOAP operation), "accessor" (lazy property fetch)
+#   or "retry" (call sent again, e.g. a tagging request after a new login)
+# moref: managed object of an accessor event
+CallEvent = namedtuple("CallEvent", [
+    "kind", "name", "duration", "request_bytes", "response_bytes", "error", "client_method", "moref"
+], defaults=[None])
+
+# Client method at the origin of the current calls (outermost instrumented method)
+current_method = contextvars.ContextVar("mce_vsphere_current_method", default=None)
+
+_local = threading.local()
+
+
+class Histogram:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def to_dict(self) -> Mapping:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(zip(self.buckets + ("+Inf",), self.counts))}
+
+
+class MetricsRegistry:
+    """Hook collecting per Client method and per SOAP operation metrics
+
+    Example:
+        registry = client.enable_metrics()
+        client.get_vm_infos(vm)
+        registry.to_dict()["methods"]["get_vm_infos"]["soap_calls"]
+        print(registry.to_prometheus())
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.methods = defaultdict(lambda: Histogram(self.buckets))
+        self.operations = defaultdict(lambda: Histogram(self.buckets))
+        self.method_soap_calls = defaultdict(int)
+        self.method_lazy_fetches = defaultdict(int)
+        self.request_bytes = defaultdict(int)
+        self.response_bytes = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.lazy_fetches = defaultdict(int)
+        self.method_retries = defaultdict(int)
+        self.retries = defaultdict(int)
+
+    def __call__(self, event: CallEvent):
+        with self.lock:
+            if event.kind == "method":
+                self.methods[event.name].observe(event.duration)
+            elif event.kind == "soap":
+                self.operations[event.name].observe(event.duration)
+                self.request_bytes[event.name] += event.request_bytes
+                self.response_bytes[event.name] += event.response_bytes
+                if event.client_method:
+                    self.method_soap_calls[event.client_method] += 1
+            elif event.kind == "accessor":
+                self.lazy_fetches[event.name] += 1
+                if event.client_method:
+                    self.method_lazy_fetches[event.client_method] += 1
+            elif event.kind == "retry":
+                self.retries[event.name] += 1
+                if event.client_method:
+                    self.method_retries[event.client_method] += 1
+            if event.error:
+                self.errors[event.name] += 1
+
+    def to_dict(self) -> Mapping:
+        with self.lock:
+            return {
+                "methods": {
+                    name: dict(
+                        histogram.to_dict(),
+                        soap_calls=self.method_soap_calls.get(name, 0),
+                        lazy_fetches=self.method_lazy_fetches.get(name, 0),
+                        retries=self.method_retries.get(name, 0),
+                    )
+                    for name, histogram in self.methods.items()
+                },
+                "operations": {
+                    name: dict(
+                        histogram.to_dict(),
+                        request_bytes=self.request_bytes[name],
+                        response_bytes=self.response_bytes[name],
+                    )
+                    for name, histogram in self.operations.items()
+                },
+                "lazy_fetches": dict(self.lazy_fetches),
+                "retries": dict(self.retries),
+                "errors": dict(self.errors),
+            }
+
+    def to_prometheus(self, prefix: str = "mce_vsphere") -> str:
+        """Metrics in Prometheus text exposition format"""
+        lines = []
+
+        def histogram(name, label, values):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for value, hist in sorted(values.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_{name}_sum{{{label}="{value}"}} {hist.sum}')
+                lines.append(f'{prefix}_{name}_count{{{label}="{value}"}} {hist.count}')
+
+        def counter(name, label, values):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for value, count in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{{label}="{value}"}} {count}')
+
+        with self.lock:
+            histogram("method_duration_seconds", "method", self.methods)
+            counter("method_soap_calls_total", "method", self.method_soap_calls)
+            counter("method_lazy_fetches_total", "method", self.method_lazy_fetches)
+            counter("method_retries_total", "method", self.method_retries)
+            histogram("soap_duration_seconds", "operation", self.operations)
+            counter("soap_request_bytes_total", "operation", self.request_bytes)
+            counter("soap_response_bytes_total", "operation", self.response_bytes)
+            counter("errors_total", "name", self.errors)
+            counter("lazy_fetches_total", "property", self.lazy_fetches)
+            counter("retries_total", "name", self.retries)
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryHook:
+    """Hook recording events with an OpenTelemetry meter
+
+    Require the opentelemetry-api package.
+
+    Example:
+        from opentelemetry import metrics
+        client.add_metrics_hook(OpenTelemetryHook(metrics.get_meter("mce_lib_vsphere")))
+    """
+
+    def __init__(self, meter):
+        self.durations = meter.create_histogram("mce_vsphere.duration", unit="s")
+        self.request_bytes = meter.create_counter("mce_vsphere.soap.request_bytes", unit="By")
+        self.response_bytes = meter.create_counter("mce_vsphere.soap.response_bytes", unit="By")
+        self.calls = meter.create_counter("mce_vsphere.calls")
+
+    def __call__(self, event: CallEvent):
+        attributes = {"kind": event.kind, "name": event.name, "method": event.client_method or ""}
+        self.calls.add(1, attributes)
+        if event.kind == "retry":
+            return
+        self.durations.record(event.duration, attributes)
+        if event.kind == "soap":
+            self.request_bytes.add(event.request_bytes, attributes)
+            self.response_bytes.add(event.response_bytes, attributes)
+
+
+class _CountingResponse:
+    """Count bytes read from an HTTP response"""
+
+    def __init__(self, response):
+        self._response = response
+
+    def read(self, *args):
+        data = self._response.read(*args)
+        _local.response_bytes = getattr(_local, "response_bytes", 0) + len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+def _counting_scheme(scheme):
+
+    def factory(*args, **kwargs):
+        conn = scheme(*args, **kwargs)
+        getresponse = conn.getresponse
+        conn.getresponse = lambda *a, **kw: _CountingResponse(getresponse(*a, **kw))
+        return conn
+
+    factory._mce_original = scheme
+    return factory
+
+
+def _emit(hooks: List[Callable], event: CallEvent):
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception as err:  # a broken hook must never break the call
+            logger.warning(f"metrics hook error: {err}")
+
+
+def record_retry(hooks: List[Callable], name: str):
+    """Send a "retry" CallEvent to hooks: the call name is sent again"""
+    _emit(hooks, CallEvent("retry", name, 0.0, 0, 0, False, current_method.get()))
+
+
+class SoapCall:
+    """Context manager sending a "soap" CallEvent to the hooks of an instrumented stub
+
+    For the calls which do not go through stub.InvokeMethod (see parallel.invoke_raw).
+    Not a contextlib generator: pyVmomi faults do not accept the __traceback__ it sets.
+    """
+
+    def __init__(self, stub, name: str):
+        self.stub = stub
+        self.name = name
+
+    def __enter__(self):
+        _local.request_bytes = _local.response_bytes = 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        hooks = getattr(self.stub, "_mce_hooks", None)
+        if hooks is not None:
+            _emit(hooks, CallEvent(
+                "soap", self.name, time.perf_counter() - self.start,
+                _local.request_bytes, _local.response_bytes, exc_type is not None, current_method.get()
+            ))
+        return False
+
+
+def instrument_stub(stub, hooks: List[Callable]):
+    """Patch a pyVmomi SoapStubAdapter instance to send a CallEvent to hooks for each call
+
+    The hooks list is used by reference: hooks added later are called too.
+    """
+    if getattr(stub, "_mce_hooks", None) is not None:
+        stub._mce_hooks = hooks
+        return
+
+    invoke_method = stub.InvokeMethod
+    invoke_accessor = stub.InvokeAccessor
+    serialize_request = stub.SerializeRequest
+
+    def SerializeRequest(mo, info, args):
+        request = serialize_request(mo, info, args)
+        _local.request_bytes = len(request)
+        return request
+
+    def InvokeMethod(mo, info, args, *extra):
+        with SoapCall(stub, info.wsdlName):
+            return invoke_method(mo, info, args, *extra)
+
+    def InvokeAccessor(mo, info):
+        start, error = time.perf_counter(), False
+        try:
+            return invoke_accessor(mo, info)
+        except Exception:
+            error = True
+            raise
+        finally:
+            _emit(stub._mce_hooks, CallEvent(
+                "accessor", f"{mo._wsdlName}.{info.name}", time.perf_counter() - start,
+                0, 0, error, current_method.get(), mo._moId
+            ))
+
+    stub._mce_hooks = hooks
+    stub.SerializeRequest = SerializeRequest
+    stub.InvokeMethod = InvokeMethod
+    stub.InvokeAccessor = InvokeAccessor
+    if hasattr(stub, "scheme"):
+        stub.scheme = _counting_scheme(stub.scheme)
+        stub.DropConnections()
+
+
+def uninstrument_stub(stub):
+    if getattr(stub, "_mce_hooks", None) is None:
+        return
+    for name in ("SerializeRequest", "InvokeMethod", "InvokeAccessor"):
+        stub.__dict__.pop(name, None)
+    if hasattr(getattr(stub, "scheme", None), "_mce_original"):
+        stub.scheme = stub.scheme._mce_original
+        stub.DropConnections()
+    stub._mce_hooks = None
+
+
+def _timed_iteration(generator, name: str, start: float, emit: Callable, outermost: bool):
+    """Iterate on generator, name being the current method while it runs, emit when it ends"""
+    error = False
+    try:
+        while True:
+            token = current_method.set(name) if current_method.get() is None else None
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                if token is not None:
+                    current_method.reset(token)
+            yield item
+    except Exception:
+        error = True
+        raise
+    finally:
+        generator.close()
+        if outermost:
+            emit(start, error)
+
+
+def instrument_method(func, name: str, hooks: List[Callable]):
+    """Wrap a (bound) Client method to time it and attribute SOAP calls to it
+
+    A method returning a generator (power_on_vms returns the one of _run_bulk)
+    does the work while the caller consumes it: it is timed until the end of the iteration.
+    """
+
+    def emit(start, error):
+        _emit(hooks, CallEvent("method", name, time.perf_counter() - start, 0, 0, error, name))
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # the method is only current while the generator runs, not while the caller consumes it
+            outermost = current_method.get() is None
+            yield from _timed_iteration(func(*args, **kwargs), name, time.perf_counter(), emit, outermost)
+        return wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if current_method.get() is not None:
+            return func(*args, **kwargs)
+        token = current_method.set(name)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            emit(start, True)
+            raise
+        finally:
+            current_method.reset(token)
+        if inspect.isgenerator(result):
+            return _timed_iteration(result, name, start, emit, True)
+        emit(start, False)
+        return result
+    return wrapper
@@ -0,0 +1,168 @@
+"""
+Process pool stage: parse, transform and encode collected properties on all cores
+
+The pages of a bulk collection (RetrievePropertiesEx) are shipped to the
+workers as the raw SOAP responses: the compact picklable form of the
+results, without any pyVmomi object. The collecting process only does
+the HTTP round trips and reads the continuation token of each page; the
+workers deserialize the page, run the extractor plan and the encoder.
+Results are yielded in collection order.
+
+Example:
+    for moref, line in client.extract_parallel("vm", encoder="orjson", page_size=500):
+        fp.write(line + b"\\n")
+"""
+
+import gzip
+import http.client
+import io
+import os
+import re
+import socket
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Iterator, List, Tuple
+from xml.sax.saxutils import unescape
+
+from pyVmomi import SoapAdapter, vmodl
+
+from .encoders import get_encoder
+from .extractors import Plan
+from .metrics import SoapCall
+
+# objects by page (RetrieveOptions.maxObjects): the unit of work of the pool
+CHUNK_SIZE = 500
+
+# token: first child of the returnval element, before the objects
+_TOKEN_RE = re.compile(rb"<returnval[^>]*>\s*<token>([^<]*)</token>")
+
+collector = vmodl.query.PropertyCollector
+
+
+def invoke_raw(stub, mo: Any, method: str, *args) -> bytes:
+    """SOAP response of a method call, not deserialized - faults are raised
+
+    Same request and connection handling as stub.InvokeMethod (session
+    cookie, compression, metrics of an instrumented stub).
+    """
+    info = mo._GetMethodInfo(method)
+    headers = {
+        "Cookie": stub.cookie,
+        "SOAPAction": stub.versionId,
+        "Content-Type": f"text/xml; charset={SoapAdapter.XML_ENCODING}",
+    }
+    if stub._acceptCompressedResponses:
+        headers["Accept-Encoding"] = "gzip, deflate"
+    with SoapCall(stub, info.wsdlName):
+        request = stub.SerializeRequest(mo, info, args)
+        for modifier in stub.requestModifierList:
+            request = modifier(request)
+        conn = stub.GetConnection()
+        try:
+            conn.request("POST", stub.path, request, headers)
+            response = conn.getresponse()
+        except (socket.error, http.client.HTTPException):
+            # the server is probably sick, drop all of the cached connections
+            stub.DropConnections()
+            raise
+        cookie = response.getheader("set-cookie") or response.getheader("Set-Cookie")
+        if cookie:
+            stub.cookie = cookie
+        if response.status not in (200, 500):
+            stub._CloseConnection(conn)
+            raise http.client.HTTPException(f"{response.status} {response.reason}")
+        try:
+            body = response.read()
+            encoding = (response.getheader("Content-Encoding") or "identity").lower()
+            if encoding == "gzip":
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+        except Exception:
+            stub._CloseConnection(conn)
+            stub.DropConnections()
+            raise
+        stub.ReturnConnection(conn)
+        if response.status == 500:
+            raise parse_response(body, info.result, stub.version)
+    return body
+
+
+def parse_response(body: bytes, result_type: Any, version: str) -> Any:
+    """Deserialize a SOAP response - managed objects have no stub"""
+    deserializer = SoapAdapter.SoapResponseDeserializer(None)
+    deserializer.deser.version = version
+    return deserializer.Deserialize(io.BytesIO(body), result_type)
+
+
+def page_token(body: bytes) -> str:
+    """Continuation token of a RetrievePropertiesEx response or None (last page)"""
+    start = body.find(b"<returnval")
+    match = _TOKEN_RE.match(body, start) if start >= 0 else None
+    return unescape(match.group(1).decode("utf-8")) if match else None
+
+
+_ENCODERS = {}
+
+
+def transform_page(body: bytes, version: str, plan: Plan = None, encoder: str = None) -> List[Tuple[str, Any]]:
+    """Worker: [(moref, plan(props))] of a RetrievePropertiesEx response, encoded if encoder"""
+    result = parse_response(body, collector.RetrieveResult, version)
+    records = []
+    for obj_content in result.objects if result else []:
+        props = {prop.name: prop.val for prop in obj_content.propSet}
+        records.append((obj_content.obj._moId, plan(props, obj_content.obj._moId) if plan is not None else props))
+    if encoder is None:
+        return records
+    json_encoder = _ENCODERS.get(encoder)
+    if json_encoder is None:
+        json_encoder = _ENCODERS[encoder] = get_encoder(encoder)
+    return [(moref, json_encoder.encode(record)) for moref, record in records]
+
+
+def transform_pages(
+    property_collector: Any,
+    filter_spec: Any,
+    plan: Plan = None,
+    encoder: str = None,
+    page_size: int = CHUNK_SIZE,
+    workers: int = None,
+    executor: Executor = None,
+) -> Iterator[Tuple[str, Any]]:
+    """
+    (moref, plan(props)) of a bulk collection, in collection order - see Client.extract_parallel
+
+    Pages are requested while the workers run: at most 2 pages by worker
+    wait for a result.
+    """
+    workers = workers or os.cpu_count() or 1
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    stub = property_collector._stub
+    pending = deque()
+    token = None
+    try:
+        body = invoke_raw(
+            stub, property_collector, "RetrievePropertiesEx", [filter_spec], collector.RetrieveOptions(maxObjects=page_size)
+        )
+        while True:
+            token = page_token(body)
+            pending.append(executor.submit(transform_page, body, stub.version, plan, encoder))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            if not token:
+                break
+            body = invoke_raw(stub, property_collector, "ContinueRetrievePropertiesEx", token)
+            token = None
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        if token:
+            # generator closed before the end of pages
+            property_collector.CancelRetrievePropertiesEx(token)
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
@@ -0,0 +1,193 @@
+"""
+Performance metrics with the PerformanceManager (QueryPerf)
+
+Example:
+    series = client.query_perf(client.get_all_hosts(), ["cpu.usage.average", "mem.usage.average"])
+    for (moref, counter, instance), ts in series.items():
+        print(moref, counter, ts.timestamps[-1], ts.values[-1])
+
+Values are returned as numpy arrays when numpy is installed
+(pip install mce-lib-vsphere[perf]), as array.array otherwise.
+"""
+
+import array
+import itertools
+from datetime import datetime
+from typing import List, Mapping, Tuple, Any, Iterator
+
+from pyVmomi import vim
+
+from .exceptions import UnknownCounterError
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Sampling period of the real-time statistics (seconds)
+REALTIME_INTERVAL = 20
+
+# vpxd.stats.maxQueryMetrics: default limit of the vCenter for historical queries
+MAX_QUERY_METRICS = 64
+
+# Entities by QueryPerf call for real-time queries (no server side limit)
+REALTIME_BATCH_SIZE = 500
+
+
+def _array(typecode: str, values) -> Any:
+    if numpy is not None:
+        return numpy.asarray(values, dtype=numpy.float64 if typecode == "d" else numpy.int64)
+    return array.array(typecode, values)
+
+
+class TimeSeries:
+    """Samples of one counter of one entity
+
+    timestamps are epoch seconds (float), values are the raw counter values
+    (-1 for a missing sample, percentages are in hundredths).
+    """
+
+    __slots__ = ("entity", "counter", "instance", "interval", "timestamps", "values")
+
+    def __init__(self, entity: str, counter: str, instance: str, interval: int, timestamps, values):
+        self.entity = entity
+        self.counter = counter
+        self.instance = instance
+        self.interval = interval
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"<TimeSeries {self.entity} {self.counter}[{self.instance}] {len(self)} samples>"
+
+    def to_dict(self) -> Mapping:
+        return {
+            "entity": self.entity,
+            "counter": self.counter,
+            "instance": self.instance,
+            "interval": self.interval,
+            "timestamps": list(self.timestamps),
+            "values": [int(value) for value in self.values],
+        }
+
+
+def counter_name(counter: vim.PerformanceManager.CounterInfo) -> str:
+    """Full name of a counter: group.name.rollup (cpu.usage.average)"""
+    return f"{counter.groupInfo.key}.{counter.nameInfo.key}.{counter.rollupType}"
+
+
+def chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class PerformanceCollector:
+    """QueryPerf for many entities and counters
+
+    Counter ids are read once from perfManager.perfCounter. Query specs are
+    grouped by QueryPerf call so that historical queries stay under the
+    vpxd.stats.maxQueryMetrics limit (entities * counters by call).
+    """
+
+    def __init__(self, perf_manager, max_query_metrics: int = MAX_QUERY_METRICS):
+        self.perf_manager = perf_manager
+        self.max_query_metrics = max_query_metrics
+        self._counters = None
+        self._counter_names = None
+
+    def _load_counters(self):
+        """Load the counters of the vCenter once"""
+        if self._counters is None:
+            self._counters = {counter_name(counter): counter for counter in self.perf_manager.perfCounter}
+            self._counter_names = {counter.key: name for name, counter in self._counters.items()}
+
+    @property
+    def counters(self) -> Mapping[str, vim.PerformanceManager.CounterInfo]:
+        """{counter name: CounterInfo}"""
+        self._load_counters()
+        return self._counters
+
+    def counter_id(self, name: str) -> int:
+        try:
+            return self.counters[name].key
+        except KeyError:
+            raise UnknownCounterError(f"unknown performance counter [{name}]")
+
+    def counter_name(self, counter_id: int) -> str:
+        self._load_counters()
+        return self._counter_names.get(counter_id, str(counter_id))
+
+    def historical_intervals(self) -> Mapping[int, str]:
+        """{sampling period in seconds: name} of the historical intervals (300: 'Past day', ...)"""
+        return {interval.samplingPeriod: interval.name for interval in self.perf_manager.historicalInterval}
+
+    def build_query_specs(
+        self,
+        entities: List[Any],
+        counters: List[str],
+        interval: int = REALTIME_INTERVAL,
+        start: datetime = None,
+        end: datetime = None,
+        max_sample: int = None,
+        instance: str = "",
+    ) -> List[List[vim.PerformanceManager.QuerySpec]]:
+        """QuerySpec lists, one list by QueryPerf call"""
+        metric_ids = [
+            vim.PerformanceManager.MetricId(counterId=self.counter_id(name), instance=instance)
+            for name in counters
+        ]
+        specs = [
+            vim.PerformanceManager.QuerySpec(
+                entity=entity, metricId=metric_ids, intervalId=interval,
+                startTime=start, endTime=end, maxSample=max_sample, format="normal",
+            )
+            for entity in entities
+        ]
+        if interval == REALTIME_INTERVAL or self.max_query_metrics <= 0:
+            batch_size = REALTIME_BATCH_SIZE
+        else:
+            batch_size = max(1, self.max_query_metrics // max(1, len(metric_ids)))
+        return list(chunks(specs, batch_size))
+
+    def query(
+        self,
+        entities: List[Any],
+        counters: List[str],
+        interval: int = REALTIME_INTERVAL,
+        start: datetime = None,
+        end: datetime = None,
+        max_sample: int = None,
+        instance: str = "",
+    ) -> Mapping[Tuple[str, str, str], TimeSeries]:
+        """{(entity moref, counter name, instance): TimeSeries}
+
+        Args:
+            counters: counter names (cpu.usage.average, mem.usage.average, ...)
+            interval: REALTIME_INTERVAL or a historical sampling period (300, 1800, 7200, 86400)
+            max_sample: last samples only (with start/end: None)
+            instance: "" for the aggregate, "*" for all instances (cpu cores, nics, disks)
+        """
+        series = {}
+        for specs in self.build_query_specs(entities, counters, interval, start, end, max_sample, instance):
+            for entity_metric in self.perf_manager.QueryPerf(specs) or []:
+                series.update(self.parse(entity_metric, interval))
+        return series
+
+    def parse(self, entity_metric: vim.PerformanceManager.EntityMetric, interval: int) -> Mapping:
+        timestamps = _array("d", [sample.timestamp.timestamp() for sample in entity_metric.sampleInfo])
+        moref = entity_metric.entity._moId
+        series = {}
+        for metric_series in entity_metric.value:
+            name = self.counter_name(metric_series.id.counterId)
+            instance = metric_series.id.instance or ""
+            series[(moref, name, instance)] = TimeSeries(
+                moref, name, instance, interval, timestamps, _array("q", metric_series.value)
+            )
+        return series
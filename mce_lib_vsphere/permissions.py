@@ -0,0 +1,188 @@
+"""
+Permissions and roles of the whole inventory, in bulk
+
+Three calls build the index: authorizationManager.roleList (custom roles
+included), RetrieveAllPermissions and one bulk collection of name,
+parent and effectiveRole of the managed entities. Permissions propagate
+from the parents, a permission defined on an object replaces the
+propagated one of the same principal.
+
+A virtual machine also inherits the permissions of its resource pool and
+of its vApp, a vApp those of its folder (INHERITED_PATHS). When several
+parents propagate a permission of the same principal, the privileges of
+the roles are combined: who() shows the role names joined with "+".
+
+Example:
+    index = client.permissions()
+    index.who("vm-42")  # {'VSPHERE.LOCAL\\Administrators': 'Admin', 'DOMAIN\\ops': 'Operator'}
+    index.can("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn", "vm-42")  # True
+    index.where("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn")  # ['vm-42', ...]
+
+Group memberships are not resolved: a principal is a user or a group name.
+"""
+
+from collections import namedtuple
+from typing import Any, Iterable, List, Mapping, Tuple
+
+from pyVmomi import vim
+
+# Lightweight copy of a vim.AuthorizationManager.Role
+Role = namedtuple("Role", ["id", "name", "label", "system", "privileges"])
+
+# Lightweight copy of a vim.AuthorizationManager.Permission
+Permission = namedtuple("Permission", ["entity", "principal", "group", "role_id", "role", "propagate"])
+
+# Properties of the managed entities collected for the index
+PERMISSION_PATHS = ["name", "parent", "effectiveRole"]
+
+# Other parents the permissions propagate from, by type
+INHERITED_PATHS = {
+    vim.VirtualMachine: ["resourcePool", "parentVApp"],
+    vim.VirtualApp: ["parentFolder", "parentVApp"],
+}
+
+# roleId of the system role NoAccess (EffectiveRoles.NO_ACCESS)
+NO_ACCESS = -5
+
+
+def permission_paths(object_types: Iterable[Any]) -> Mapping[Any, List[str]]:
+    """{type: paths} of the index collection: PERMISSION_PATHS and the INHERITED_PATHS of the type"""
+    return {object_type: PERMISSION_PATHS + INHERITED_PATHS.get(object_type, []) for object_type in object_types}
+
+
+def to_role(role: vim.AuthorizationManager.Role) -> Role:
+    return Role(
+        id=role.roleId,
+        name=role.name,
+        label=role.info.label if role.info else role.name,
+        system=role.system,
+        privileges=frozenset(role.privilege or []),
+    )
+
+
+class PermissionIndex:
+    """Who can do what where: permissions of every entity, with the propagation"""
+
+    def __init__(
+        self,
+        roles: Iterable[vim.AuthorizationManager.Role],
+        permissions: Iterable[vim.AuthorizationManager.Permission],
+        entities: Iterable[Tuple[Any, Mapping]],
+    ):
+        """
+        Args:
+            roles: authorizationManager.roleList
+            permissions: authorizationManager.RetrieveAllPermissions()
+            entities: (managed entity, {name, parent, effectiveRole, ...}) - collect_properties
+                of permission_paths
+        """
+        self.roles = {role.roleId: to_role(role) for role in roles}
+        self.names = {}
+        self.types = {}
+        self.parents = {}
+        self.effective = {}
+        for obj, props in entities:
+            moref = obj._moId
+            self.names[moref] = props.get("name")
+            self.types[moref] = obj._wsdlName
+            parents = []
+            for path in ["parent"] + INHERITED_PATHS.get(type(obj), []):
+                parent = props.get(path)
+                if parent is not None and parent._moId not in parents:
+                    parents.append(parent._moId)
+            self.parents[moref] = parents
+            self.effective[moref] = list(props.get("effectiveRole") or [])
+        self.defined = {}
+        for permission in permissions:
+            role = self.roles.get(permission.roleId)
+            moref = permission.entity._moId
+            self.defined.setdefault(moref, {})[permission.principal] = Permission(
+                entity=moref,
+                principal=permission.principal,
+                group=permission.group,
+                role_id=permission.roleId,
+                role=role.name if role else None,
+                propagate=permission.propagate,
+            )
+        self._propagated = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def role_name(self, role_id: int) -> str:
+        role = self.roles.get(role_id)
+        return role.name if role else None
+
+    def _from_parents(self, moref: str) -> Mapping[str, Tuple[Permission, ...]]:
+        """{principal: permissions} propagated to moref by all its parents"""
+        result = {}
+        for parent in self.parents.get(moref, []):
+            for principal, permissions in self._inherited(parent).items():
+                merged = result.get(principal, ())
+                result[principal] = merged + tuple(p for p in permissions if p not in merged)
+        return result
+
+    def _inherited(self, moref: str) -> Mapping[str, Tuple[Permission, ...]]:
+        """{principal: permissions} propagated to the children of moref"""
+        inherited = self._propagated.get(moref)
+        if inherited is None:
+            inherited = self._from_parents(moref)
+            for principal, permission in self.defined.get(moref, {}).items():
+                if permission.propagate:
+                    inherited[principal] = (permission,)
+            self._propagated[moref] = inherited
+        return inherited
+
+    def permissions(self, moref: str) -> Mapping[str, Tuple[Permission, ...]]:
+        """{principal: permissions} applying to an entity, defined on it or propagated
+
+        Several permissions when parents propagate different ones: their privileges are combined.
+        """
+        result = self._from_parents(moref)
+        result.update((principal, (permission,)) for principal, permission in self.defined.get(moref, {}).items())
+        return result
+
+    def _role_names(self, permissions: Tuple[Permission, ...]) -> str:
+        if len(permissions) == 1:
+            return permissions[0].role
+        return "+".join(sorted({str(permission.role) for permission in permissions}))
+
+    def _privileges(self, permissions: Tuple[Permission, ...]) -> frozenset:
+        roles = [self.roles.get(permission.role_id) for permission in permissions]
+        return frozenset().union(*(role.privileges for role in roles if role is not None))
+
+    def who(self, moref: str) -> Mapping[str, str]:
+        """{principal: role name} of an entity - names joined with "+" for combined roles"""
+        return {principal: self._role_names(permissions) for principal, permissions in self.permissions(moref).items()}
+
+    def privileges(self, principal: str, moref: str) -> frozenset:
+        """Privilege ids of a principal on an entity"""
+        return self._privileges(self.permissions(moref).get(principal, ()))
+
+    def can(self, principal: str, privilege: str, moref: str) -> bool:
+        return privilege in self.privileges(principal, moref)
+
+    def where(self, principal: str, privilege: str = None) -> List[str]:
+        """Entities where principal has a role (other than NoAccess), or the privilege"""
+        result = []
+        for moref in self.names:
+            permissions = self.permissions(moref).get(principal)
+            if not permissions:
+                continue
+            if privilege is None:
+                if any(permission.role_id != NO_ACCESS for permission in permissions):
+                    result.append(moref)
+                continue
+            if privilege in self._privileges(permissions):
+                result.append(moref)
+        return result
+
+    def effective_roles(self, moref: str) -> List[str]:
+        """Role names of the user of the session on an entity (effectiveRole)"""
+        return [self.role_name(role_id) for role_id in self.effective.get(moref, [])]
+
+    def matrix(self): # -> Iterator[Tuple[str, str, str]]
+        """(moref, principal, role name) of every entity and principal"""
+        for moref in self.names:
+            for principal, permissions in sorted(self.permissions(moref).items()):
+                yield moref, principal, self._role_names(permissions)
@@ -0,0 +1,76 @@
+from collections import Counter, defaultdict
+from typing import Mapping, List
+
+from .metrics import CallEvent
+
+
+class LazyFetchProfiler:
+    """Hook recording lazy property fetches (vm.config, vm.guest, ...)
+
+    Each lazy fetch is one RetrievePropertiesEx round trip: a property
+    fetched on many objects is a N+1 pattern to replace by a bulk
+    collection (Client.collect_properties) of the suggested property set.
+    """
+
+    def __init__(self):
+        self.fetches = Counter()  # (type, property) -> fetch count
+        self.objects = defaultdict(set)  # (type, property) -> morefs
+        self.methods = defaultdict(Counter)  # (type, property) -> {client method: count}
+        self.duration = Counter()  # (type, property) -> seconds
+
+    def __call__(self, event: CallEvent):
+        if event.kind != "accessor":
+            return
+        _type, prop = event.name.split(".", 1)
+        key = (_type, prop)
+        self.fetches[key] += 1
+        self.duration[key] += event.duration
+        if event.moref:
+            self.objects[key].add(event.moref)
+        self.methods[key][event.client_method or "-"] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.fetches.values())
+
+    def stats(self) -> List[Mapping]:
+        """Fetched properties, most fetched first"""
+        return [
+            {
+                "type": _type,
+                "property": prop,
+                "fetches": count,
+                "objects": len(self.objects[(_type, prop)]),
+                "duration": self.duration[(_type, prop)],
+                "methods": dict(self.methods[(_type, prop)]),
+            }
+            for (_type, prop), count in self.fetches.most_common()
+        ]
+
+    def suggested_path_set(self, min_objects: int = 2) -> Mapping[str, List[str]]:
+        """{type: properties} fetched on at least min_objects objects"""
+        path_set = defaultdict(list)
+        for stat in self.stats():
+            if stat["objects"] >= min_objects:
+                path_set[stat["type"]].append(stat["property"])
+        return {_type: sorted(paths) for _type, paths in path_set.items()}
+
+    def report(self, min_objects: int = 2) -> str:
+        lines = [f"{self.total} lazy property fetches"]
+        if not self.total:
+            return lines[0]
+
+        lines.append(f"{'property':<40} {'fetches':>8} {'objects':>8} {'seconds':>8}  methods")
+        for stat in self.stats():
+            name = f"{stat['type']}.{stat['property']}"
+            methods = ", ".join(f"{m}={c}" for m, c in sorted(stat["methods"].items()))
+            lines.append(
+                f"{name:<40} {stat['fetches']:>8} {stat['objects']:>8} {stat['duration']:>8.3f}  {methods}"
+            )
+
+        path_set = self.suggested_path_set(min_objects)
+        if path_set:
+            lines.append("suggested bulk collection:")
+            for _type, paths in sorted(path_set.items()):
+                lines.append(f"    client.collect_properties([vim.{_type}], {paths!r})")
+        return "\n".join(lines)
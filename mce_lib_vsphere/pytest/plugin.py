@@ -1,12 +1,13 @@
+import http.client
 import os
 import shutil
 import signal
+import ssl
 import subprocess as sp
+import threading
 import time
 import socket
 
-from pyVim import connect
-
 import pytest
 
 HERE = os.path.dirname(__file__)
@@ -16,17 +17,34 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "mce_known_bug: mark test as known bug")
     config.addinivalue_line("markers", "mce_todo: mark todo")
 
-def get_free_tcp_port(port=1024, max_port=65535):
-    """Return free tcp port"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    while port <= max_port:
+def get_free_tcp_port(host='127.0.0.1'):
+    """Return free tcp port (ephemeral port choosen by the OS)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+def wait_service(host, port, timeout=15, process=None, interval=0.05):
+    """Wait for the vcsim SDK endpoint - return False on timeout or if process exit"""
+    context = ssl._create_unverified_context()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
         try:
-            sock.bind(('', port))
-            sock.close()
-            return port
-        except OSError:
-            port += 1
-    raise IOError('no free ports')
+            # fast TCP probe before the HTTP probe
+            with socket.create_connection((host, port), timeout=1):
+                pass
+            conn = http.client.HTTPSConnection(host, port, timeout=2, context=context)
+            try:
+                conn.request("GET", "/sdk/vimServiceVersions.xml")
+                if conn.getresponse().status == 200:
+                    return True
+            finally:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(interval)
+    return False
 
 @pytest.fixture(scope="session")
 def vcsim_settings():
@@ -54,30 +72,41 @@ def vcsim_settings():
 
 # TODO: args en ligne de commande
 
-def start_service(service_name, host, port, vcsim_settings):
-    # TODO: convert
-
-    vcsim_settings["host"] = host
-    vcsim_settings["port"] = port
-
-    args = "%(vcsim_path)s -api-version %(api_version)s -dc %(datacenters)s -cluster %(clusters)s -pool %(pools)s -host %(hosts)s -ds %(datastores)s -pod %(storages)s -vm %(vms)s -app %(vapps)s -nsx %(opaque_networks)s -l %(host)s:%(port)s -username %(username)s -password %(password)s -trace" % vcsim_settings
+def spawn_service(host, port, vcsim_settings):
+    """Start vcsim without waiting for it"""
+
+    # a list, not a split command line: the path may contain spaces
+    args = [
+        vcsim_settings["vcsim_path"],
+        "-api-version", str(vcsim_settings["api_version"]),
+        "-dc", str(vcsim_settings["datacenters"]),
+        "-cluster", str(vcsim_settings["clusters"]),
+        "-pool", str(vcsim_settings["pools"]),
+        "-host", str(vcsim_settings["hosts"]),
+        "-ds", str(vcsim_settings["datastores"]),
+        "-pod", str(vcsim_settings["storages"]),
+        "-vm", str(vcsim_settings["vms"]),
+        "-app", str(vcsim_settings["vapps"]),
+        "-nsx", str(vcsim_settings["opaque_networks"]),
+        "-l", f"{host}:{port}",
+        "-username", str(vcsim_settings["username"]),
+        "-password", str(vcsim_settings["password"]),
+    ]
     # vcsim -api-version 6.5 -dc 2 -cluster 2 -pool 1 -host 3 -ds 4 -pod 2 -vm 10 -l 127.0.0.1:1024 -username user1 -password pass -trace
 
-    process = sp.Popen(args.split(), stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.DEVNULL)
+    # trace is never read: disable it for large topologies (full pipe block vcsim)
+    if vcsim_settings.get("trace", True):
+        args.append("-trace")
 
-    for i in range(0, 30):
-        if process.poll() is not None:
-            break
+    process = sp.Popen(args, stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.DEVNULL)
+    return process
 
-        try:
-            si = connect.SmartConnect(host=host, port=port, protocol='https', user=vcsim_settings["username"], pwd=vcsim_settings["password"], connectionPoolTimeout=2)
-            break
-        except IOError as err:
-            time.sleep(0.5)
-    else:
+
+def start_service(service_name, host, port, vcsim_settings):
+    process = spawn_service(host, port, vcsim_settings)
+    if not wait_service(host, port, vcsim_settings.get("start_timeout", 15), process):
         stop_process(process)  # pytest.fail doesn't call stop_process
         pytest.fail("Can not start service: {}".format(service_name))
-
     return process
 
 
@@ -92,14 +121,118 @@ def stop_process(process):
         msg = "Child process finished {} not in clean way: {} {}" .format(exit_code, outs, errors)
         raise RuntimeError(msg)
 
-@pytest.yield_fixture(scope="session")
-def vsphere_server(vcsim_settings):
-    host = "127.0.0.1"
-    port = get_free_tcp_port()
-    username = vcsim_settings['username']
-    password = vcsim_settings['password']
-    url = f"https://{username}:{password}@{host}:{port}/sdk"
-    process = start_service('vsphere', host, port, vcsim_settings)
-    yield url
-    stop_process(process)
+class VcsimFactory:
+    """Start vcsim servers on demand, one by topology
+
+    Servers with the same settings are shared by all tests of the session
+    (of the pytest-xdist worker). Settings not given come from vcsim_settings.
+    """
+
+    def __init__(self, vcsim_settings, host="127.0.0.1"):
+        self.vcsim_settings = vcsim_settings
+        self.host = host
+        self.servers = {}  # settings key -> (url, process)
+        self.starting = {}  # settings key -> Event set when the start ends
+        self.lock = threading.Lock()
+
+    def _settings(self, topology):
+        settings = dict(self.vcsim_settings)
+        settings.update({TOPOLOGY_ALIASES.get(k, k): v for k, v in topology.items()})
+        return settings
+
+    def _key(self, settings):
+        return tuple(sorted((k, v) for k, v in settings.items() if k not in ("host", "port")))
+
+    def _start(self, settings):
+        port = get_free_tcp_port(self.host)
+        process = spawn_service(self.host, port, settings)
+        url = f"https://{settings['username']}:{settings['password']}@{self.host}:{port}/sdk"
+        return url, port, process
+
+    def many(self, *topologies):
+        """Start several servers concurrently - return their urls
+
+        A server being started by another thread is waited for, not started twice.
+        """
+        settings_list = [self._settings(topology) for topology in topologies]
+        reserved = {}  # key -> settings: started by this call
+        waiting = []  # (key, settings, event): started by another thread
+        with self.lock:
+            for settings in settings_list:
+                key = self._key(settings)
+                if key in self.servers or key in reserved:
+                    continue
+                if key in self.starting:
+                    waiting.append((key, settings, self.starting[key]))
+                    continue
+                self.starting[key] = threading.Event()
+                reserved[key] = settings
+
+        spawned = []  # (key, settings, url, port, process) not registered yet
+        failed = None
+        try:
+            for key, settings in reserved.items():
+                spawned.append((key, settings, *self._start(settings)))
+            while spawned:
+                key, settings, url, port, process = spawned[0]
+                if not wait_service(self.host, port, settings.get("start_timeout", 15), process):
+                    failed = settings
+                    break
+                with self.lock:
+                    self.servers[key] = (url, process)
+                spawned.pop(0)
+        finally:
+            # close() only stops the registered servers
+            for _, _, _, _, process in spawned:
+                stop_process(process)
+            with self.lock:
+                for key in reserved:
+                    self.starting.pop(key).set()
+        if failed is not None:
+            pytest.fail(f"Can not start vcsim with {failed}")
+
+        for key, settings, event in waiting:
+            event.wait()
+            if key not in self.servers:
+                pytest.fail(f"Can not start vcsim with {settings}")
+
+        return [self.servers[self._key(settings)][0] for settings in settings_list]
+
+    def __call__(self, **topology):
+        """Return url of a vcsim server with this topology
+
+        Example:
+            url = vcsim_factory(dc=1, hosts=2, vms=5)
+        """
+        return self.many(topology)[0]
+
+    def close(self):
+        with self.lock:
+            servers, self.servers = self.servers, {}
+        for url, process in servers.values():
+            stop_process(process)
+
+
+# Short names accepted by vcsim_factory
+TOPOLOGY_ALIASES = {
+    "dc": "datacenters",
+    "cluster": "clusters",
+    "pool": "pools",
+    "host": "hosts",
+    "ds": "datastores",
+    "pod": "storages",
+    "vm": "vms",
+    "app": "vapps",
+    "nsx": "opaque_networks",
+}
+
+@pytest.fixture(scope="session")
+def vcsim_factory(vcsim_settings):
+    """Factory of vcsim servers: vcsim_factory(dc=1, hosts=2, vms=5) return the server url"""
+    factory = VcsimFactory(dict(vcsim_settings, trace=False))
+    yield factory
+    factory.close()
 
+@pytest.fixture(scope="session")
+def vsphere_server(vcsim_factory):
+    return vcsim_factory()
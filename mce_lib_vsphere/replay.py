@@ -0,0 +1,230 @@
+"""
+Record SOAP exchanges of a session and replay them in-process, without server
+
+Record:
+    with client.record("fixtures/inventory.json.gz"):
+        client.get_all_vms()
+
+Replay:
+    client = Client.from_cassette("fixtures/inventory.json.gz")
+    client.get_all_vms()
+
+Requests are matched by SOAP operation and a hash of the SOAP body (the
+arguments). Responses recorded several times for the same request are
+replayed in order, the last one is repeated. Responses added with
+Cassette.add without request match any request of their operation.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import re
+import zlib
+from collections import defaultdict
+from typing import Tuple, Any
+
+from pyVmomi import SoapAdapter, VmomiSupport
+
+from .exceptions import ReplayError
+
+CASSETTE_FORMAT_VERSION = 1
+
+DEFAULT_VERSION = "vim.version.version11"  # vSphere 6.5
+
+_BODY_RE = re.compile(rb"<soapenv:Body>\s*<([A-Za-z0-9_]+)[\s>]")
+
+
+def request_key(body: bytes) -> Tuple[str, str]:
+    """Return (operation, key) of a serialized SOAP request
+
+    The SOAP header (request context) is not part of the key.
+    """
+    match = _BODY_RE.search(body)
+    if not match:
+        raise ReplayError(f"not a SOAP request: {body[:200]!r}")
+    operation = match.group(1).decode()
+    digest = hashlib.sha1(body[match.start():]).hexdigest()
+    return operation, f"{operation}:{digest}"
+
+
+def serialize_response(operation: str, result: Any, version: str = DEFAULT_VERSION) -> bytes:
+    """Build the SOAP response envelope of operation returning result (pyVmomi object)"""
+    ns_map = SoapAdapter.SOAP_NSMAP.copy()
+    default_ns = VmomiSupport.GetWsdlNamespace(version)
+    ns_map[default_ns] = ''
+    body = ""
+    if result is not None:
+        info = VmomiSupport.Object(name="returnval", type=type(result), version=version, flags=0)
+        body = SoapAdapter.SerializeToUnicode(result, info, version, ns_map)
+    return (
+        SoapAdapter.XML_HEADER + "\n" + SoapAdapter.SOAP_START
+        + f'<{operation}Response xmlns="{default_ns}">{body}</{operation}Response>'
+        + SoapAdapter.SOAP_END
+    ).encode(SoapAdapter.XML_ENCODING)
+
+
+class Cassette:
+    """Recorded SOAP responses"""
+
+    def __init__(self, version: str = DEFAULT_VERSION):
+        self.version = version
+        self.responses = defaultdict(list)  # key -> [(status, body)]
+        self.positions = defaultdict(int)
+
+    def __len__(self):
+        return sum(len(responses) for responses in self.responses.values())
+
+    def record(self, request: bytes, status: int, body: bytes):
+        _, key = request_key(request)
+        self.responses[key].append((status, body))
+
+    def add(self, operation: str, result: Any = None, status: int = 200, request: bytes = None, body: bytes = None):
+        """Add a response: a pyVmomi object (result) or a SOAP envelope (body)
+
+        Without request, the response match any request of operation.
+        """
+        if body is None:
+            body = serialize_response(operation, result, self.version)
+        key = request_key(request)[1] if request else operation
+        self.responses[key].append((status, body))
+
+    def play(self, request: bytes) -> Tuple[int, bytes]:
+        operation, key = request_key(request)
+        if key not in self.responses:
+            key = operation
+        responses = self.responses.get(key)
+        if not responses:
+            raise ReplayError(f"no recorded response for [{operation}]")
+        position = self.positions[key]
+        self.positions[key] = position + 1
+        return responses[min(position, len(responses) - 1)]
+
+    def rewind(self):
+        self.positions.clear()
+
+    def to_dict(self):
+        return {
+            "format": CASSETTE_FORMAT_VERSION,
+            "version": self.version,
+            "responses": [
+                {"key": key, "status": status, "body": body.decode(SoapAdapter.XML_ENCODING)}
+                for key, responses in self.responses.items()
+                for status, body in responses
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> "Cassette":
+        if data.get("format") != CASSETTE_FORMAT_VERSION:
+            raise ReplayError(f"unsupported cassette format [{data.get('format')}]")
+        cassette = cls(version=data["version"])
+        for response in data["responses"]:
+            cassette.responses[response["key"]].append(
+                (response["status"], response["body"].encode(SoapAdapter.XML_ENCODING))
+            )
+        return cassette
+
+    def save(self, path: str):
+        """Save to path - gzip compressed if path ends with .gz"""
+        data = json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8")
+        if path.endswith(".gz"):
+            data = gzip.compress(data)
+        with open(path, "wb") as fp:
+            fp.write(data)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, "rb") as fp:
+            data = fp.read()
+        if path.endswith(".gz"):
+            data = gzip.decompress(data)
+        return cls.from_dict(json.loads(data))
+
+
+class ReplayResponse:
+    """Minimal http.client.HTTPResponse"""
+
+    def __init__(self, status: int, body: bytes, headers=None):
+        self.status = status
+        self.reason = "OK" if status == 200 else "Internal Server Error"
+        self.headers = headers or {}
+        self._fp = io.BytesIO(body)
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+    def read(self, amt=None):
+        return self._fp.read(amt) if amt is not None else self._fp.read()
+
+
+class ReplayConnection:
+    """Connection answering from a cassette (used as SoapStubAdapter.scheme)"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self.sock = True
+        self._request = None
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = body
+
+    def getresponse(self):
+        status, body = self.cassette.play(self._request)
+        return ReplayResponse(status, body)
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    """Connection wrapper recording responses to a cassette"""
+
+    def __init__(self, conn, cassette: Cassette):
+        self._conn = conn
+        self.cassette = cassette
+        self._request = None
+
+    def request(self, method, url, body=None, headers=None):
+        self._request = body
+        return self._conn.request(method, url, body, headers or {})
+
+    def getresponse(self):
+        response = self._conn.getresponse()
+        body = response.read()
+        encoding = (response.getheader("Content-Encoding") or "identity").lower()
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        if response.status in (200, 500):
+            self.cassette.record(self._request, response.status, body)
+        cookie = response.getheader("set-cookie")
+        return ReplayResponse(response.status, body, {"set-cookie": cookie} if cookie else None)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def start_recording(stub, cassette: Cassette):
+    scheme = stub.scheme
+
+    def factory(*args, **kwargs):
+        return RecordingConnection(scheme(*args, **kwargs), cassette)
+
+    factory._mce_recorded_scheme = scheme
+    stub.DropConnections()
+    stub.scheme = factory
+
+
+def stop_recording(stub):
+    if hasattr(stub.scheme, "_mce_recorded_scheme"):
+        stub.DropConnections()
+        stub.scheme = stub.scheme._mce_recorded_scheme
+
+
+def replay_stub(cassette: Cassette):
+    """SoapStubAdapter answering from cassette"""
+    stub = SoapAdapter.SoapStubAdapter(host="replay", port=443, version=cassette.version)
+    stub.scheme = lambda *args, **kwargs: ReplayConnection(cassette)
+    return stub
@@ -0,0 +1,121 @@
+"""
+Snapshots of all the VMs: flattened trees with their age and size
+
+Two calls: one bulk collection of the snapshot trees of all the VMs
+(small, unset for the VMs without snapshot), then the file layouts
+(layoutEx) of the VMs with snapshots only - the layouts are the heavy
+part of the collection.
+
+The size of a snapshot is its state files (.vmsn, .vmem) and the delta
+disks written since it was taken, the growth that deleting it would
+consolidate.
+
+Example:
+    records = client.snapshots()
+    for record in oldest(records, 10):
+        print(record.vm_name, record.name, record.created, record.size)
+"""
+
+import heapq
+from collections import namedtuple
+from typing import Any, Iterator, List, Mapping, Tuple
+
+from pyVmomi import vim
+
+# vm, snapshot: morefs - depth: 1 for a root snapshot - current: snapshot the VM runs on
+SnapshotRecord = namedtuple("SnapshotRecord", [
+    "vm", "vm_name", "snapshot", "name", "description", "created", "depth", "size", "current", "quiesced",
+])
+
+SNAPSHOT_PATHS = ["name", "snapshot.rootSnapshotList", "snapshot.currentSnapshot"]
+
+SNAPSHOT_LAYOUT_PATHS = ["layoutEx.file", "layoutEx.snapshot", "layoutEx.disk"]
+
+
+def flatten(roots: List[vim.vm.SnapshotTree]) -> Iterator[Tuple[vim.vm.SnapshotTree, int, Any]]:
+    """(node, depth, parent node) of snapshot trees, depth first"""
+    stack = [(node, 1, None) for node in reversed(roots or [])]
+    while stack:
+        node, depth, parent = stack.pop()
+        yield node, depth, parent
+        stack.extend((child, depth + 1, node) for child in reversed(node.childSnapshotList or []))
+
+
+def _chains(disks: List[Any]) -> Mapping[int, List[List[int]]]:
+    """{disk key: [file keys of each link of the chain]}"""
+    return {disk.key: [list(unit.fileKey or []) for unit in disk.chain or []] for disk in disks or []}
+
+
+def snapshot_sizes(roots: List[vim.vm.SnapshotTree], current: Any, layout: Mapping) -> Mapping[str, int]:
+    """
+    {snapshot moref: bytes} of the snapshots of a VM
+
+    Args:
+        roots: snapshot.rootSnapshotList
+        current: snapshot.currentSnapshot
+        layout: {layoutEx.file, layoutEx.snapshot, layoutEx.disk}
+    """
+    file_sizes = {file.key: file.size or 0 for file in layout.get("layoutEx.file") or []}
+    layouts = {snapshot.key._moId: snapshot for snapshot in layout.get("layoutEx.snapshot") or []}
+    chains = {moref: _chains(snapshot.disk) for moref, snapshot in layouts.items()}
+    vm_chains = _chains(layout.get("layoutEx.disk"))
+
+    # the delta disks of a snapshot: the links after its chain in its children and in the running disks
+    successors = {}
+    for node, _, parent in flatten(roots):
+        if parent is not None:
+            successors.setdefault(parent.snapshot._moId, []).append(chains.get(node.snapshot._moId, {}))
+    if current is not None:
+        successors.setdefault(current._moId, []).append(vm_chains)
+
+    sizes = {}
+    for node, _, _ in flatten(roots):
+        moref = node.snapshot._moId
+        snapshot_layout = layouts.get(moref)
+        keys = set()
+        if snapshot_layout is not None:
+            keys.update(key for key in (snapshot_layout.dataKey, snapshot_layout.memoryKey) if key is not None)
+        chain = chains.get(moref, {})
+        for successor in successors.get(moref, []):
+            for disk, links in successor.items():
+                position = len(chain.get(disk, []))
+                if position < len(links):
+                    keys.update(links[position])
+        sizes[moref] = sum(file_sizes.get(key, 0) for key in keys if key >= 0)
+    return sizes
+
+
+def snapshot_records(vm: Any, props: Mapping, layout: Mapping = None) -> List[SnapshotRecord]:
+    """
+    SnapshotRecords of a VM
+
+    Args:
+        props: {name, snapshot.rootSnapshotList, snapshot.currentSnapshot}
+        layout: layoutEx paths - sizes are None without layout
+    """
+    roots = props.get("snapshot.rootSnapshotList")
+    current = props.get("snapshot.currentSnapshot")
+    sizes = snapshot_sizes(roots, current, layout) if layout is not None else {}
+    return [
+        SnapshotRecord(
+            vm=vm._moId,
+            vm_name=props.get("name"),
+            snapshot=node.snapshot._moId,
+            name=node.name,
+            description=node.description or None,
+            created=node.createTime,
+            depth=depth,
+            size=sizes.get(node.snapshot._moId),
+            current=current is not None and node.snapshot._moId == current._moId,
+            quiesced=node.quiesced,
+        )
+        for node, depth, _ in flatten(roots)
+    ]
+
+
+def oldest(records: List[SnapshotRecord], n: int = 10) -> List[SnapshotRecord]:
+    return heapq.nsmallest(n, records, key=lambda record: record.created)
+
+
+def largest(records: List[SnapshotRecord], n: int = 10) -> List[SnapshotRecord]:
+    return heapq.nlargest(n, records, key=lambda record: record.size or 0)
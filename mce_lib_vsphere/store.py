@@ -0,0 +1,180 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Mapping, List, Any, Tuple
+
+from pyVmomi import VmomiSupport
+
+from .inventory import content_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    moref TEXT PRIMARY KEY,
+    type TEXT,
+    name TEXT,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_type_idx ON objects (type);
+CREATE INDEX IF NOT EXISTS objects_name_idx ON objects (name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ReferenceJSONEncoder(VmomiSupport.VmomiJSONEncoder):
+    """Encode managed objects as moref strings ('vim.HostSystem:host-1') without fetching them"""
+
+    def explode(self, obj):
+        return False
+
+
+def encode_value(value: Any) -> Any:
+    """Convert a property value to JSON types"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.loads(json.dumps(value, cls=ReferenceJSONEncoder))
+
+
+class InventoryStore:
+    """SQLite store of collected objects and of the WaitForUpdatesEx checkpoint
+
+    Rows are indexed by moref, type and name so consumers can query the
+    inventory without any call to the vCenter.
+
+    Example:
+        store = InventoryStore("inventory.db")
+        client.sync_inventory(store)
+        store.find(type=ResourceTypes.VIRTUAL_MACHINE, name="DC0_H0_VM0")
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.db.commit()
+        else:
+            self.db.rollback()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def get_meta(self, key: str, default: str = None) -> str:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def delete_meta(self, key: str):
+        self.db.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+    @property
+    def version(self) -> str:
+        """Last WaitForUpdatesEx version applied"""
+        return self.get_meta("version", "")
+
+    def _row_to_dict(self, row) -> Mapping:
+        moref, _type, name, data = row
+        return {"moref": moref, "type": _type, "name": name, "properties": json.loads(data)}
+
+    def get(self, moref: str) -> Mapping:
+        row = self.db.execute(
+            "SELECT moref, type, name, data FROM objects WHERE moref = ?", (moref,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def find(self, type: str = None, name: str = None) -> List[Mapping]:
+        query = "SELECT moref, type, name, data FROM objects"
+        clauses, params = [], []
+        if type is not None:
+            clauses.append("type = ?")
+            params.append(getattr(type, "value", type))
+        if name is not None:
+            clauses.append("name = ?")
+            params.append(name)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        return [self._row_to_dict(row) for row in self.db.execute(query + " ORDER BY moref", params)]
+
+    def count(self, type: str = None) -> int:
+        if type is None:
+            return self.db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        return self.db.execute(
+            "SELECT COUNT(*) FROM objects WHERE type = ?", (getattr(type, "value", type),)
+        ).fetchone()[0]
+
+    @property
+    def generation(self) -> int:
+        """Generation of the current full pass"""
+        return int(self.get_meta("generation", "0"))
+
+    def begin_full_sync(self) -> int:
+        """Start a full pass - return the generation to give to end_full_sync"""
+        generation = self.generation + 1
+        self.set_meta("generation", str(generation))
+        return generation
+
+    def end_full_sync(self, generation: int) -> int:
+        """Delete objects not seen by the full pass - return deleted count"""
+        cursor = self.db.execute("DELETE FROM objects WHERE generation != ?", (generation,))
+        self.db.commit()
+        return cursor.rowcount
+
+    def apply(
+        self, moref: str, type: str, kind: str, changes: List[Tuple[str, str, Any]], generation: int = None
+    ) -> bool:
+        """Apply an ObjectUpdate
+
+        Args:
+            kind: "enter", "modify" or "leave"
+            changes: list of (property path, op, value) with op in assign/remove/indirectRemove
+            generation: self.generation, read once by the caller for a batch of updates
+
+        Return True if the stored object changed
+        """
+        if kind == "leave":
+            return self.delete(moref)
+
+        row = self.db.execute("SELECT hash, data FROM objects WHERE moref = ?", (moref,)).fetchone()
+        properties = {}
+        if row and kind == "modify":
+            properties = json.loads(row[1])
+
+        for path, op, value in changes:
+            if op == "assign":
+                properties[path] = encode_value(value)
+            else:
+                properties.pop(path, None)
+
+        if generation is None:
+            generation = self.generation
+        _hash = content_hash(properties)
+        if row and row[0] == _hash:
+            self.db.execute("UPDATE objects SET generation = ? WHERE moref = ?", (generation, moref))
+            return False
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO objects (moref, type, name, hash, data, generation, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                moref, getattr(type, "value", type), properties.get("name"), _hash,
+                json.dumps(properties), generation, datetime.now(timezone.utc).isoformat()
+            ),
+        )
+        return True
+
+    def delete(self, moref: str) -> bool:
+        return self.db.execute("DELETE FROM objects WHERE moref = ?", (moref,)).rowcount > 0
@@ -0,0 +1,286 @@
+"""
+Synthetic pyVmomi inventories for load tests of the collectors, without server
+
+Example:
+    generator = InventoryGenerator(vms=100000, nics_per_vm=(1, 4), custom_fields=10, folder_depth=3)
+    client = generator.client(path_set=["name", "config.hardware", "guest.net"])
+    for vm, props in client.collect_properties([vim.VirtualMachine], ["name", "config.hardware", "guest.net"]):
+        ...
+
+Responses are served in order of the calls (see replay.Cassette.add): the
+generated client answers bulk collections (collect_properties) only, lazy
+property fetches would consume the pages of the collection.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Tuple, Union, Iterator, Any
+
+from pyVmomi import vim, vmodl, Iso8601
+
+from .replay import Cassette
+
+collector = vmodl.query.PropertyCollector
+
+GUESTS = [
+    ("otherGuest", "Other (32-bit)", "otherGuestFamily"),
+    ("rhel7_64Guest", "Red Hat Enterprise Linux 7 (64-bit)", "linuxGuest"),
+    ("ubuntu64Guest", "Ubuntu Linux (64-bit)", "linuxGuest"),
+    ("windows9Server64Guest", "Microsoft Windows Server 2016 (64-bit)", "windowsGuest"),
+]
+
+POWER_STATES = ["poweredOn"] * 8 + ["poweredOff"] * 2
+
+
+def _range(value: Union[int, Tuple[int, int]], rnd: random.Random) -> int:
+    if isinstance(value, tuple):
+        return rnd.randint(*value)
+    return value
+
+
+def resolve_path(props: dict, path: str) -> Any:
+    """Value of a property path ("config.hardware.numCPU") from top-level properties"""
+    name, _, rest = path.partition(".")
+    value = props.get(name)
+    for attr in rest.split(".") if rest else []:
+        if value is None:
+            return None
+        value = getattr(value, attr, None)
+    return value
+
+
+class InventoryGenerator:
+    """Deterministic (seed) synthetic inventory shaped like a vCenter one
+
+    Args:
+        vms: number of virtual machines
+        nics_per_vm: int or (min, max) guest NICs by VM
+        custom_fields: number of custom fields defined, each VM has a random subset
+        folder_depth: depth of the VM folder tree (2 sub folders by folder)
+    """
+
+    def __init__(
+        self,
+        vms: int = 1000,
+        hosts: int = None,
+        datastores: int = None,
+        networks: int = 4,
+        datacenters: int = 1,
+        nics_per_vm: Union[int, Tuple[int, int]] = (1, 2),
+        ips_per_nic: Union[int, Tuple[int, int]] = 1,
+        custom_fields: int = 3,
+        folder_depth: int = 1,
+        seed: int = 0,
+    ):
+        self.vms = vms
+        self.hosts = hosts or max(1, vms // 30)
+        self.datastores = datastores or max(1, vms // 100)
+        self.networks = networks
+        self.datacenters = datacenters
+        self.nics_per_vm = nics_per_vm
+        self.ips_per_nic = ips_per_nic
+        self.custom_fields = custom_fields
+        self.folder_depth = folder_depth
+        self.seed = seed
+        self.now = datetime(2020, 5, 1, tzinfo=Iso8601.TZInfo())
+        self._build()
+
+    def _build(self):
+        self.root_folder = vim.Folder("group-d1")
+        self.objects = []  # (managed object, top-level properties) except VMs
+        self.vm_folders = []  # leaves of the VM folder trees
+        self.host_refs, self.datastore_refs, self.network_refs, self.pool_refs = [], [], [], []
+        clusters = []
+
+        self.field_defs = vim.CustomFieldsManager.FieldDef.Array([
+            vim.CustomFieldsManager.FieldDef(
+                key=100 + i, name=f"field{i}", type=str, managedObjectType=vim.VirtualMachine
+            )
+            for i in range(self.custom_fields)
+        ])
+
+        counter = iter(range(10, 10 ** 9))
+
+        for dc_index in range(self.datacenters):
+            datacenter = vim.Datacenter(f"datacenter-{next(counter)}")
+            self.objects.append((datacenter, {"name": f"DC{dc_index}", "parent": self.root_folder}))
+
+            vm_folder = vim.Folder(f"group-v{next(counter)}")
+            host_folder = vim.Folder(f"group-h{next(counter)}")
+            self.objects.append((vm_folder, {"name": "vm", "parent": datacenter}))
+            self.objects.append((host_folder, {"name": "host", "parent": datacenter}))
+
+            level = [vm_folder]
+            for depth in range(self.folder_depth):
+                next_level = []
+                for parent in level:
+                    for i in range(2):
+                        folder = vim.Folder(f"group-v{next(counter)}")
+                        self.objects.append((folder, {"name": f"DC{dc_index}_F{depth}_{len(next_level)}", "parent": parent}))
+                        next_level.append(folder)
+                level = next_level
+            self.vm_folders.extend(level)
+
+            cluster = vim.ClusterComputeResource(f"domain-c{next(counter)}")
+            pool = vim.ResourcePool(f"resgroup-{next(counter)}")
+            self.objects.append((cluster, {"name": f"DC{dc_index}_C0", "parent": host_folder, "resourcePool": pool}))
+            self.objects.append((pool, {"name": "Resources", "parent": cluster}))
+            self.pool_refs.append(pool)
+            clusters.append(cluster)
+
+        for i in range(self.hosts):
+            host = vim.HostSystem(f"host-{next(counter)}")
+            self.objects.append((host, {"name": f"H{i}", "parent": clusters[i % len(clusters)]}))
+            self.host_refs.append(host)
+
+        for i in range(self.datastores):
+            datastore = vim.Datastore(f"datastore-{next(counter)}")
+            self.objects.append((datastore, {"name": f"DS{i}", "parent": self.root_folder}))
+            self.datastore_refs.append(datastore)
+
+        for i in range(self.networks):
+            network = vim.Network(f"network-{next(counter)}")
+            self.objects.append((network, {"name": f"VM Network {i}", "parent": self.root_folder}))
+            self.network_refs.append(network)
+
+    def service_content(self) -> vim.ServiceInstanceContent:
+        return vim.ServiceInstanceContent(
+            rootFolder=self.root_folder,
+            propertyCollector=collector("propertyCollector"),
+            viewManager=vim.view.ViewManager("ViewManager"),
+            about=vim.AboutInfo(
+                name="VMware vCenter Server", fullName="VMware vCenter Server 6.5.0 build-5973321",
+                vendor="VMware, Inc.", version="6.5.0", build="5973321", osType="linux-amd64",
+                productLineId="vpx", apiType="VirtualCenter", apiVersion="6.5",
+            ),
+        )
+
+    def vm_properties(self, index: int) -> Tuple[vim.VirtualMachine, dict]:
+        """Top-level properties of the VM number index (same values for the same seed)"""
+        rnd = random.Random(self.seed * 1000003 + index)
+        vm = vim.VirtualMachine(f"vm-{index + 1000}")
+        name = f"SYN_VM{index}"
+        guest_id, guest_name, guest_family = rnd.choice(GUESTS)
+        power_state = rnd.choice(POWER_STATES)
+        host = self.host_refs[index % len(self.host_refs)]
+        datastore = self.datastore_refs[index % len(self.datastore_refs)]
+        networks = rnd.sample(self.network_refs, min(len(self.network_refs), 2))
+        instance_uuid = str(uuid.UUID(int=rnd.getrandbits(128)))
+        bios_uuid = str(uuid.UUID(int=rnd.getrandbits(128)))
+        boot_time = self.now - timedelta(minutes=rnd.randint(1, 60 * 24 * 365)) if power_state == "poweredOn" else None
+        committed = rnd.randint(1, 500) * 1024 ** 3
+
+        nics = []
+        max_nics = self.nics_per_vm[1] if isinstance(self.nics_per_vm, tuple) else self.nics_per_vm
+        for nic_index in range(_range(self.nics_per_vm, rnd)):
+            # unique by VM and NIC up to 2 ** 24 NICs
+            key = index * max_nics + nic_index
+            mac = "00:50:56:%02x:%02x:%02x" % (key >> 16 & 0xff, key >> 8 & 0xff, key & 0xff)
+            addresses = vim.net.IpConfigInfo.IpAddress.Array([
+                vim.net.IpConfigInfo.IpAddress(
+                    ipAddress=f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+                    prefixLength=24, origin="dhcp", state="preferred",
+                )
+                for _ in range(_range(self.ips_per_nic, rnd))
+            ])
+            nics.append(vim.vm.GuestInfo.NicInfo(
+                network=f"VM Network {nic_index}", macAddress=mac, connected=True, deviceConfigId=4000 + nic_index,
+                ipConfig=vim.net.IpConfigInfo(ipAddress=addresses),
+            ))
+
+        custom_values = vim.CustomFieldsManager.StringValue.Array([
+            vim.CustomFieldsManager.StringValue(key=field.key, value=f"value{rnd.randint(0, 99)}")
+            for field in self.field_defs if rnd.random() < 0.5
+        ])
+
+        hardware = vim.vm.VirtualHardware(
+            numCPU=rnd.choice([1, 2, 4, 8]), numCoresPerSocket=1, memoryMB=rnd.choice([512, 1024, 2048, 4096, 8192]),
+        )
+        runtime = vim.vm.RuntimeInfo(host=host, powerState=power_state, connectionState="connected", bootTime=boot_time)
+        path_name = f"[DS{index % len(self.datastore_refs)}] {name}/{name}.vmx"
+
+        return vm, {
+            "name": name,
+            "parent": self.vm_folders[index % len(self.vm_folders)],
+            "resourcePool": self.pool_refs[index % len(self.pool_refs)],
+            "datastore": vim.Datastore.Array([datastore]),
+            "network": vim.Network.Array(networks),
+            "runtime": runtime,
+            "config": vim.vm.ConfigInfo(
+                name=name, instanceUuid=instance_uuid, uuid=bios_uuid, template=False, guestId=guest_id,
+                guestFullName=guest_name, annotation="", hardware=hardware,
+                files=vim.vm.FileInfo(vmPathName=path_name),
+            ),
+            "guest": vim.vm.GuestInfo(
+                hostName=name.lower() if power_state == "poweredOn" else None, guestFamily=guest_family,
+                toolsVersion="10346", toolsStatus="toolsOk", toolsVersionStatus2="guestToolsCurrent",
+                toolsRunningStatus="guestToolsRunning", guestState="running" if power_state == "poweredOn" else "notRunning",
+                net=vim.vm.GuestInfo.NicInfo.Array(nics),
+            ),
+            "summary": vim.vm.Summary(
+                runtime=runtime,
+                config=vim.vm.Summary.ConfigSummary(
+                    name=name, vmPathName=path_name, instanceUuid=instance_uuid, uuid=bios_uuid,
+                    numCpu=hardware.numCPU, memorySizeMB=hardware.memoryMB, guestFullName=guest_name,
+                ),
+                storage=vim.vm.Summary.StorageSummary(
+                    committed=committed, uncommitted=0, unshared=committed, timestamp=self.now,
+                ),
+            ),
+            "customValue": custom_values,
+            "availableField": self.field_defs,
+        }
+
+    def iter_objects(self, object_types: List[Any] = None) -> Iterator[Tuple[Any, dict]]:
+        """(managed object, top-level properties) of object_types (default: all)"""
+        object_types = tuple(object_types or [vim.ManagedEntity])
+        for obj, props in self.objects:
+            if isinstance(obj, object_types):
+                yield obj, props
+        if issubclass(vim.VirtualMachine, object_types):
+            for index in range(self.vms):
+                yield self.vm_properties(index)
+
+    def object_contents(self, object_types: List[Any] = None, path_set: List[str] = None) -> Iterator[Any]:
+        """ObjectContent as returned by RetrievePropertiesEx"""
+        path_set = path_set or ["name"]
+        for obj, props in self.iter_objects(object_types):
+            prop_set = []
+            for path in path_set:
+                value = resolve_path(props, path)
+                if value is not None:
+                    prop_set.append(vmodl.DynamicProperty(name=path, val=value))
+            yield collector.ObjectContent(obj=obj, propSet=prop_set)
+
+    def cassette(self, object_types: List[Any] = None, path_set: List[str] = None, page_size: int = 1000) -> Cassette:
+        """Cassette answering one bulk collection of object_types by pages of page_size"""
+        cassette = Cassette()
+        cassette.add("RetrieveServiceContent", self.service_content())
+        cassette.add("CreateContainerView", vim.view.ContainerView("session[synthetic]view-1"))
+        cassette.add("DestroyView")
+        cassette.add("CancelRetrievePropertiesEx")
+
+        # a page is added once the next one is known: the last page has no token
+        operation, page, pending = "RetrievePropertiesEx", [], None
+        for obj_content in self.object_contents(object_types, path_set):
+            page.append(obj_content)
+            if len(page) == page_size:
+                if pending:
+                    cassette.add(operation, collector.RetrieveResult(objects=pending, token=str(len(cassette))))
+                    operation = "ContinueRetrievePropertiesEx"
+                pending, page = page, []
+        if pending and page:
+            cassette.add(operation, collector.RetrieveResult(objects=pending, token=str(len(cassette))))
+            operation, pending = "ContinueRetrievePropertiesEx", page
+        else:
+            pending = pending or page
+        # no object: RetrievePropertiesEx returns nothing
+        cassette.add(operation, collector.RetrieveResult(objects=pending) if pending else None)
+        return cassette
+
+    def client(self, object_types: List[Any] = None, path_set: List[str] = None, page_size: int = 1000):
+        """Client answering one bulk collection (see cassette)"""
+        from .core import Client
+
+        return Client.from_cassette(self.cassette(object_types or [vim.VirtualMachine], path_set, page_size))
@@ -0,0 +1,284 @@
+"""
+vSphere tags with the Automation REST API - the SOAP API only knows custom fields
+
+Categories and tags are loaded once (cached for cache_ttl seconds), the
+tags of the objects are fetched by batches of BATCH_SIZE objects with
+list-attached-tags-on-objects, the batches in parallel on one pooled
+requests.Session. vCenter 7.0 U2+ serve /api, older ones /rest only:
+the endpoint is chosen at login.
+
+Example:
+    tagging = client.tagging
+    for vm, infos in tagging.join(client.extract_all("vm")):
+        print(infos["name"], infos["tags"])  # {'env': ['prod'], 'backup': ['daily']}
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Mapping, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .exceptions import AuthenticationError, ConnectionError, FatalError
+from .metrics import record_retry
+
+logger = logging.getLogger(__name__)
+
+Category = namedtuple("Category", ["id", "name", "cardinality", "associable_types", "description"])
+
+Tag = namedtuple("Tag", ["id", "name", "category_id", "category", "description"])
+
+# objects by list-attached-tags-on-objects call
+BATCH_SIZE = 500
+
+# vCenter 7.0 U2+
+API_PATHS = {
+    "session": "/api/session",
+    "categories": "/api/cis/tagging/category",
+    "category": "/api/cis/tagging/category/{}",
+    "tags": "/api/cis/tagging/tag",
+    "tag": "/api/cis/tagging/tag/{}",
+    "attached": "/api/cis/tagging/tag-association?action=list-attached-tags-on-objects",
+}
+
+# before 7.0 U2: results in {"value": ...}
+REST_PATHS = {
+    "session": "/rest/com/vmware/cis/session",
+    "categories": "/rest/com/vmware/cis/tagging/category",
+    "category": "/rest/com/vmware/cis/tagging/category/id:{}",
+    "tags": "/rest/com/vmware/cis/tagging/tag",
+    "tag": "/rest/com/vmware/cis/tagging/tag/id:{}",
+    "attached": "/rest/com/vmware/cis/tagging/tag-association?~action=list-attached-tags-on-objects",
+}
+
+
+def object_id(obj: Any, object_type: Any = None) -> Mapping:
+    """DynamicID of a managed object or of a moref: {"type": "VirtualMachine", "id": "vm-1"}"""
+    if isinstance(obj, str):
+        name = object_type if isinstance(object_type, str) else object_type._wsdlName
+        return {"type": name, "id": obj}
+    return {"type": obj._wsdlName, "id": obj._moId}
+
+
+class TaggingClient:
+    """Categories, tags and tag associations of a vCenter - one REST session"""
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        verify: bool = True,
+        timeout: int = 60,
+        workers: int = 8,
+        cache_ttl: int = 300,
+        session: requests.Session = None,
+        metrics_hooks: List[Callable] = None,
+    ):
+        """
+        Args:
+            url: https://host:port of the vCenter
+            workers: parallel requests (and connections of the pool)
+            cache_ttl: seconds before the categories and tags are reloaded
+            session: requests.Session to use (adapters, proxies)
+            metrics_hooks: callables receiving a metrics.CallEvent for each retried request
+        """
+        self.url = url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.workers = workers
+        self.cache_ttl = cache_ttl
+        self.paths = None
+        self.session = session or requests.Session()
+        self.session.verify = verify
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self._categories = None
+        self._tags = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self.metrics_hooks = metrics_hooks if metrics_hooks is not None else []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.logout()
+
+    def login(self):
+        """New REST session: /api, /rest if the vCenter is older than 7.0 U2"""
+        self.session.headers.pop("vmware-api-session-id", None)
+        for paths in (API_PATHS, REST_PATHS):
+            response = self._send("POST", self.url + paths["session"], auth=(self.username, self.password))
+            if response.status_code == 404:
+                continue
+            if response.status_code == 401:
+                raise AuthenticationError(f"invalid authentication for [{self.username}]")
+            token = self._value(response, paths)
+            self.paths = paths
+            self.session.headers["vmware-api-session-id"] = token
+            return
+        raise FatalError(f"no tagging API on [{self.url}]")
+
+    def logout(self):
+        if self.paths is None:
+            return
+        try:
+            self._send("DELETE", self.url + self.paths["session"])
+        except Exception as err:
+            logger.warning(str(err))
+        self.session.headers.pop("vmware-api-session-id", None)
+        self.paths = None
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        try:
+            return self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as err:
+            raise ConnectionError(f"request [{method} {url}] failed: {err}")
+
+    def _value(self, response: requests.Response, paths: Mapping = None) -> Any:
+        if response.status_code >= 400:
+            raise FatalError(f"[{response.request.method} {response.url}] {response.status_code}: {response.text}")
+        value = response.json()
+        return value["value"] if (paths or self.paths) is REST_PATHS else value
+
+    def _login_once(self, expired_token: str = None):
+        """login shared by the worker threads: no new login if another thread already replaced expired_token"""
+        with self._login_lock:
+            if self.paths is not None and self.session.headers.get("vmware-api-session-id") != expired_token:
+                return
+            self.login()
+
+    def _request(self, method: str, name: str, *args, json: Any = None) -> Any:
+        """JSON result of a tagging call - login again if the session is expired"""
+        if self.paths is None:
+            self._login_once()
+        token = self.session.headers.get("vmware-api-session-id")
+        response = self._send(method, self.url + self.paths[name].format(*args), json=json)
+        if response.status_code == 401:
+            logger.warning("REST session expired - new login")
+            self._login_once(token)
+            record_retry(self.metrics_hooks, f"tagging.{name}")
+            response = self._send(method, self.url + self.paths[name].format(*args), json=json)
+        return self._value(response)
+
+    def _load(self):
+        with self._lock:
+            if self._tags is not None and time.monotonic() - self._loaded < self.cache_ttl:
+                return
+            # one GET by category and by tag: the list calls only return ids
+            with ThreadPoolExecutor(self.workers) as executor:
+                categories = {}
+                category_ids = self._request("GET", "categories")
+                for category in executor.map(lambda key: self._request("GET", "category", key), category_ids):
+                    categories[category["id"]] = Category(
+                        id=category["id"],
+                        name=category["name"],
+                        cardinality=category.get("cardinality"),
+                        associable_types=category.get("associable_types") or [],
+                        description=category.get("description") or None,
+                    )
+                tags = {}
+                tag_ids = self._request("GET", "tags")
+                for tag in executor.map(lambda key: self._request("GET", "tag", key), tag_ids):
+                    category = categories.get(tag["category_id"])
+                    tags[tag["id"]] = Tag(
+                        id=tag["id"],
+                        name=tag["name"],
+                        category_id=tag["category_id"],
+                        category=category.name if category else None,
+                        description=tag.get("description") or None,
+                    )
+            self._categories, self._tags = categories, tags
+            self._loaded = time.monotonic()
+
+    def refresh(self):
+        """Reload the categories and tags at the next call"""
+        with self._lock:
+            self._tags = None
+
+    @property
+    def categories(self) -> Mapping[str, Category]:
+        """{category id: Category} - cached"""
+        self._load()
+        return self._categories
+
+    @property
+    def tags(self) -> Mapping[str, Tag]:
+        """{tag id: Tag} - cached"""
+        self._load()
+        return self._tags
+
+    def _attached(self, object_ids: List[Mapping]) -> Mapping[str, List[str]]:
+        result = self._request("POST", "attached", json={"object_ids": object_ids})
+        return {item["object_id"]["id"]: item["tag_ids"] for item in result or []}
+
+    def attached_tags(self, objects: Iterable[Any], object_type: Any = None) -> Mapping[str, List[str]]:
+        """
+        {moref: [tag id]} of objects, managed objects or morefs of object_type
+
+        One call by BATCH_SIZE objects, the calls in parallel.
+        """
+        object_ids = [object_id(obj, object_type) for obj in objects]
+        batches = [object_ids[i:i + BATCH_SIZE] for i in range(0, len(object_ids), BATCH_SIZE)]
+        if self.paths is None:
+            self.login()
+        attached = {object_id["id"]: [] for object_id in object_ids}
+        with ThreadPoolExecutor(min(self.workers, len(batches) or 1)) as executor:
+            for result in executor.map(self._attached, batches):
+                attached.update(result)
+        return attached
+
+    def tags_by_object(self, objects: Iterable[Any], object_type: Any = None) -> Mapping[str, Mapping[str, List[str]]]:
+        """
+        {moref: {category name: [tag name]}}
+
+        Example:
+            client.tagging.tags_by_object(client.get_all_vms())["vm-42"]  # {'env': ['prod']}
+        """
+        tags = self.tags
+        result = {}
+        for moref, tag_ids in self.attached_tags(objects, object_type).items():
+            by_category = result[moref] = {}
+            for tag_id in tag_ids:
+                tag = tags.get(tag_id)
+                if tag is None:
+                    # created after the cache load
+                    logger.warning(f"unknown tag [{tag_id}] on [{moref}]")
+                    continue
+                by_category.setdefault(tag.category, []).append(tag.name)
+        return result
+
+    def join(
+        self, records: Iterable[Tuple[Any, Mapping]], object_type: Any = None, key: str = "tags", chunk_size: int = 5000
+    ): # -> Iterator[Tuple[Any, Mapping]]
+        """
+        Add the tags {category name: [tag name]} to inventory records
+
+        Args:
+            records: (managed object or moref, infos) - extract_all, extract_parallel
+            object_type: vim type or type name ("VirtualMachine") if the records have morefs
+            chunk_size: records read before fetching their tags
+        """
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield from self._join(chunk, object_type, key)
+                chunk = []
+        if chunk:
+            yield from self._join(chunk, object_type, key)
+
+    def _join(self, chunk: List[Tuple[Any, Mapping]], object_type: Any, key: str):
+        tags = self.tags_by_object([obj for obj, _ in chunk], object_type)
+        for obj, infos in chunk:
+            infos[key] = tags.get(obj if isinstance(obj, str) else obj._moId, {})
+            yield obj, infos
@@ -0,0 +1,142 @@
+"""
+Wait for tasks with one PropertyFilter instead of polling each task
+
+The filter watches info.state/result/error of the tasks of a ListView:
+tasks can be added while waiting (bulk operations) and the completions
+are returned as WaitForUpdatesEx reports them.
+
+Example:
+    tasks = [vm.PowerOnVM_Task() for vm in vms]
+    for task, result in client.wait_for_tasks(tasks, timeout=600):
+        print(task._moId, "done")
+"""
+
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Any, List, Tuple
+
+from pyVmomi import vim, vmodl
+
+from .exceptions import TaskError, TaskCancelledError, TaskTimeoutError
+
+logger = logging.getLogger(__name__)
+
+collector = vmodl.query.PropertyCollector
+
+TASK_PATHS = ["info.state", "info.result", "info.error"]
+
+DONE_STATES = (vim.TaskInfo.State.success, vim.TaskInfo.State.error)
+
+# maxWaitSeconds of WaitForUpdatesEx without timeout
+MAX_WAIT = 60
+
+
+def task_error(task: vim.Task, fault: Any) -> TaskError:
+    """TaskError (FatalError) of a task fault"""
+    message = getattr(fault, "msg", None) or fault.__class__.__name__
+    task_id = task._moId if task is not None else None
+    if isinstance(fault, vmodl.fault.RequestCanceled):
+        error_class = TaskCancelledError
+    else:
+        error_class = TaskError
+    return error_class(f"task [{task_id}] failed: {message}", task=task, fault=fault)
+
+
+class TaskTracker:
+    """One PropertyFilter on a ListView: tasks are added and removed while waiting"""
+
+    def __init__(self, content):
+        self.content = content
+        self.property_collector = content.propertyCollector.CreatePropertyCollector()
+        self.view = None
+        self.property_filter = None
+        try:
+            self.view = content.viewManager.CreateListView([])
+            traversal = collector.TraversalSpec(name="traverseList", path="view", skip=False, type=vim.view.ListView)
+            filter_spec = collector.FilterSpec(
+                objectSet=[collector.ObjectSpec(obj=self.view, skip=True, selectSet=[traversal])],
+                propSet=[collector.PropertySpec(type=vim.Task, pathSet=TASK_PATHS, all=False)],
+            )
+            self.property_filter = self.property_collector.CreateFilter(filter_spec, partialUpdates=False)
+        except Exception:
+            self.close()
+            raise
+        self.version = ""
+        self.infos = defaultdict(dict)  # task moref -> {path: value}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, tasks: List[vim.Task]):
+        self.view.ModifyListView(add=tasks)
+
+    def remove(self, tasks: List[vim.Task]):
+        self.view.ModifyListView(remove=tasks)
+
+    def wait(self, timeout: float) -> List[Tuple[vim.Task, Any]]:
+        """Tasks done (success or error) within timeout seconds: [(task, info)]"""
+        options = collector.WaitOptions(maxWaitSeconds=max(1, math.ceil(timeout)))
+        update_set = self.property_collector.WaitForUpdatesEx(self.version, options)
+        if update_set is None:
+            return []
+        self.version = update_set.version
+        done = []
+        for filter_update in update_set.filterSet:
+            for object_update in filter_update.objectSet:
+                if object_update.kind == "leave":
+                    continue
+                info = self.infos[object_update.obj._moId]
+                for change in object_update.changeSet:
+                    info[change.name] = change.val
+                if info.get("info.state") in DONE_STATES:
+                    done.append((object_update.obj, self.infos.pop(object_update.obj._moId)))
+        if done:
+            self.remove([task for task, _ in done])
+        return done
+
+    def close(self):
+        destroys = [
+            self.property_filter and self.property_filter.DestroyPropertyFilter,
+            self.view and self.view.DestroyView,
+            self.property_collector.DestroyPropertyCollector,
+        ]
+        for destroy in filter(None, destroys):
+            try:
+                destroy()
+            except Exception as err:
+                logger.warning(f"task tracker cleanup error: {err}")
+
+
+def wait_for_tasks(
+    content, tasks: List[vim.Task], timeout: float = None, raise_on_error: bool = True
+): # -> Iterator[Tuple[vim.Task, Any]]
+    """(task, result) in completion order - see Client.wait_for_tasks"""
+    if not tasks:
+        return
+    pending = {task._moId for task in tasks}
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    with TaskTracker(content) as tracker:
+        tracker.add(list(tasks))
+        while pending:
+            wait = MAX_WAIT
+            if deadline is not None:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    raise TaskTimeoutError(
+                        f"{len(pending)} tasks not completed after {timeout}s: {', '.join(sorted(pending))}",
+                        tasks=[task for task in tasks if task._moId in pending],
+                    )
+            for task, info in tracker.wait(min(wait, MAX_WAIT)):
+                pending.discard(task._moId)
+                if info.get("info.state") == vim.TaskInfo.State.error:
+                    error = task_error(task, info.get("info.error"))
+                    if raise_on_error:
+                        raise error
+                    yield task, error
+                else:
+                    yield task, info.get("info.result")
@@ -0,0 +1,314 @@
+"""
+Terraform configuration and import blocks of an existing inventory
+
+One bulk collection (see Client.collect_properties) of the datacenters,
+folders, compute resources, resource pools, datastores, networks and VMs
+gives the inventory paths (Topology) and the attributes of the resources
+of the vSphere provider:
+
+- resource vsphere_folder and vsphere_virtual_machine + their import blocks
+  (Terraform >= 1.5) with the inventory path as id
+- data vsphere_datacenter, vsphere_datastore, vsphere_network and
+  vsphere_resource_pool referenced by the VMs
+
+Example:
+    export = client.terraform_export()
+    export.write("terraform/")  # inventory.tf and imports.tf
+    # terraform plan -generate-config-out is not needed: the resources are in inventory.tf
+"""
+
+import json
+import os
+import re
+from typing import Any, Iterable, List, Mapping, Tuple
+
+from pyVmomi import vim
+
+from .topology import Topology
+
+# Property paths of the bulk collection by managed object type
+TERRAFORM_PATHS = {
+    vim.Datacenter: ["name", "parent"],
+    vim.Folder: ["name", "parent"],
+    vim.ComputeResource: ["name", "parent"],
+    vim.ResourcePool: ["name", "parent"],
+    vim.Datastore: ["name", "parent"],
+    vim.Network: ["name", "parent"],
+    vim.VirtualMachine: [
+        "name", "parent", "resourcePool", "datastore",
+        "config.template", "config.guestId", "config.hardware.numCPU",
+        "config.hardware.numCoresPerSocket", "config.hardware.memoryMB", "config.hardware.device",
+    ],
+}
+
+# Folder type (vsphere_folder.type) by name of the root folder of a datacenter
+FOLDER_TYPES = {"vm": "vm", "host": "host", "datastore": "datastore", "network": "network"}
+
+ADAPTER_TYPES = [
+    (vim.vm.device.VirtualVmxnet3, "vmxnet3"),
+    (vim.vm.device.VirtualE1000e, "e1000e"),
+    (vim.vm.device.VirtualE1000, "e1000"),
+    (vim.vm.device.VirtualSriovEthernetCard, "sriov"),
+]
+
+_IDENTIFIER_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def hcl_string(value: str) -> str:
+    """Quoted HCL string - template sequences (${, %{) are escaped"""
+    return json.dumps(value, ensure_ascii=False).replace("${", "$${").replace("%{", "%%{")
+
+
+def identifier(name: str) -> str:
+    """Terraform resource name of an object name: 'web 01.lan' -> 'web_01_lan'"""
+    value = _IDENTIFIER_RE.sub("_", name or "").strip("_") or "unnamed"
+    if not (value[0].isalpha() or value[0] == "_"):
+        value = "_" + value
+    return value
+
+
+def block(kind: str, labels: Iterable[str], attributes: Iterable[Tuple[str, Any]], indent: int = 0) -> str:
+    """HCL block - attribute values are str (raw expression), int, bool or (name, attributes) sub-blocks"""
+    pad = "  " * indent
+    header = " ".join([kind] + [hcl_string(label) for label in labels])
+    lines = [f"{pad}{header} {{"]
+    for name, value in attributes:
+        if isinstance(value, Block):
+            lines.append(block(name, [], value.attributes, indent + 1))
+        else:
+            lines.append(f"{pad}  {name} = {value}")
+    lines.append(f"{pad}}}")
+    return "\n".join(lines)
+
+
+class Block:
+    """Nested block of an attribute list (disk, network_interface)"""
+
+    __slots__ = ("attributes",)
+
+    def __init__(self, attributes: List[Tuple[str, Any]]):
+        self.attributes = attributes
+
+
+def hcl_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return hcl_string(str(value))
+
+
+def disks(devices: List[Any]) -> List[Block]:
+    result = []
+    for index, device in enumerate(d for d in devices or [] if isinstance(d, vim.vm.device.VirtualDisk)):
+        attributes = [
+            ("label", hcl_string(f"disk{index}")),
+            ("size", hcl_value(max(1, (device.capacityInKB or 0) // 1024 ** 2))),
+            ("unit_number", hcl_value(device.unitNumber or 0)),
+        ]
+        thin = getattr(device.backing, "thinProvisioned", None)
+        if thin is not None:
+            attributes.append(("thin_provisioned", hcl_value(thin)))
+        result.append(Block(attributes))
+    return result
+
+
+def nic_network(device: Any) -> str:
+    """Moref of the network of a NIC (standard or distributed port group)"""
+    backing = device.backing
+    if isinstance(backing, vim.vm.device.VirtualEthernetCard.NetworkBackingInfo) and backing.network:
+        return backing.network._moId
+    port = getattr(backing, "port", None)
+    if port is not None:
+        # the key of a distributed port group is its moref
+        return port.portgroupKey
+    return None
+
+
+def adapter_type(device: Any) -> str:
+    for device_type, name in ADAPTER_TYPES:
+        if isinstance(device, device_type):
+            return name
+    return None
+
+
+class TerraformExport:
+    """Terraform configuration of collected objects [(managed object, properties)]"""
+
+    def __init__(self, objects: Iterable[Tuple[Any, Mapping]]):
+        self.objects = {}  # moref -> (managed object, properties)
+        records = []
+        for obj, props in objects:
+            self.objects[obj._moId] = (obj, props)
+            parent = props.get("parent")
+            refs = {"parent": [parent._moId]} if parent is not None else {}
+            records.append((obj._moId, type(obj).__name__, props.get("name"), refs))
+        self.topology = Topology.from_records(records)
+        self._paths = {}
+        self._names = {}  # (resource type, moref) -> unique terraform name
+        self._used = set()
+        self.skipped = []  # (moref, reason)
+        self._data = {}  # data source type -> {moref referenced by the resources: datacenter moref}
+
+    def path(self, moref: str) -> str:
+        """Inventory path (/DC0/vm/folder/vm1) - None if an ancestor was not collected"""
+        if moref not in self._paths:
+            # the last ancestor is the root folder
+            morefs = list(reversed(self.topology.ancestors(moref)[:-1])) + [moref]
+            names = [self.topology.names[self.topology.node(m)] for m in morefs]
+            self._paths[moref] = "/" + "/".join(names) if all(names) else None
+        return self._paths[moref]
+
+    def datacenter(self, moref: str) -> str:
+        """Moref of the datacenter of an object"""
+        for ancestor in self.topology.ancestors(moref):
+            if isinstance(self.objects.get(ancestor, (None,))[0], vim.Datacenter):
+                return ancestor
+        return None
+
+    def name(self, resource_type: str, moref: str) -> str:
+        """Unique terraform name of an object by resource type (moref suffix on collision)"""
+        key = (resource_type, moref)
+        if key not in self._names:
+            value = identifier(self.objects[moref][1].get("name"))
+            if (resource_type, value) in self._used:
+                value = f"{value}_{identifier(moref)}"
+            self._used.add((resource_type, value))
+            self._names[key] = value
+        return self._names[key]
+
+    def _of_type(self, object_type: Any) -> List[Tuple[str, Any, Mapping]]:
+        return [
+            (moref, obj, props) for moref, (obj, props) in self.objects.items() if isinstance(obj, object_type)
+        ]
+
+    def relative_path(self, moref: str, datacenter: str) -> List[str]:
+        """Inventory path of moref under its datacenter: ['vm', 'folder', 'vm1']"""
+        return self.path(moref)[len(self.path(datacenter)) + 1:].split("/")
+
+    def _folder(self, moref: str, props: Mapping) -> Tuple[str, str, str]:
+        """(type, path relative to its datacenter, datacenter moref) of a folder - None for root folders"""
+        path = self.path(moref)
+        datacenter = self.datacenter(moref)
+        if path is None:
+            return None
+        if datacenter is None:
+            return "datacenter", path.lstrip("/"), None
+        parts = self.relative_path(moref, datacenter)
+        if len(parts) < 2 or parts[0] not in FOLDER_TYPES:
+            return None
+        return FOLDER_TYPES[parts[0]], "/".join(parts[1:]), datacenter
+
+    def _vm(self, moref: str, props: Mapping, data: Mapping) -> str:
+        if props.get("config.template"):
+            self.skipped.append((moref, "template"))
+            return None
+        pool, datastores = props.get("resourcePool"), props.get("datastore") or []
+        path, datacenter = self.path(moref), self.datacenter(moref)
+        if pool is None or not datastores or path is None or datacenter is None:
+            self.skipped.append((moref, "missing resource pool, datastore or inventory path"))
+            return None
+        folder = "/".join(self.relative_path(moref, datacenter)[1:-1])
+
+        def ref(resource_type, target):
+            # datastores and networks outside of a datacenter are searched in the one of the VM
+            data.setdefault(resource_type, {}).setdefault(target, self.datacenter(target) or datacenter)
+            return f"data.{resource_type}.{self.name(resource_type, target)}.id"
+
+        attributes = [
+            ("name", hcl_string(props.get("name"))),
+            ("resource_pool_id", ref("vsphere_resource_pool", pool._moId)),
+            ("datastore_id", ref("vsphere_datastore", datastores[0]._moId)),
+        ]
+        if folder:
+            attributes.append(("folder", hcl_string(folder)))
+        for name, path_name in (
+            ("num_cpus", "config.hardware.numCPU"),
+            ("num_cores_per_socket", "config.hardware.numCoresPerSocket"),
+            ("memory", "config.hardware.memoryMB"),
+            ("guest_id", "config.guestId"),
+        ):
+            if props.get(path_name) is not None:
+                attributes.append((name, hcl_value(props[path_name])))
+        devices = props.get("config.hardware.device") or []
+        for device in devices:
+            if not isinstance(device, vim.vm.device.VirtualEthernetCard):
+                continue
+            network = nic_network(device)
+            if network not in self.objects:
+                continue
+            nic = [("network_id", ref("vsphere_network", network))]
+            if adapter_type(device):
+                nic.append(("adapter_type", hcl_string(adapter_type(device))))
+            attributes.append(("network_interface", Block(nic)))
+        attributes.extend(("disk", disk) for disk in disks(devices))
+        data.setdefault("vsphere_datacenter", {})[datacenter] = datacenter
+        return block("resource", ["vsphere_virtual_machine", self.name("vsphere_virtual_machine", moref)], attributes)
+
+    def _comment(self, moref: str) -> str:
+        # resource_id: same value as Client.resource_id
+        return f"# {self.topology.resource_id(moref)}\n"
+
+    def resources(self) -> List[Tuple[str, str, str, str]]:
+        """(resource type, terraform name, import id, HCL block) of the folders and VMs"""
+        result = []
+        for moref, obj, props in self._of_type(vim.Folder):
+            folder = self._folder(moref, props)
+            if folder is None:
+                continue
+            folder_type, path, datacenter = folder
+            name = self.name("vsphere_folder", moref)
+            attributes = [("path", hcl_string(path)), ("type", hcl_string(folder_type))]
+            if datacenter:
+                datacenter_name = self.name("vsphere_datacenter", datacenter)
+                attributes.append(("datacenter_id", f"data.vsphere_datacenter.{datacenter_name}.id"))
+                self._data.setdefault("vsphere_datacenter", {})[datacenter] = datacenter
+            hcl = self._comment(moref) + block("resource", ["vsphere_folder", name], attributes)
+            result.append(("vsphere_folder", name, self.path(moref), hcl))
+        for moref, obj, props in self._of_type(vim.VirtualMachine):
+            hcl = self._vm(moref, props, self._data)
+            if hcl is not None:
+                name = self.name("vsphere_virtual_machine", moref)
+                result.append(("vsphere_virtual_machine", name, self.path(moref), self._comment(moref) + hcl))
+        return result
+
+    def data_sources(self) -> List[str]:
+        """HCL data blocks of the datacenters, datastores, networks and pools referenced by the resources"""
+        result = []
+        for resource_type in ("vsphere_datacenter", "vsphere_datastore", "vsphere_network", "vsphere_resource_pool"):
+            for moref, datacenter in sorted(self._data.get(resource_type, {}).items()):
+                props = self.objects[moref][1]
+                if resource_type == "vsphere_datacenter":
+                    attributes = [("name", hcl_string(props.get("name")))]
+                else:
+                    # pools are found by inventory path, names are not unique
+                    name = self.path(moref) if resource_type == "vsphere_resource_pool" else props.get("name")
+                    attributes = [
+                        ("name", hcl_string(name)),
+                        ("datacenter_id", f"data.vsphere_datacenter.{self.name('vsphere_datacenter', datacenter)}.id"),
+                    ]
+                result.append(block("data", [resource_type, self.name(resource_type, moref)], attributes))
+        return result
+
+    def render(self) -> Tuple[str, str]:
+        """(configuration, import blocks) - HCL of all the objects in one pass"""
+        self._data = {}
+        self.skipped = []
+        resources = self.resources()
+        imports = [
+            block("import", [], [("to", f"{resource_type}.{name}"), ("id", hcl_string(import_id))])
+            for resource_type, name, import_id, _ in resources
+        ]
+        config = self.data_sources() + [hcl for _, _, _, hcl in resources]
+        return "\n\n".join(config) + "\n", "\n\n".join(imports) + "\n"
+
+    def write(self, directory: str, config_name: str = "inventory.tf", imports_name: str = "imports.tf") -> List[str]:
+        """Write the configuration and the import blocks in directory - return the paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for file_name, content in zip((config_name, imports_name), self.render()):
+            path = os.path.join(directory, file_name)
+            with open(path, "w", encoding="utf-8") as fp:
+                fp.write(content)
+            paths.append(path)
+        return paths
@@ -0,0 +1,285 @@
+import json
+from array import array
+from typing import List, Mapping, Iterable, Tuple, Any
+from xml.sax.saxutils import escape, quoteattr
+
+from pyVmomi import vim
+
+# Kind of edges, index is stored in Topology.kinds
+EDGE_KINDS = ("parent", "host", "datastore", "network", "resourcePool")
+
+# Property path collected for each edge kind, by managed object type
+# The first matching type in the list win (subclasses before their parents)
+REFERENCE_PATHS = [
+    (vim.VirtualMachine, {
+        "parent": "parent",
+        "host": "runtime.host",
+        "datastore": "datastore",
+        "network": "network",
+        "resourcePool": "resourcePool",
+    }),
+    (vim.VirtualApp, {
+        "parent": "parent",
+        "datastore": "datastore",
+        "network": "network",
+        "resourcePool": "resourcePool",
+    }),
+    (vim.ResourcePool, {
+        "parent": "parent",
+        "resourcePool": "resourcePool",
+    }),
+    (vim.ComputeResource, {
+        "parent": "parent",
+        "host": "host",
+        "datastore": "datastore",
+        "network": "network",
+        "resourcePool": "resourcePool",
+    }),
+    (vim.HostSystem, {
+        "parent": "parent",
+        "datastore": "datastore",
+        "network": "network",
+    }),
+    (vim.Datacenter, {
+        "parent": "parent",
+        "datastore": "datastore",
+        "network": "network",
+    }),
+    (vim.Datastore, {
+        "parent": "parent",
+        "host": "host",
+    }),
+    (vim.Network, {
+        "parent": "parent",
+        "host": "host",
+    }),
+    (vim.ManagedEntity, {
+        "parent": "parent",
+    }),
+]
+
+
+def reference_paths(vim_type) -> Mapping:
+    """Return {edge kind: property path} for a managed object type"""
+    for _type, paths in REFERENCE_PATHS:
+        if issubclass(vim_type, _type):
+            return paths
+    return {}
+
+
+def reference_morefs(value) -> List[Any]:
+    """Return the list of managed objects referenced by a property value
+
+    Handle single reference, array of references and Datastore.HostMount[]
+    """
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    refs = []
+    for item in value:
+        if isinstance(item, vim.Datastore.HostMount):
+            item = item.key
+        if item is not None:
+            refs.append(item)
+    return refs
+
+
+class Topology:
+    """In-memory graph of a vCenter inventory
+
+    Nodes are identified by an integer id (index in ``morefs``).
+    Outgoing edges are stored in CSR form: the targets of node ``i`` are
+    ``targets[offsets[i]:offsets[i + 1]]`` and their kinds (index in
+    EDGE_KINDS) are at the same positions in ``kinds``.
+    Incoming edges and children (reverse of parent edges) use the same layout.
+    """
+
+    def __init__(self):
+        self.morefs: List[str] = []
+        self.types: List[str] = []
+        self.names: List[str] = []
+        self.index: Mapping[str, int] = {}
+
+        self.parents = array('l')
+
+        self.offsets = array('L', [0])
+        self.targets = array('L')
+        self.kinds = array('B')
+
+        self.in_offsets = array('L', [0])
+        self.in_targets = array('L')
+        self.in_kinds = array('B')
+
+        self.child_offsets = array('L', [0])
+        self.child_targets = array('L')
+
+    def __len__(self):
+        return len(self.morefs)
+
+    def __contains__(self, moref):
+        return moref in self.index
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, str, Mapping[str, List[str]]]]) -> "Topology":
+        """Build the graph from (moref, type, name, {edge kind: [morefs]}) records
+
+        Referenced morefs without record are added as nodes without type and name.
+        """
+        topology = cls()
+        morefs, types, names, index = topology.morefs, topology.types, topology.names, topology.index
+
+        def add_node(moref, _type=None, name=None):
+            node = index.get(moref)
+            if node is None:
+                node = index[moref] = len(morefs)
+                morefs.append(moref)
+                types.append(_type)
+                names.append(name)
+            elif _type is not None:
+                types[node] = _type
+                names[node] = name
+            return node
+
+        edges = []
+        for moref, _type, name, refs in records:
+            source = add_node(moref, _type, name)
+            for kind, targets in refs.items():
+                kind_idx = EDGE_KINDS.index(kind)
+                for target in targets:
+                    edges.append((source, add_node(target), kind_idx))
+
+        count = len(morefs)
+        parent_kind = EDGE_KINDS.index("parent")
+        topology.parents = array('l', [-1]) * count
+        for source, target, kind in edges:
+            if kind == parent_kind:
+                topology.parents[source] = target
+
+        topology.offsets, topology.targets, topology.kinds = cls._csr(
+            count, ((s, t, k) for s, t, k in edges)
+        )
+        topology.in_offsets, topology.in_targets, topology.in_kinds = cls._csr(
+            count, ((t, s, k) for s, t, k in edges)
+        )
+        topology.child_offsets, topology.child_targets, _ = cls._csr(
+            count, ((p, c, parent_kind) for c, p in enumerate(topology.parents) if p >= 0)
+        )
+        return topology
+
+    @staticmethod
+    def _csr(count, edges):
+        edges = sorted(edges)
+        offsets = array('L', [0]) * (count + 1)
+        for source, _, _ in edges:
+            offsets[source + 1] += 1
+        for i in range(count):
+            offsets[i + 1] += offsets[i]
+        targets = array('L', [t for _, t, _ in edges])
+        kinds = array('B', [k for _, _, k in edges])
+        return offsets, targets, kinds
+
+    def node(self, moref: str) -> int:
+        """Return node id of moref - raise KeyError if not found"""
+        return self.index[moref]
+
+    def neighbors(self, moref: str, kind: str = None, direction: str = "out") -> List[str]:
+        """Return morefs linked to moref
+
+        Args:
+            kind: filter on edge kind (see EDGE_KINDS)
+            direction: "out" (referenced by moref), "in" (referencing moref) or "both"
+        """
+        node = self.index[moref]
+        kind_idx = EDGE_KINDS.index(kind) if kind else None
+        result = []
+        layouts = []
+        if direction in ("out", "both"):
+            layouts.append((self.offsets, self.targets, self.kinds))
+        if direction in ("in", "both"):
+            layouts.append((self.in_offsets, self.in_targets, self.in_kinds))
+        for offsets, targets, kinds in layouts:
+            for pos in range(offsets[node], offsets[node + 1]):
+                if kind_idx is None or kinds[pos] == kind_idx:
+                    result.append(self.morefs[targets[pos]])
+        return result
+
+    def children(self, moref: str) -> List[str]:
+        node = self.index[moref]
+        return [
+            self.morefs[c]
+            for c in self.child_targets[self.child_offsets[node]:self.child_offsets[node + 1]]
+        ]
+
+    def ancestors(self, moref: str) -> List[str]:
+        """Return parents of moref, from the nearest to the root"""
+        result = []
+        node = self.parents[self.index[moref]]
+        while node >= 0:
+            result.append(self.morefs[node])
+            node = self.parents[node]
+        return result
+
+    def subtree(self, moref: str) -> List[str]:
+        """Return moref and all its descendants (depth first)"""
+        result = []
+        stack = [self.index[moref]]
+        while stack:
+            node = stack.pop()
+            result.append(self.morefs[node])
+            start, end = self.child_offsets[node], self.child_offsets[node + 1]
+            stack.extend(reversed(self.child_targets[start:end]))
+        return result
+
+    def resource_id(self, moref: str) -> str:
+        """Same value as Client.resource_id without any call to the vCenter"""
+        parents = self.ancestors(moref)
+        parents.reverse()
+        parents.append(moref)
+        return "/".join(parents).lower()
+
+    def edges(self):  # -> Iterator[Tuple[str, str, str]]
+        """Iterate on (source moref, target moref, edge kind)"""
+        for node, moref in enumerate(self.morefs):
+            for pos in range(self.offsets[node], self.offsets[node + 1]):
+                yield moref, self.morefs[self.targets[pos]], EDGE_KINDS[self.kinds[pos]]
+
+    def to_dict(self) -> Mapping:
+        return {
+            "nodes": [
+                {"id": moref, "type": self.types[node], "name": self.names[node]}
+                for node, moref in enumerate(self.morefs)
+            ],
+            "edges": [
+                {"source": source, "target": target, "kind": kind}
+                for source, target, kind in self.edges()
+            ],
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_graphml(self) -> str:
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+            '<key id="type" for="node" attr.name="type" attr.type="string"/>',
+            '<key id="name" for="node" attr.name="name" attr.type="string"/>',
+            '<key id="kind" for="edge" attr.name="kind" attr.type="string"/>',
+            '<graph id="vsphere" edgedefault="directed">',
+        ]
+        for node, moref in enumerate(self.morefs):
+            lines.append(f'<node id={quoteattr(moref)}>')
+            if self.types[node] is not None:
+                lines.append(f'<data key="type">{escape(self.types[node])}</data>')
+            if self.names[node] is not None:
+                lines.append(f'<data key="name">{escape(self.names[node])}</data>')
+            lines.append('</node>')
+        for source, target, kind in self.edges():
+            lines.append(
+                f'<edge source={quoteattr(source)} target={quoteattr(target)}>'
+                f'<data key="kind">{kind}</data></edge>'
+            )
+        lines.append('</graph>')
+        lines.append('</graphml>')
+        return "\n".join(lines)
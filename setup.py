@@ -46,7 +46,23 @@ ci_requires = [
     'codecov',
 ]
 
+fast_requires = [
+    'orjson',
+    'msgspec',
+]
+
+parquet_requires = [
+    'pyarrow',
+]
+
+perf_requires = [
+    'numpy',
+]
+
 extras_requires = {
+    'fast': fast_requires,
+    'parquet': parquet_requires,
+    'perf': perf_requires,
     'tests': tests_requires,
     'dev': dev_requires,
     'doc': doc_requires,
@@ -85,9 +101,9 @@ setup(
         'Programming Language :: Python :: 3.7',
     ],
     entry_points={
-        #'console_scripts': [
-        #    'mce-vsphere = mce_lib_vsphere.cli:main',
-        #],
+        'console_scripts': [
+            'mce-vsphere = mce_lib_vsphere.cli:main',
+        ],
     }
 )
 
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from pyVmomi import vim
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.browser import FileRecord, file_records, is_orphaned, join_path, orphan_report, used_files
+
+Browser = vim.host.DatastoreBrowser
+
+
+def test_join_path():
+    assert join_path("[ds1] vm1/", "vm1.vmdk") == "[ds1] vm1/vm1.vmdk"
+    assert join_path("[ds1] vm1", "vm1.vmdk") == "[ds1] vm1/vm1.vmdk"
+    assert join_path("[ds1]", "a.iso") == "[ds1] a.iso"
+    assert join_path("[ds1] ", "a.iso") == "[ds1] a.iso"
+
+
+def test_orphaned_files():
+    modified = datetime(2020, 1, 1)
+    results = [
+        Browser.SearchResults(folderPath="[ds1] vm1/", file=[
+            Browser.FileInfo(path="vm1.vmdk", fileSize=512, modification=modified),
+            Browser.FileInfo(path="vm1-flat.vmdk", fileSize=10 * 1024 ** 3, modification=modified),
+            Browser.FileInfo(path="old.vmdk", fileSize=500, modification=modified),
+        ]),
+        Browser.SearchResults(folderPath="[ds1] broken/", file=[Browser.FileInfo(path="broken.vmdk", fileSize=1)]),
+        Browser.SearchResults(folderPath="[ds1] fcd/", file=[Browser.FileInfo(path="disk.vmdk", fileSize=1)]),
+        Browser.SearchResults(folderPath="[ds1]", file=[Browser.FileInfo(path="lost-flat.vmdk", fileSize=2048)]),
+    ]
+    layouts = [
+        (vim.VirtualMachine("vm-1"), {
+            "layoutEx.file": [
+                vim.vm.FileLayoutEx.FileInfo(key=0, name="[ds1] vm1/vm1.vmx", type="config", size=1, uniqueSize=1),
+                vim.vm.FileLayoutEx.FileInfo(key=1, name="[ds1] vm1/vm1.vmdk", type="diskDescriptor", size=1, uniqueSize=1),
+                vim.vm.FileLayoutEx.FileInfo(key=2, name="[ds1] vm1/vm1-flat.vmdk", type="diskExtent", size=1, uniqueSize=1),
+            ],
+            "summary.config.vmPathName": "[ds1] vm1/vm1.vmx",
+        }),
+        # inaccessible VM: no layout
+        (vim.VirtualMachine("vm-2"), {"summary.config.vmPathName": "[ds1] broken/broken.vmx"}),
+    ]
+
+    records = list(file_records("datastore-1", results))
+    assert records[0] == FileRecord("datastore-1", "[ds1] vm1/vm1.vmdk", 512, modified)
+
+    paths, folders = used_files(layouts)
+    orphans = [record for record in records if is_orphaned(record, paths, folders)]
+    assert [record.path for record in orphans] == ["[ds1] vm1/old.vmdk", "[ds1] lost-flat.vmdk"]
+
+    report = orphan_report(orphans)["datastore-1"]
+    assert report.name == "ds1"
+    assert report.size == 2548
+    assert len(report.files) == 2
+
+
+def test_find_orphaned_files(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        records = list(client.search_datastores())
+        assert records
+        assert all(record.path.endswith(".vmdk") for record in records)
+
+        assert list(client.find_orphaned_files()) == []
@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+import pytest
+from pyVmomi import vim
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.bulk import BulkRunner, Job
+from mce_lib_vsphere.exceptions import TaskError, TaskTimeoutError
+
+
+class FakeTracker:
+    """Complete the oldest task at each wait - record the running tasks by host/datastore"""
+
+    def __init__(self, jobs):
+        self.jobs = {}
+        self.running = []
+        self.max_by_host = defaultdict(int)
+        self.max_by_datastore = defaultdict(int)
+        self.jobs_by_target = {job.target: job for job in jobs}
+
+    def add(self, tasks):
+        task, = tasks
+        self.running.append(task)
+        job = self.jobs_by_target[task.target]
+        for host in job.hosts:
+            count = sum(1 for t in self.running if host in self.jobs_by_target[t.target].hosts)
+            self.max_by_host[host] = max(self.max_by_host[host], count)
+        for datastore in job.datastores:
+            count = sum(1 for t in self.running if datastore in self.jobs_by_target[t.target].datastores)
+            self.max_by_datastore[datastore] = max(self.max_by_datastore[datastore], count)
+
+    def wait(self, timeout):
+        if not self.running:
+            return []
+        task = self.running.pop(0)
+        return [(task, {"info.state": "success", "info.result": f"result-{task.target}"})]
+
+
+class FakeTask:
+
+    def __init__(self, target):
+        self.target = target
+        self._moId = f"task-{target}"
+
+
+def make_job(index, host, datastore):
+    return Job(f"vm{index}", "power_on", lambda: FakeTask(f"vm{index}"), [host], [datastore])
+
+
+def test_bulk_runner_caps():
+    jobs = [make_job(i, f"host-{i % 2}", f"ds-{i % 3}") for i in range(30)]
+    tracker = FakeTracker(jobs)
+    runner = BulkRunner(tracker, max_per_host=3, max_per_datastore=2, max_in_flight=5)
+
+    results = list(runner.run(jobs))
+
+    assert len(results) == 30
+    assert {result.target for result in results} == {job.target for job in jobs}
+    assert all(result.state == "success" for result in results)
+    assert results[0].result == "result-vm0"
+    assert max(tracker.max_by_host.values()) <= 3
+    assert max(tracker.max_by_datastore.values()) == 2
+    assert not any(runner.host_counts.values())
+
+
+def test_bulk_runner_submit_error():
+    def fail():
+        raise vim.fault.InvalidState(msg="invalid state")
+
+    jobs = [Job("vm0", "power_on", fail, ["host-0"], []), make_job(1, "host-0", "ds-0")]
+    results = list(BulkRunner(FakeTracker(jobs)).run(jobs))
+
+    assert [result.state for result in results] == ["error", "success"]
+    assert isinstance(results[0].error, TaskError)
+    assert isinstance(results[0].error.fault, vim.fault.InvalidState)
+
+
+def test_bulk_runner_timeout():
+    class NeverDone(FakeTracker):
+        def wait(self, timeout):
+            return []
+
+    jobs = [make_job(0, "host-0", "ds-0")]
+    with pytest.raises(TaskTimeoutError):
+        list(BulkRunner(NeverDone(jobs), timeout=0).run(jobs))
+
+
+def test_bulk_runner_invalid_caps():
+    with pytest.raises(ValueError):
+        BulkRunner(FakeTracker([]), max_per_host=0)
+    with pytest.raises(ValueError):
+        BulkRunner(FakeTracker([]), max_per_datastore=0)
+
+
+def test_bulk_runner_poll_interval():
+    class SlowTracker(FakeTracker):
+        timeouts = []
+
+        def wait(self, timeout):
+            self.timeouts.append(timeout)
+            return []
+
+    jobs = [make_job(0, "host-0", "ds-0")]
+    tracker = SlowTracker(jobs)
+    with pytest.raises(TaskTimeoutError):
+        list(BulkRunner(tracker, timeout=0.01).run(jobs))
+    assert tracker.timeouts and min(tracker.timeouts) >= 1
+
+
+# the bulk tests change their inventory: topologies of their own, not the shared vsphere_server
+
+def test_power_vms(vcsim_factory):
+    url = vcsim_factory(dc=1, cluster=1, hosts=2, vms=4, app=0, pod=0)
+
+    with core.Client(host=url) as client:
+        client.connect()
+        vms = client.get_all_vms()
+
+        results = list(client.power_off_vms(vms, max_per_host=1))
+        assert len(results) == len(vms)
+        assert all(result.state == "success" for result in results)
+
+        results = list(client.power_off_vms(vms))
+        assert all(result.state == "skipped" for result in results)
+
+        results = list(client.power_on_vms(vms, max_per_datastore=1))
+        assert all(result.state == "success" for result in results)
+
+
+def test_clone_vms(vcsim_factory):
+    url = vcsim_factory(dc=1, cluster=1, hosts=1, vms=2, app=0, pod=0)
+
+    with core.Client(host=url) as client:
+        client.connect()
+        template = client.get_all_vms()[0]
+        names = [f"clone{i}" for i in range(3)]
+
+        results = list(client.clone_vms(template, names))
+        assert sorted(result.target for result in results) == names
+        assert all(isinstance(result.result, vim.VirtualMachine) for result in results)
+
+        results = list(client.reconfigure_vms([result.result for result in results], num_cpus=2))
+        assert all(result.state == "success" for result in results)
@@ -0,0 +1,46 @@
+from pyVmomi import vim
+
+from mce_lib_vsphere.capabilities import Capabilities, get_capabilities, pyvmomi_version
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+
+def test_pyvmomi_version():
+    assert pyvmomi_version("6.5") == "vim.version.version11"
+    assert pyvmomi_version("6.7") == "vim.version.version12"
+    # unknown: newest version below
+    assert pyvmomi_version("6.7.0.42") == "vim.version.version12"
+    assert pyvmomi_version("1.0") == pyvmomi_version("2.5")
+
+
+def test_capabilities():
+    capabilities = Capabilities("6.5")
+    assert capabilities.version == "vim.version.version11"
+    assert capabilities.supports(vim.VirtualMachine, "config.hardware.numCPU")
+    assert not capabilities.supports(vim.VirtualMachine, "config.createDate")
+    assert not capabilities.supports(vim.VirtualMachine, "guest.toolsStatus2")
+    assert capabilities.filter_paths(vim.VirtualMachine, ["name", "config.createDate"]) == ["name"]
+    # unknown in every version: left to the vCenter (InvalidProperty)
+    paths = ["name", "nmae", "runtime.powerStat"]
+    assert capabilities.filter_paths(vim.VirtualMachine, paths) == paths
+    assert "name" in capabilities.property_names(vim.VirtualMachine)
+
+    assert Capabilities("6.7").supports(vim.VirtualMachine, "config.createDate")
+    # the stub version limits the server version
+    assert Capabilities("6.7", "vim.version.version11").version == "vim.version.version11"
+
+
+def test_get_capabilities_cache():
+    first = get_capabilities("vcenter1:443", "6.5")
+    assert get_capabilities("vcenter1:443", "6.5") is first
+    assert get_capabilities("vcenter2:443", "6.5") is not first
+
+
+def test_client_capabilities():
+    generator = InventoryGenerator(vms=5)
+    client = generator.client(path_set=["name"])
+    assert client.capabilities.api_version == "6.5"
+    assert client.capabilities is client.capabilities
+
+    # config.createDate (6.7) is not asked to a 6.5 vCenter
+    names = [props["name"] for _, props in client.collect_properties([vim.VirtualMachine], ["name", "config.createDate"])]
+    assert len(names) == 5
@@ -0,0 +1,80 @@
+import json
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from mce_lib_vsphere import cli
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+
+class FakeClient:
+    """collect_properties of a synthetic inventory, all types"""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def collect_properties(self, object_types, path_set):
+        for obj_content in self.generator.object_contents(object_types, path_set):
+            yield obj_content.obj, {prop.name: prop.val for prop in obj_content.propSet}
+
+
+def test_export_ndjson():
+    generator = InventoryGenerator(vms=250)
+    client = generator.client(path_set=cli.EXPORT_TYPES["vms"][1], page_size=100)
+
+    result = CliRunner().invoke(cli.main, ["export", "--types", "vms"], obj={"client": client})
+    assert result.exit_code == 0, result.output
+    lines = result.stdout.splitlines()
+    assert len(lines) == 250
+
+    record = json.loads(lines[0])
+    assert record["type"] == "vmware/VirtualMachine"
+    assert record["moref"] == "vm-1000"
+    assert record["name"] == "SYN_VM0"
+    assert record["properties"]["runtime.host"].startswith("vim.HostSystem:host-")
+    assert "250 records" in result.stderr
+
+
+def test_export_parallel_types(tmpdir):
+    generator = InventoryGenerator(vms=100, hosts=7, datastores=3)
+    path = str(tmpdir.join("inventory.ndjson"))
+
+    result = CliRunner().invoke(
+        cli.main, ["export", "--types", "vms,hosts,datastores", "--output", path, "--quiet"],
+        obj={"client": FakeClient(generator)},
+    )
+    assert result.exit_code == 0, result.output
+    assert result.stderr == ""
+    with open(path) as fp:
+        records = [json.loads(line) for line in fp]
+    types = [record["type"] for record in records]
+    assert types.count("vmware/VirtualMachine") == 100
+    assert types.count("vmware/HostSystem") == 7
+    assert types.count("vmware/Datastore") == 3
+
+
+def test_export_unknown_type():
+    result = CliRunner().invoke(cli.main, ["export", "--types", "vms,disks"], obj={"client": None})
+    assert result.exit_code == 2
+    assert "unknown types ['disks']" in result.output
+
+
+def test_export_writer_failure(monkeypatch):
+    monkeypatch.setattr(cli, "QUEUE_SIZE", 5)
+
+    class FailingWriter:
+        def write(self, record):
+            raise OSError("no space left on device")
+
+    threads = threading.active_count()
+    with pytest.raises(OSError):
+        cli.export_records(FakeClient(InventoryGenerator(vms=100, hosts=7)), ["vms", "hosts"], FailingWriter(), workers=2)
+    # the collector threads are stopped, not blocked on the full queue
+    assert threading.active_count() == threads
+
+
+def test_export_without_url():
+    result = CliRunner(env={"MCE_VCENTER_URL": None}).invoke(cli.main, ["export"])
+    assert result.exit_code == 2
+    assert "no vCenter url" in result.output
@@ -1,12 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+import gc
+import threading
 from pprint import pprint
 
 from freezegun import freeze_time
 import pytest
-from pyVmomi import vim
+from pyVmomi import vim, vmodl
 from furl import furl
 
 from mce_lib_vsphere import core
 from mce_lib_vsphere import exceptions
+from mce_lib_vsphere.replay import Cassette
 
 def test_parse_url():
 
@@ -720,3 +724,78 @@ def test_resource_id(vsphere_server):
         resource_id = client.resource_id(dc)
         assert resource_id == 'group-d1/datacenter-2'
 
+
+def test_thread_safe_stubs():
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", vim.ServiceInstanceContent(
+        rootFolder=vim.Folder("group-d1"),
+        propertyCollector=vmodl.query.PropertyCollector("propertyCollector"),
+        about=vim.AboutInfo(name="VMware vCenter Server", apiVersion="6.5"),
+    ))
+    client = core.Client.from_cassette(cassette)
+    client.thread_safe = True
+    client.si._stub.cookie = 'vmware_soap_session="abc"'
+    main_stub = client.si._stub
+
+    def worker(_):
+        first = client.si
+        assert client.si is first
+        return first._stub, client.content.about.name
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(worker, range(8)))
+
+    stubs = {id(stub): stub for stub, _ in results}
+    assert all(name == "VMware vCenter Server" for _, name in results)
+    assert main_stub not in stubs.values()
+    assert all(stub.cookie == main_stub.cookie and stub.pool is not main_stub.pool for stub in stubs.values())
+    # one RetrieveServiceContent by thread, no login
+    assert cassette.positions["RetrieveServiceContent"] == 1 + len(stubs)
+    assert client.si._stub is main_stub
+
+    # the clones are dropped with their threads
+    del results, stubs
+    gc.collect()
+    assert client._clones == []
+
+    client.disconnect(logout=False)
+    assert client._clones == []
+
+
+def test_thread_safe_owner_exited():
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", vim.ServiceInstanceContent(
+        rootFolder=vim.Folder("group-d1"),
+        propertyCollector=vmodl.query.PropertyCollector("propertyCollector"),
+        about=vim.AboutInfo(name="VMware vCenter Server", apiVersion="6.5"),
+    ))
+    clients = []
+    # connected by a thread which exits: its ident can be reused by the next threads
+    owner = threading.Thread(target=lambda: clients.append(core.Client.from_cassette(cassette)))
+    owner.start()
+    owner.join()
+    client, = clients
+    client.thread_safe = True
+
+    stubs = []
+    thread = threading.Thread(target=lambda: stubs.append(client.si._stub))
+    thread.start()
+    thread.join()
+    assert stubs[0] is not client._si._stub
+
+
+def test_thread_safe_session(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url, thread_safe=True) as client:
+        session_key = client.content.sessionManager.currentSession.key
+
+        def worker(_):
+            vms = client.get_all_vms()
+            return client.content.sessionManager.currentSession.key, [client._get_vm_infos(vm)["name"] for vm in vms]
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(worker, range(8)))
+
+        assert {key for key, _ in results} == {session_key}
+        assert len({tuple(sorted(names)) for _, names in results}) == 1
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pyVmomi import vim, Iso8601
+
+from mce_lib_vsphere.encoders import ENCODERS, get_encoder, format_datetime
+from mce_lib_vsphere.store import ReferenceJSONEncoder
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+INSTALLED = [name for name, (_, module) in ENCODERS.items() if module is not None]
+
+
+def expected(obj):
+    return json.dumps(obj, cls=ReferenceJSONEncoder, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.mark.parametrize("dt", [
+    datetime(2020, 5, 1, tzinfo=Iso8601.TZInfo()),
+    datetime(2020, 5, 1, 1, 2, 3, 500000, tzinfo=timezone.utc),
+    datetime(2020, 5, 1, 1, 2, 3, 456, tzinfo=timezone(timedelta(hours=2))),
+    datetime(2020, 5, 1, 1, 2, 3, tzinfo=timezone(timedelta(hours=-9, minutes=-30))),
+    datetime(2020, 5, 1, 1, 2, 3, 120000),
+])
+def test_format_datetime(dt):
+    assert format_datetime(dt) == Iso8601.ISO8601Format(dt)
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_encoder_output(name):
+    encoder = get_encoder(name)
+    record = {
+        "moref": "vm-1",
+        "host": vim.HostSystem("host-1"),
+        "datastore": vim.Datastore.Array([vim.Datastore("datastore-1")]),
+        "created": datetime(2020, 5, 1, 1, 2, 3, 500000, tzinfo=Iso8601.TZInfo()),
+        "runtime": vim.vm.RuntimeInfo(
+            powerState="poweredOn", bootTime=datetime(2020, 5, 1, 1, 2, 3, 120000, tzinfo=timezone.utc)
+        ),
+        "type": str,
+        "count": 3,
+    }
+    assert encoder.encode(record) == expected(record)
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_encoder_nested_datetimes(name):
+    created = datetime(2020, 5, 1, 1, 2, 3, 120000, tzinfo=timezone.utc)
+    record = {"created": created, "snapshots": [{"created": created}], "events": {"last": {"created": created}}}
+    assert get_encoder(name).encode(record) == expected(record)
+    assert b'"2020-05-01T01:02:03.12Z"' in get_encoder(name).encode(record)
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_encode_lines(name):
+    generator = InventoryGenerator(vms=50)
+    records = [
+        {"moref": obj._moId, "properties": {"runtime": props["runtime"], "guest.net": props["guest"].net}}
+        for obj, props in generator.iter_objects([vim.VirtualMachine])
+    ]
+    assert get_encoder(name).encode_lines(records) == b"".join(expected(r) + b"\n" for r in records)
+
+
+def test_get_encoder():
+    assert get_encoder().name == INSTALLED[0]
+    assert get_encoder("json").name == "json"
+    with pytest.raises(ValueError):
+        get_encoder("pickle")
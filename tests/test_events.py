@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from pyVmomi import vim, vmodl, Iso8601
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.events import build_filter_spec, to_record
+from mce_lib_vsphere.replay import Cassette
+from mce_lib_vsphere.store import InventoryStore
+
+NOW = datetime(2020, 5, 1, tzinfo=Iso8601.TZInfo())
+
+
+def service_content():
+    return vim.ServiceInstanceContent(
+        rootFolder=vim.Folder("group-d1"),
+        propertyCollector=vmodl.query.PropertyCollector("propertyCollector"),
+        eventManager=vim.event.EventManager("EventManager"),
+        about=vim.AboutInfo(
+            name="VMware vCenter Server", fullName="VMware vCenter Server 6.5.0", vendor="VMware, Inc.",
+            version="6.5.0", build="5973321", osType="linux-amd64", productLineId="vpx",
+            apiType="VirtualCenter", apiVersion="6.5",
+        ),
+    )
+
+
+def power_on_event(key):
+    return vim.event.VmPoweredOnEvent(
+        key=key, chainId=key, createdTime=NOW + timedelta(seconds=key), userName="VSPHERE.LOCAL\\admin",
+        fullFormattedMessage=f"vm{key} on host1 is powered on", template=False,
+        datacenter=vim.event.DatacenterEventArgument(name="DC0", datacenter=vim.Datacenter("datacenter-2")),
+        host=vim.event.HostEventArgument(name="host1", host=vim.HostSystem("host-1")),
+        vm=vim.event.VmEventArgument(name=f"vm{key}", vm=vim.VirtualMachine(f"vm-{key}")),
+    )
+
+
+def events_client(*pages):
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", service_content())
+    cassette.add("CreateCollectorForEvents", vim.event.EventHistoryCollector("session[1]events"))
+    cassette.add("RewindCollector")
+    cassette.add("DestroyCollector")
+    for page in pages:
+        cassette.add("ReadNextEvents", vim.event.Event.Array([power_on_event(key) for key in page]))
+    cassette.add("ReadNextEvents")
+    return core.Client.from_cassette(cassette)
+
+
+def test_to_record():
+    record = to_record(power_on_event(7))
+    assert record.key == 7
+    assert record.type == "VmPoweredOnEvent"
+    assert record.vm == "vm-7"
+    assert record.vm_name == "vm7"
+    assert record.host == "host-1"
+    assert record.datacenter == "datacenter-2"
+    assert record.created == NOW + timedelta(seconds=7)
+
+    event = vim.event.EventEx(key=1, chainId=1, createdTime=NOW, eventTypeId="com.vmware.vc.custom")
+    assert to_record(event).type == "com.vmware.vc.custom"
+    assert to_record(event).vm is None
+
+
+def test_build_filter_spec():
+    spec = build_filter_spec(
+        [vim.event.VmCreatedEvent, "VmPoweredOnEvent"], entity=vim.Folder("group-v3"), begin_time=NOW
+    )
+    assert spec.eventTypeId == ["VmCreatedEvent", "VmPoweredOnEvent"]
+    assert spec.entity.entity._moId == "group-v3"
+    assert spec.entity.recursion == "all"
+    assert spec.time.beginTime == NOW
+    assert build_filter_spec().time is None
+
+
+def test_events_checkpoint():
+    store = InventoryStore()
+
+    client = events_client([1, 2, 3], [4, 5])
+    assert [event.key for event in client.events(checkpoint=store, batch_size=3)] == [1, 2, 3, 4, 5]
+    assert store.get_meta("events.key") == "5"
+    assert Iso8601.ParseISO8601(store.get_meta("events.time")) == NOW + timedelta(seconds=5)
+
+    # the checkpoint time is inclusive: event 5 is read again and skipped
+    client = events_client([5, 6, 7])
+    assert [event.vm for event in client.events(checkpoint=store)] == ["vm-6", "vm-7"]
+    assert store.get_meta("events.key") == "7"
+
+
+def test_events(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        events = list(client.events(batch_size=100))
+        assert events
+        assert all(events[i].key < events[i + 1].key for i in range(len(events) - 1))
@@ -0,0 +1,97 @@
+import pickle
+
+from pyVmomi import vim, Iso8601
+
+from mce_lib_vsphere.capabilities import property_version
+from mce_lib_vsphere.extractors import (
+    Extractor, Field, MOREF, is_supported, get_extractor,
+    VM_INFOS, DATASTORE_INFOS,
+)
+from mce_lib_vsphere.synthetic import InventoryGenerator, resolve_path
+
+VERSION_65 = "vim.version.version11"
+VERSION_67 = "vim.version.version12"
+
+
+def test_property_version():
+    assert property_version(vim.VirtualMachine, "config.createDate") == VERSION_67
+    assert property_version(vim.VirtualMachine, "guest.toolsVersionStatus2") == "vim.version.version7"
+    assert property_version(vim.VirtualMachine, "guest.toolsStatus2") is None
+    assert is_supported(vim.VirtualMachine, "config.createDate", VERSION_67)
+    assert not is_supported(vim.VirtualMachine, "config.createDate", VERSION_65)
+    assert is_supported(vim.VirtualMachine, "config.createDate")
+
+
+def test_compile_path_set():
+    plan = VM_INFOS.compile(VERSION_65)
+    assert VM_INFOS.compile(VERSION_65) is plan
+    assert "config.createDate" not in plan.path_set
+    assert "guest.toolsStatus2" not in plan.path_set
+    assert len(plan.path_set) == len(set(plan.path_set))
+    assert "config.createDate" in VM_INFOS.compile(VERSION_67).path_set
+
+    extractor = Extractor(vim.VirtualMachine, {
+        "config": Field("config"),
+        "cpu": Field("config.hardware.numCPU"),
+        "id": Field(MOREF),
+    })
+    plan = extractor.compile()
+    assert plan.path_set == ["config"]
+    config = vim.vm.ConfigInfo(hardware=vim.vm.VirtualHardware(numCPU=4))
+    assert plan({"config": config}, "vm-1") == {"config": config, "cpu": 4, "id": "vm-1"}
+    assert plan({}, "vm-1") == {"config": None, "cpu": None, "id": "vm-1"}
+
+
+def test_vm_infos():
+    generator = InventoryGenerator(vms=3, nics_per_vm=2, custom_fields=2)
+    vm, data = generator.vm_properties(1)
+    plan = VM_INFOS.compile(VERSION_65)
+    props = {path: resolve_path(data, path) for path in plan.path_set}
+    props = {path: value for path, value in props.items() if value is not None}
+
+    infos = plan(props, vm._moId)
+    assert list(infos)[:4] == ["boot_time", "create_date", "vm_path_name", "name"]
+    assert infos["name"] == "SYN_VM1"
+    assert infos["uuid"] == data["config"].instanceUuid
+    assert infos["cpu_count"] == data["config"].hardware.numCPU
+    assert infos["diskGB"] == data["summary"].storage.committed / 1024**3
+    assert infos["annotation"] == ""
+    assert infos["create_date"] is None
+    assert infos["toolsVersionStatus"] == "guestToolsCurrent"
+    assert infos["toolsStatus"] == "toolsOk"
+    assert len(infos["net"]) == 2
+    assert infos["fields"] == {
+        field.name: value.value
+        for field in data["availableField"] for value in data["customValue"] if field.key == value.key
+    }
+    if data["runtime"].bootTime:
+        assert infos["boot_time"] == Iso8601.ISO8601Format(data["runtime"].bootTime)
+
+    del props["guest.toolsVersionStatus2"]
+    assert "toolsVersionStatus" not in plan(props, vm._moId)
+
+
+def test_datastore_infos():
+    plan = DATASTORE_INFOS.compile()
+    infos = plan({"name": "ds1", "summary.capacity": 100, "summary.freeSpace": 30}, "datastore-1")
+    assert infos["id"] == "datastore-1"
+    assert infos["uncommitted"] == 0
+    assert infos["provisioned"] == 70
+
+
+def test_plan_pickle():
+    plan = pickle.loads(pickle.dumps(VM_INFOS.compile(VERSION_65)))
+    assert plan.path_set == VM_INFOS.compile(VERSION_65).path_set
+    assert plan({"name": "vm1"})["name"] == "vm1"
+    assert get_extractor("vm") is VM_INFOS
+
+
+def test_extract_replay():
+    generator = InventoryGenerator(vms=1)
+    plan = VM_INFOS.compile(VERSION_65)
+    client = generator.client(path_set=plan.path_set)
+    vm = vim.VirtualMachine("vm-1000", client.si._stub)
+
+    infos = client._get_vm_infos(vm)
+    assert infos["name"] == "SYN_VM0"
+    assert infos["state"] == generator.vm_properties(0)[1]["runtime"].powerState
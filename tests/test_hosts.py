@@ -0,0 +1,97 @@
+from pyVmomi import vim, vmodl
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.extractors import HOST_HARDWARE, hbas_infos, sensors_infos
+from mce_lib_vsphere.replay import Cassette
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+VERSION = "vim.version.version11"
+
+collector = vmodl.query.PropertyCollector
+
+
+def host_content(moref, props):
+    return collector.ObjectContent(obj=vim.HostSystem(moref), propSet=[
+        vmodl.DynamicProperty(name=name, val=value) for name, value in props.items()
+    ])
+
+
+def test_host_paths():
+    path_set = HOST_HARDWARE.compile(VERSION).path_set
+    assert "summary.hardware.model" in path_set
+    assert "runtime.connectionState" in path_set
+    assert not [path for path in path_set if path in ("config", "summary", "summary.hardware", "runtime")]
+
+
+def test_host_details_transforms():
+    sensor = vim.host.NumericSensorInfo(
+        name="Fan 1", sensorType="fan", currentReading=5400, unitModifier=0, baseUnits="RPM",
+        healthState=vim.ElementDescription(key="green", label="Green", summary="ok"),
+    )
+    assert sensors_infos([sensor]) == [{"name": "Fan 1", "type": "fan", "state": "green", "value": 5400, "unit": "RPM"}]
+
+    hba = vim.host.FibreChannelHba(
+        key="key-vim.host.FibreChannelHba-vmhba2", device="vmhba2", model="QLE2692", driver="qlnativefc",
+        status="online", bus=59, pci="0000:3b:00.0", portWorldWideName=0x2100F4E9D4561234,
+        nodeWorldWideName=0, portType="fabric", speed=16,
+    )
+    assert hbas_infos([hba])[0]["wwpn"] == "21:00:f4:e9:d4:56:12:34"
+    assert hbas_infos([hba])[0]["type"] == "HostFibreChannelHba"
+    assert sensors_infos(None) == []
+
+
+def test_host_inventory():
+    connected = {
+        "name": "esx1",
+        "summary.hardware.model": "PowerEdge R740",
+        "summary.hardware.numCpuCores": 32,
+        "summary.quickStats.overallCpuUsage": 1200,
+        "runtime.connectionState": "connected",
+        "runtime.inMaintenanceMode": False,
+        "config.product.version": "6.5.0",
+        "config.product.fullName": "VMware ESXi 6.5.0 build-4564106",
+    }
+    disconnected = {"name": "esx2", "runtime.connectionState": "disconnected"}
+    details = {
+        "config.network.pnic": vim.PhysicalNic.Array([
+            vim.PhysicalNic(
+                key="key-vim.host.PhysicalNic-vmnic0", device="vmnic0", pci="0000:01:00.0", driver="ixgben",
+                mac="f4:e9:d4:00:00:01", linkSpeed=vim.PhysicalNic.LinkSpeedDuplex(speedMb=10000, duplex=True),
+                wakeOnLanSupported=False, spec=vim.PhysicalNic.Specification(),
+            ),
+        ]),
+    }
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", InventoryGenerator(vms=0).service_content())
+    cassette.add("CreateContainerView", vim.view.ContainerView("session[1]view"))
+    cassette.add("DestroyView")
+    cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[
+        host_content("host-1", connected), host_content("host-2", disconnected),
+    ]))
+    cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[host_content("host-1", details)]))
+    client = core.Client.from_cassette(cassette)
+
+    (host1, infos1), (host2, infos2) = client.host_inventory(details=True)
+
+    assert infos1["model"] == "PowerEdge R740"
+    assert infos1["cpu_cores"] == 32
+    assert infos1["version"] == "6.5.0"
+    assert infos1["full_name"] == "VMware ESXi 6.5.0 build-4564106"
+    assert infos1["nics"] == [
+        {"device": "vmnic0", "driver": "ixgben", "mac": "f4:e9:d4:00:00:01", "pci": "0000:01:00.0", "speed": 10000},
+    ]
+    assert infos1["sensors"] == []
+    assert infos2["connection_state"] == "disconnected"
+    assert infos2["nics"] == []
+    assert cassette.positions["RetrievePropertiesEx"] == 2
+
+
+def test_host_inventory_vcsim(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        hosts = client.host_inventory(details=True)
+        assert len(hosts) == len(client.get_all_hosts())
+        assert all(infos["connection_state"] == "connected" for _, infos in hosts)
+        assert all(infos["nics"] for _, infos in hosts)
@@ -0,0 +1,56 @@
+from mce_lib_vsphere import core
+from mce_lib_vsphere.inventory import InventorySnapshot, content_hash, field_deltas
+
+
+def test_content_hash():
+    assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+
+def test_field_deltas():
+    old = {"name": "vm1", "net": {"mac1": {"ip": "10.0.0.1"}}, "state": "poweredOn"}
+    new = {"name": "vm1", "net": {"mac1": {"ip": "10.0.0.2"}}, "fields": {}}
+
+    assert field_deltas(old, new) == {
+        "net.mac1.ip": ("10.0.0.1", "10.0.0.2"),
+        "state": ("poweredOn", None),
+        "fields": (None, {}),
+    }
+
+
+def test_diff_snapshots(tmpdir):
+    old = InventorySnapshot.from_records([
+        ("group-d1/vm-1", {"name": "vm1", "cpu_count": 1}),
+        ("group-d1/vm-2", {"name": "vm2", "net": {"mac": {"ipAddress": {0: "10.0.0.1"}}}}),
+        ("group-d1/vm-3", {"name": "vm3"}),
+    ])
+    path = str(tmpdir.join("snapshot.json"))
+    old.save(path)
+    old = InventorySnapshot.load(path)
+
+    new = InventorySnapshot.from_records([
+        ("group-d1/vm-1", {"name": "vm1", "cpu_count": 2}),
+        ("group-d1/vm-2", {"name": "vm2", "net": {"mac": {"ipAddress": {0: "10.0.0.1"}}}}),
+        ("group-d1/vm-4", {"name": "vm4"}),
+    ])
+
+    diff = old.diff(new)
+    assert diff
+    assert diff.added == ["group-d1/vm-4"]
+    assert diff.removed == ["group-d1/vm-3"]
+    assert diff.changed == {"group-d1/vm-1": {"cpu_count": (1, 2)}}
+    assert diff.unchanged == 1
+
+    assert not new.diff(new)
+
+
+def test_get_inventory_snapshot(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        snapshot = client.get_inventory_snapshot()
+
+        assert len(snapshot) == len(client.get_all_vms())
+        assert 'group-d1/datacenter-2/folder-3/vm-231' in snapshot
+        assert not snapshot.diff(client.get_inventory_snapshot()).added
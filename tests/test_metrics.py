@@ -0,0 +1,119 @@
+import time
+
+from pyVmomi import vim
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.metrics import (
+    MetricsRegistry, CallEvent, instrument_stub, uninstrument_stub, instrument_method, current_method,
+    record_retry
+)
+
+
+class FakeStub:
+
+    def SerializeRequest(self, mo, info, args):
+        return b"x" * 100
+
+    def InvokeMethod(self, mo, info, args):
+        self.SerializeRequest(mo, info, args)
+        return "result"
+
+    def InvokeAccessor(self, mo, info):
+        return self.InvokeMethod(mo, vim.PropertyCollector.RetrievePropertiesEx.info, [])
+
+
+def test_instrument_stub():
+    registry = MetricsRegistry()
+    stub = FakeStub()
+    hooks = [registry]
+    instrument_stub(stub, hooks)
+
+    vm = vim.VirtualMachine("vm-1", stub)
+
+    def get_name(vm):
+        return vm.name
+
+    get_name = instrument_method(get_name, "get_name", hooks)
+    assert get_name(vm) == "result"
+
+    data = registry.to_dict()
+    assert data["methods"]["get_name"]["count"] == 1
+    assert data["methods"]["get_name"]["soap_calls"] == 1
+    assert data["methods"]["get_name"]["lazy_fetches"] == 1
+    assert data["operations"]["RetrievePropertiesEx"]["count"] == 1
+    assert data["operations"]["RetrievePropertiesEx"]["request_bytes"] == 100
+    assert data["lazy_fetches"] == {"VirtualMachine.name": 1}
+
+    uninstrument_stub(stub)
+    assert vm.name == "result"
+    assert registry.to_dict()["lazy_fetches"] == {"VirtualMachine.name": 1}
+
+
+def test_instrument_generator():
+    events = []
+
+    def items():
+        yield 1
+        yield 2
+
+    items = instrument_method(items, "items", [events.append])
+    assert list(items()) == [1, 2]
+    assert [(e.kind, e.name) for e in events] == [("method", "items")]
+
+
+def test_instrument_returned_generator():
+    events = []
+
+    def items():
+        assert current_method.get() == "power_on"
+        record_retry([events.append], "items")
+        yield 1
+        time.sleep(0.02)
+        yield 2
+
+    # like power_on_vms returning the generator of _run_bulk
+    power_on = instrument_method(lambda: items(), "power_on", [events.append])
+    results = power_on()
+    assert events == []
+    assert list(results) == [1, 2]
+    assert [(e.kind, e.name, e.client_method) for e in events] == [
+        ("retry", "items", "power_on"), ("method", "power_on", "power_on")
+    ]
+    assert events[-1].duration >= 0.02
+
+
+def test_prometheus():
+    registry = MetricsRegistry()
+    registry(CallEvent("soap", "RetrievePropertiesEx", 0.002, 10, 20, False, "get_all_vms"))
+    registry(CallEvent("method", "get_all_vms", 0.003, 0, 0, False, "get_all_vms"))
+
+    text = registry.to_prometheus()
+    assert 'mce_vsphere_soap_duration_seconds_bucket{operation="RetrievePropertiesEx",le="0.005"} 1' in text
+    assert 'mce_vsphere_soap_response_bytes_total{operation="RetrievePropertiesEx"} 20' in text
+    assert 'mce_vsphere_method_soap_calls_total{method="get_all_vms"} 1' in text
+
+    registry(CallEvent("retry", "tagging.attached", 0.0, 0, 0, False, "get_all_vms"))
+    assert registry.to_dict()["methods"]["get_all_vms"]["retries"] == 1
+    text = registry.to_prometheus()
+    assert 'mce_vsphere_retries_total{name="tagging.attached"} 1' in text
+    assert 'mce_vsphere_method_retries_total{method="get_all_vms"} 1' in text
+
+
+def test_enable_metrics(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        registry = client.enable_metrics()
+
+        vm = client.get_all_vms()[0]
+        client.get_vm_infos(vm)
+
+        data = registry.to_dict()
+        assert data["methods"]["get_all_vms"]["soap_calls"] > 0
+        assert data["methods"]["get_vm_infos"]["lazy_fetches"] > 0
+        assert data["operations"]["RetrievePropertiesEx"]["response_bytes"] > 0
+
+        client.disable_metrics()
+        client.get_all_vms()
+        assert registry.to_dict()["methods"]["get_all_vms"]["count"] == 1
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyVmomi import vim, vmodl
+
+from mce_lib_vsphere.core import Client
+from mce_lib_vsphere.encoders import get_encoder
+from mce_lib_vsphere.extractors import VM_INFOS
+from mce_lib_vsphere.parallel import page_token, transform_page
+from mce_lib_vsphere.replay import serialize_response
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+VERSION = "vim.version.version11"
+
+collector = vmodl.query.PropertyCollector
+
+FAULT = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<soapenv:Envelope xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/" '
+    b'xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+    b'xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    b'<soapenv:Body><soapenv:Fault><faultcode>ServerFaultCode</faultcode><faultstring>invalid path</faultstring>'
+    b'<detail><InvalidArgumentFault xmlns="urn:vim25" xsi:type="InvalidArgument">'
+    b'<invalidProperty>pathSet</invalidProperty></InvalidArgumentFault></detail>'
+    b'</soapenv:Fault></soapenv:Body></soapenv:Envelope>'
+)
+
+
+def test_transform_page():
+    generator = InventoryGenerator(vms=5)
+    plan = VM_INFOS.compile(VERSION)
+    objects = list(generator.object_contents([vim.VirtualMachine], plan.path_set))
+    body = serialize_response("RetrievePropertiesEx", collector.RetrieveResult(objects=objects, token="1&gt;"))
+
+    result = transform_page(body, VERSION, plan, "json")
+
+    encoder = get_encoder("json")
+    expected = [
+        (obj_content.obj._moId, encoder.encode(plan({p.name: p.val for p in obj_content.propSet}, obj_content.obj._moId)))
+        for obj_content in objects
+    ]
+    assert result == expected
+    assert page_token(body) == "1&gt;"
+    assert transform_page(serialize_response("RetrievePropertiesEx", None), VERSION, plan) == []
+
+
+def test_extract_parallel_order():
+    generator = InventoryGenerator(vms=95)
+    plan = VM_INFOS.compile(VERSION)
+    client = generator.client(path_set=plan.path_set, page_size=10)
+    expected = [
+        (vm._moId, plan(props, vm._moId)) for vm, props in client.collect_properties([vim.VirtualMachine], plan.path_set)
+    ]
+
+    client = generator.client(path_set=plan.path_set, page_size=10)
+    with ThreadPoolExecutor(3) as executor:
+        result = list(client.extract_parallel("vm", workers=3, executor=executor))
+
+    assert result == expected
+
+
+def test_page_token_anchor():
+    # a property value with a token field, before the continuation token would be
+    value = b"<propSet><name>config</name><val><token>not-a-page</token></val></propSet>"
+    body = b"<RetrievePropertiesExResponse><returnval><token>2</token><objects>" + value + b"</objects></returnval>"
+    assert page_token(body) == "2"
+    body = b"<RetrievePropertiesExResponse><returnval><objects>" + value + b"</objects></returnval>"
+    assert page_token(body) is None
+
+
+def test_extract_parallel_metrics():
+    generator = InventoryGenerator(vms=25)
+    client = generator.client(path_set=VM_INFOS.compile(VERSION).path_set, page_size=10)
+    registry = client.enable_metrics()
+
+    with ThreadPoolExecutor(2) as executor:
+        assert len(list(client.extract_parallel("vm", workers=2, executor=executor))) == 25
+
+    operations = registry.to_dict()["operations"]
+    assert operations["RetrievePropertiesEx"]["count"] == 1
+    assert operations["ContinueRetrievePropertiesEx"]["count"] == 2
+    assert operations["RetrievePropertiesEx"]["request_bytes"] > 0
+
+
+def test_extract_parallel_processes():
+    generator = InventoryGenerator(vms=40)
+    client = generator.client(path_set=VM_INFOS.compile(VERSION).path_set, page_size=16)
+
+    result = list(client.extract_parallel("vm", encoder="json", workers=2))
+
+    assert [moref for moref, _ in result] == [f"vm-{1000 + i}" for i in range(40)]
+    assert result[0][1].startswith(b'{"boot_time":')
+
+
+def test_extract_parallel_fault():
+    generator = InventoryGenerator(vms=1)
+    cassette = generator.cassette([vim.VirtualMachine], ["name"])
+    cassette.responses.pop("RetrievePropertiesEx")
+    cassette.add("RetrievePropertiesEx", status=500, body=FAULT)
+
+    client = Client.from_cassette(cassette)
+    with pytest.raises(vmodl.fault.InvalidArgument):
+        list(client.extract_parallel("vm", workers=1))
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pyVmomi import vim, Iso8601
+
+from mce_lib_vsphere import core, exceptions
+from mce_lib_vsphere.performance import PerformanceCollector, counter_name
+
+PM = vim.PerformanceManager
+
+
+def counter_info(key, group, name, rollup="average"):
+    return PM.CounterInfo(
+        key=key, rollupType=rollup, statsType="rate", level=1,
+        groupInfo=vim.ElementDescription(key=group, label=group, summary=group),
+        nameInfo=vim.ElementDescription(key=name, label=name, summary=name),
+        unitInfo=vim.ElementDescription(key="percent", label="%", summary="%"),
+    )
+
+
+class FakePerfManager:
+
+    def __init__(self):
+        self.perfCounter = [counter_info(2, "cpu", "usage"), counter_info(24, "mem", "usage")]
+        self.historicalInterval = [vim.HistoricalInterval(key=1, samplingPeriod=300, name="Past day", length=86400)]
+        self.queries = []
+
+    def QueryPerf(self, specs):
+        self.queries.append(specs)
+        now = datetime(2020, 5, 1, tzinfo=Iso8601.TZInfo())
+        samples = [PM.SampleInfo(timestamp=now + timedelta(seconds=20 * i), interval=20) for i in range(3)]
+        return [
+            PM.EntityMetric(entity=spec.entity, sampleInfo=samples, value=[
+                PM.IntSeries(id=metric_id, value=[metric_id.counterId * 100 + i for i in range(3)])
+                for metric_id in spec.metricId
+            ])
+            for spec in specs
+        ]
+
+
+def test_counter_name():
+    assert counter_name(counter_info(2, "cpu", "usage")) == "cpu.usage.average"
+
+
+def test_counters_are_cached():
+    perf_manager = FakePerfManager()
+    collector = PerformanceCollector(perf_manager)
+    assert collector.counter_id("mem.usage.average") == 24
+    perf_manager.perfCounter = []
+    assert collector.counter_id("cpu.usage.average") == 2
+    assert collector.historical_intervals() == {300: "Past day"}
+
+    with pytest.raises(exceptions.UnknownCounterError):
+        collector.counter_id("cpu.unknown.average")
+
+
+def test_build_query_specs_chunks():
+    collector = PerformanceCollector(FakePerfManager(), max_query_metrics=64)
+    hosts = [vim.HostSystem(f"host-{i}") for i in range(100)]
+    counters = ["cpu.usage.average", "mem.usage.average"]
+
+    batches = collector.build_query_specs(hosts, counters, interval=300)
+    assert [len(specs) for specs in batches] == [32, 32, 32, 4]
+    assert all(len(specs) * len(counters) <= 64 for specs in batches)
+
+    # real-time queries are not limited by vpxd.stats.maxQueryMetrics
+    batches = collector.build_query_specs(hosts, counters)
+    assert len(batches) == 1
+    assert batches[0][0].intervalId == 20
+    assert [m.counterId for m in batches[0][0].metricId] == [2, 24]
+
+
+def test_query():
+    perf_manager = FakePerfManager()
+    collector = PerformanceCollector(perf_manager, max_query_metrics=4)
+    vms = [vim.VirtualMachine(f"vm-{i}") for i in range(5)]
+
+    series = collector.query(vms, ["cpu.usage.average", "mem.usage.average"], interval=300, max_sample=3)
+    assert len(perf_manager.queries) == 3
+    assert len(series) == 10
+
+    ts = series[("vm-3", "mem.usage.average", "")]
+    assert ts.entity == "vm-3"
+    assert list(ts.values) == [2400, 2401, 2402]
+    assert ts.timestamps[1] - ts.timestamps[0] == 20
+    assert ts.to_dict()["values"] == [2400, 2401, 2402]
+
+
+def test_query_perf(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        hosts = client.get_all_hosts()
+        series = client.query_perf(hosts, ["cpu.usage.average", "mem.usage.average"], max_sample=3)
+        assert client.perf is client.perf
+        assert {moref for moref, _, _ in series} <= {host._moId for host in hosts}
+        for ts in series.values():
+            assert len(ts.timestamps) == len(ts.values)
@@ -0,0 +1,135 @@
+from pyVmomi import vim, vmodl, VmomiSupport
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.permissions import PermissionIndex
+from mce_lib_vsphere.replay import Cassette
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+Role = vim.AuthorizationManager.Role
+Permission = vim.AuthorizationManager.Permission
+IntArray = VmomiSupport.GetVmodlType("int[]")
+
+collector = vmodl.query.PropertyCollector
+
+ROLES = [
+    Role(roleId=-1, name="Admin", system=True, privilege=["System.View", "VirtualMachine.Interact.PowerOn"]),
+    Role(roleId=-2, name="ReadOnly", system=True, privilege=["System.View"]),
+    Role(roleId=-5, name="NoAccess", system=True, privilege=[]),
+    Role(roleId=1001, name="Operator", system=False, privilege=["System.View", "VirtualMachine.Interact.PowerOn"]),
+]
+
+
+def inventory():
+    root = vim.Folder("group-d1")
+    datacenter = vim.Datacenter("datacenter-2")
+    vm_folder = vim.Folder("group-v3")
+    prod = vim.Folder("group-v10")
+    return [
+        (root, {"name": "Datacenters", "effectiveRole": [-1]}),
+        (datacenter, {"name": "DC0", "parent": root, "effectiveRole": [-1]}),
+        (vm_folder, {"name": "vm", "parent": datacenter, "effectiveRole": [-1]}),
+        (prod, {"name": "prod", "parent": vm_folder, "effectiveRole": [-1]}),
+        (vim.VirtualMachine("vm-1"), {"name": "web", "parent": prod, "effectiveRole": [1001]}),
+        (vim.VirtualMachine("vm-2"), {"name": "db", "parent": prod, "effectiveRole": [-1]}),
+        (vim.VirtualMachine("vm-3"), {"name": "test", "parent": vm_folder, "effectiveRole": [-1]}),
+    ]
+
+
+def test_permission_index():
+    permissions = [
+        Permission(
+            entity=vim.Folder("group-d1"), principal="VSPHERE.LOCAL\\Administrators", group=True, roleId=-1, propagate=True
+        ),
+        Permission(entity=vim.Datacenter("datacenter-2"), principal="DOMAIN\\audit", group=True, roleId=-2, propagate=True),
+        Permission(entity=vim.Folder("group-v10"), principal="DOMAIN\\ops", group=True, roleId=1001, propagate=True),
+        Permission(entity=vim.VirtualMachine("vm-2"), principal="DOMAIN\\ops", group=True, roleId=-5, propagate=False),
+        Permission(entity=vim.Folder("group-v3"), principal="DOMAIN\\audit", group=True, roleId=-5, propagate=False),
+    ]
+
+    index = PermissionIndex(ROLES, permissions, inventory())
+
+    assert len(index) == 7
+    assert index.who("vm-1") == {
+        "VSPHERE.LOCAL\\Administrators": "Admin", "DOMAIN\\audit": "ReadOnly", "DOMAIN\\ops": "Operator",
+    }
+    # defined on the object: replace the propagated permission
+    assert index.who("vm-2")["DOMAIN\\ops"] == "NoAccess"
+    # not propagated
+    assert index.who("group-v3")["DOMAIN\\audit"] == "NoAccess"
+    assert index.who("vm-3")["DOMAIN\\audit"] == "ReadOnly"
+
+    assert index.can("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn", "vm-1")
+    assert not index.can("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn", "vm-2")
+    assert not index.can("DOMAIN\\unknown", "System.View", "vm-1")
+    assert index.where("DOMAIN\\ops") == ["group-v10", "vm-1"]
+    assert index.where("DOMAIN\\audit", "System.View") == ["datacenter-2", "group-v10", "vm-1", "vm-2", "vm-3"]
+
+    assert index.effective_roles("vm-1") == ["Operator"]
+    rows = list(index.matrix())
+    assert ("vm-2", "DOMAIN\\ops", "NoAccess") in rows
+    assert len([row for row in rows if row[0] == "group-d1"]) == 1
+
+
+def test_resource_pool_permissions():
+    entities = inventory()
+    datacenter, prod = entities[1][0], entities[3][0]
+    cluster = vim.ClusterComputeResource("domain-c7")
+    pool = vim.ResourcePool("resgroup-8")
+    vapp = vim.VirtualApp("resgroup-v20")
+    entities += [
+        (cluster, {"name": "C0", "parent": datacenter, "effectiveRole": [-1]}),
+        (pool, {"name": "Resources", "parent": cluster, "effectiveRole": [-1]}),
+        (vapp, {"name": "app", "parent": pool, "parentFolder": prod, "effectiveRole": [-1]}),
+        (vim.VirtualMachine("vm-4"), {"name": "batch", "parent": prod, "resourcePool": pool, "effectiveRole": [-1]}),
+        (vim.VirtualMachine("vm-5"), {"name": "app1", "resourcePool": vapp, "parentVApp": vapp, "effectiveRole": [-1]}),
+    ]
+    permissions = [
+        Permission(entity=prod, principal="DOMAIN\\ops", group=True, roleId=-2, propagate=True),
+        Permission(entity=pool, principal="DOMAIN\\ops", group=True, roleId=1001, propagate=True),
+        Permission(entity=pool, principal="DOMAIN\\batch", group=True, roleId=-2, propagate=True),
+    ]
+
+    index = PermissionIndex(ROLES, permissions, entities)
+
+    assert index.parents["vm-4"] == ["group-v10", "resgroup-8"]
+    # ReadOnly from the folder and Operator from the pool: the privileges are combined
+    assert index.who("vm-4") == {"DOMAIN\\ops": "Operator+ReadOnly", "DOMAIN\\batch": "ReadOnly"}
+    assert index.can("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn", "vm-4")
+    assert not index.can("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn", "vm-1")
+    assert index.where("DOMAIN\\ops", "VirtualMachine.Interact.PowerOn") == ["resgroup-8", "resgroup-v20", "vm-4", "vm-5"]
+    # vApp: from its pool and its folder - the VM inherits from the vApp
+    assert index.who("resgroup-v20") == {"DOMAIN\\ops": "Operator+ReadOnly", "DOMAIN\\batch": "ReadOnly"}
+    assert index.who("vm-5") == {"DOMAIN\\ops": "Operator+ReadOnly", "DOMAIN\\batch": "ReadOnly"}
+    assert index.who("vm-1") == {"DOMAIN\\ops": "ReadOnly"}
+    assert ("vm-4", "DOMAIN\\ops", "Operator+ReadOnly") in list(index.matrix())
+
+
+def test_get_vm_roles():
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", InventoryGenerator(vms=0).service_content())
+    for roles in ([1001, -1], [-1, 1001]):
+        cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[
+            collector.ObjectContent(obj=vim.VirtualMachine("vm-1"), propSet=[
+                vmodl.DynamicProperty(name="effectiveRole", val=IntArray(roles)),
+            ]),
+        ]))
+    client = core.Client.from_cassette(cassette)
+    client._roles = ROLES
+    vm = vim.VirtualMachine("vm-1", client.si._stub)
+
+    # built-in names kept whatever the order, custom roles from roleList
+    assert client.get_vm_roles(vm) == ["Operator", "ADMINISTRATOR"]
+    assert client.get_vm_roles(vm) == ["ADMINISTRATOR", "Operator"]
+
+
+def test_permissions(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        index = client.permissions()
+        vm = client.get_all_vms()[0]
+
+        assert index.effective_roles(vm._moId) == ["Admin"]
+        assert index.who(vm._moId)
+        assert client.get_vm_roles(vm) == ["ADMINISTRATOR"]
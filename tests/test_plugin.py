@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.pytest.plugin import VcsimFactory, get_free_tcp_port, spawn_service, wait_service
+
+
+def test_wait_service_timeout():
+    port = get_free_tcp_port()
+    start = time.monotonic()
+    assert wait_service("127.0.0.1", port, timeout=0.2) is False
+    assert time.monotonic() - start < 2
+
+
+def test_vcsim_factory(vcsim_factory):
+    url1, url2 = vcsim_factory.many(dict(dc=1, hosts=1, vms=1), dict(dc=1, hosts=2, vms=1))
+    assert url1 != url2
+    assert vcsim_factory(dc=1, hosts=1, vms=1) == url1
+
+    with core.Client(host=url1) as client:
+        client.connect()
+        assert len(client.get_all_datacenters()) == 1
+
+
+def test_vcsim_factory_start_failure(tmp_path):
+    # never listens
+    vcsim_path = tmp_path / "vcsim"
+    vcsim_path.write_text("#!/bin/sh\nexec sleep 30\n")
+    os.chmod(vcsim_path, 0o755)
+    settings = dict(
+        vcsim_path=str(vcsim_path), api_version="6.5", username="user1", password="pass", datacenters=1, clusters=1,
+        datastores=1, storages=0, pools=1, hosts=1, vms=1, vapps=0, opaque_networks=0, trace=False, start_timeout=0.5,
+    )
+    spawned = []
+
+    class Factory(VcsimFactory):
+        def _start(self, settings):
+            url, port, process = super()._start(settings)
+            spawned.append(process)
+            return url, port, process
+
+    factory = Factory(settings)
+    with pytest.raises(pytest.fail.Exception):
+        factory.many(dict(dc=1), dict(dc=2))
+
+    # both spawned servers are stopped, none is registered or left starting
+    assert len(spawned) == 2
+    assert all(process.poll() is not None for process in spawned)
+    assert factory.servers == {} and factory.starting == {}
+
+
+def test_spawn_service_path_with_spaces(tmp_path):
+    directory = tmp_path / "go bin"
+    directory.mkdir()
+    vcsim_path = directory / "vcsim"
+    vcsim_path.write_text('#!/bin/sh\nprintf "%s\\n" "$@"\n')
+    os.chmod(vcsim_path, 0o755)
+    settings = dict(
+        vcsim_path=str(vcsim_path), api_version="6.5", username="user1", password="pass", datacenters=1, clusters=1,
+        datastores=1, storages=0, pools=1, hosts=1, vms=1, vapps=0, opaque_networks=0, trace=False,
+    )
+
+    process = spawn_service("127.0.0.1", 1024, settings)
+    outs, _ = process.communicate(timeout=5)
+    args = outs.decode().split("\n")
+    assert args[:4] == ["-api-version", "6.5", "-dc", "1"]
+    assert "-l" in args and args[args.index("-l") + 1] == "127.0.0.1:1024"
+    assert "-trace" not in args
@@ -0,0 +1,36 @@
+from mce_lib_vsphere import core
+from mce_lib_vsphere.metrics import CallEvent
+from mce_lib_vsphere.profiling import LazyFetchProfiler
+
+
+def test_lazy_fetch_profiler():
+    profiler = LazyFetchProfiler()
+    for moref in ["vm-1", "vm-2", "vm-3"]:
+        profiler(CallEvent("accessor", "VirtualMachine.config", 0.01, 0, 0, False, "_get_vm_infos", moref))
+        profiler(CallEvent("accessor", "VirtualMachine.config", 0.01, 0, 0, False, "_get_vm_infos", moref))
+    profiler(CallEvent("accessor", "HostSystem.config", 0.01, 0, 0, False, "get_host_infos", "host-1"))
+    profiler(CallEvent("soap", "RetrievePropertiesEx", 0.01, 10, 10, False, "_get_vm_infos"))
+
+    assert profiler.total == 7
+    stat = profiler.stats()[0]
+    assert stat["type"] == "VirtualMachine"
+    assert stat["property"] == "config"
+    assert stat["fetches"] == 6
+    assert stat["objects"] == 3
+    assert stat["methods"] == {"_get_vm_infos": 6}
+
+    assert profiler.suggested_path_set() == {"VirtualMachine": ["config"]}
+    assert "client.collect_properties([vim.VirtualMachine], ['config'])" in profiler.report()
+
+
+def test_client_profile(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        with client.profile(output=None) as profiler:
+            for vm in client.get_all_vms():
+                client._get_vm_infos(vm)
+
+        assert "config" in profiler.suggested_path_set()["VirtualMachine"]
+        assert client.metrics_hooks == []
@@ -0,0 +1,78 @@
+import pytest
+from pyVmomi import vim, vmodl
+
+from mce_lib_vsphere import core, exceptions
+from mce_lib_vsphere.replay import Cassette, request_key, serialize_response
+
+collector = vmodl.query.PropertyCollector
+
+
+def service_content():
+    return vim.ServiceInstanceContent(
+        rootFolder=vim.Folder("group-d1"),
+        propertyCollector=collector("propertyCollector"),
+        viewManager=vim.view.ViewManager("ViewManager"),
+        about=vim.AboutInfo(
+            name="VMware vCenter Server", fullName="VMware vCenter Server 6.5.0", vendor="VMware, Inc.",
+            version="6.5.0", build="5973321", osType="linux-amd64", productLineId="vpx",
+            apiType="VirtualCenter", apiVersion="6.5",
+        ),
+    )
+
+
+def object_content(moref, name):
+    return collector.ObjectContent(
+        obj=vim.VirtualMachine(moref), propSet=[vmodl.DynamicProperty(name="name", val=name)]
+    )
+
+
+def test_request_key():
+    body = b'<?xml version="1.0"?><soapenv:Envelope><soapenv:Header>x</soapenv:Header><soapenv:Body>' \
+           b'<RetrievePropertiesEx xmlns="urn:vim25"><_this>propertyCollector</_this></RetrievePropertiesEx>' \
+           b'</soapenv:Body></soapenv:Envelope>'
+    operation, key = request_key(body)
+    assert operation == "RetrievePropertiesEx"
+    assert key.startswith("RetrievePropertiesEx:")
+    assert request_key(body.replace(b"<soapenv:Header>x", b"<soapenv:Header>y"))[1] == key
+
+    with pytest.raises(exceptions.ReplayError):
+        request_key(b"<html/>")
+
+
+def test_serialize_response():
+    body = serialize_response("CreateContainerView", vim.view.ContainerView("session[1]1"))
+    assert b'<CreateContainerViewResponse xmlns="urn:vim25"><returnval type="ContainerView">session[1]1</returnval>' in body
+
+
+def test_replay_client(tmpdir):
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", service_content())
+    cassette.add("CreateContainerView", vim.view.ContainerView("session[1]1"))
+    cassette.add("DestroyView")
+    cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[object_content("vm-1", "vm1")], token="1"))
+    cassette.add("ContinueRetrievePropertiesEx", collector.RetrieveResult(objects=[object_content("vm-2", "vm2")]))
+
+    path = str(tmpdir.join("cassette.json.gz"))
+    cassette.save(path)
+
+    client = core.Client.from_cassette(path)
+    assert client.vcenter_infos()["apiVersion"] == "6.5"
+    objects = list(client.collect_properties([vim.VirtualMachine], ["name"], page_size=1))
+    assert [(obj._moId, props) for obj, props in objects] == [("vm-1", {"name": "vm1"}), ("vm-2", {"name": "vm2"})]
+
+    with pytest.raises(exceptions.ReplayError):
+        client.content.rootFolder.CreateFolder("folder")
+
+
+def test_record(vsphere_server, vcsim_settings, tmpdir):
+    url = vsphere_server
+    path = str(tmpdir.join("cassette.json.gz"))
+
+    with core.Client(host=url) as client:
+        client.connect()
+        with client.record(path) as cassette:
+            names = [vm.name for vm in client.get_all_vms()]
+        assert len(cassette) > 0
+
+    client = core.Client.from_cassette(path)
+    assert [vm.name for vm in client.get_all_vms()] == names
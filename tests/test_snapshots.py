@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from pyVmomi import vim, vmodl
+
+from mce_lib_vsphere.core import Client
+from mce_lib_vsphere.replay import Cassette
+from mce_lib_vsphere.snapshots import flatten, largest, oldest, snapshot_records
+from mce_lib_vsphere.synthetic import InventoryGenerator
+
+collector = vmodl.query.PropertyCollector
+Layout = vim.vm.FileLayoutEx
+
+
+def snapshot_tree(moref, name, created, children=None):
+    return vim.vm.SnapshotTree(
+        snapshot=vim.vm.Snapshot(moref), vm=vim.VirtualMachine("vm-1"), name=name, description="",
+        id=int(moref.split("-")[1]), createTime=created, state="poweredOff", quiesced=False,
+        childSnapshotList=children or [],
+    )
+
+
+def disk(*chain):
+    return Layout.DiskLayout(key=2000, chain=[Layout.DiskUnit(fileKey=list(keys)) for keys in chain])
+
+
+def vm_snapshots():
+    """vm-1: base disk - snapshot-1 - snapshot-2 (current)"""
+    roots = vim.vm.SnapshotTree.Array([snapshot_tree("snapshot-1", "before upgrade", datetime(2019, 1, 1), [
+        snapshot_tree("snapshot-2", "after upgrade", datetime(2020, 1, 1)),
+    ])])
+    files = [
+        (1, "vm1.vmdk", 500), (2, "vm1-flat.vmdk", 10 * 1024 ** 3),
+        (3, "vm1-000001.vmdk", 400), (4, "vm1-000001-delta.vmdk", 1000),
+        (5, "vm1-000002.vmdk", 400), (6, "vm1-000002-delta.vmdk", 3000),
+        (7, "vm1-Snapshot1.vmsn", 100), (8, "vm1-Snapshot2.vmsn", 200),
+    ]
+    layout = {
+        "layoutEx.file": Layout.FileInfo.Array([
+            Layout.FileInfo(key=key, name=f"[ds1] vm1/{name}", type="diskExtent", size=size, uniqueSize=size)
+            for key, name, size in files
+        ]),
+        "layoutEx.snapshot": Layout.SnapshotLayout.Array([
+            Layout.SnapshotLayout(key=vim.vm.Snapshot("snapshot-1"), dataKey=7, memoryKey=-1, disk=[disk([1, 2])]),
+            Layout.SnapshotLayout(key=vim.vm.Snapshot("snapshot-2"), dataKey=8, memoryKey=-1, disk=[disk([1, 2], [3, 4])]),
+        ]),
+        "layoutEx.disk": Layout.DiskLayout.Array([disk([1, 2], [3, 4], [5, 6])]),
+    }
+    props = {"name": "vm1", "snapshot.rootSnapshotList": roots, "snapshot.currentSnapshot": vim.vm.Snapshot("snapshot-2")}
+    return props, layout
+
+
+def test_snapshot_records():
+    props, layout = vm_snapshots()
+
+    assert [(node.name, depth) for node, depth, _ in flatten(props["snapshot.rootSnapshotList"])] == [
+        ("before upgrade", 1), ("after upgrade", 2),
+    ]
+
+    records = snapshot_records(vim.VirtualMachine("vm-1"), props, layout)
+    assert [(record.snapshot, record.depth, record.size, record.current) for record in records] == [
+        ("snapshot-1", 1, 1500, False), ("snapshot-2", 2, 3600, True),
+    ]
+    assert oldest(records, 1)[0].name == "before upgrade"
+    assert largest(records, 1)[0].name == "after upgrade"
+
+    assert snapshot_records(vim.VirtualMachine("vm-1"), props)[0].size is None
+
+
+def test_client_snapshots():
+    props, layout = vm_snapshots()
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", InventoryGenerator(vms=0).service_content())
+    cassette.add("CreateContainerView", vim.view.ContainerView("session[1]view"))
+    cassette.add("DestroyView")
+    cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[
+        collector.ObjectContent(obj=vim.VirtualMachine("vm-1"), propSet=[
+            vmodl.DynamicProperty(name=name, val=value) for name, value in props.items()
+        ]),
+        collector.ObjectContent(obj=vim.VirtualMachine("vm-2"), propSet=[vmodl.DynamicProperty(name="name", val="vm2")]),
+    ]))
+    cassette.add("RetrievePropertiesEx", collector.RetrieveResult(objects=[
+        collector.ObjectContent(obj=vim.VirtualMachine("vm-1"), propSet=[
+            vmodl.DynamicProperty(name=name, val=value) for name, value in layout.items()
+        ]),
+    ]))
+    client = Client.from_cassette(cassette)
+
+    records = client.snapshots()
+
+    assert [(record.vm, record.vm_name, record.size) for record in records] == [("vm-1", "vm1", 1500), ("vm-1", "vm1", 3600)]
+    assert cassette.positions["RetrievePropertiesEx"] == 2
@@ -0,0 +1,92 @@
+from pyVmomi import vim
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.store import InventoryStore, encode_value
+
+
+def test_encode_value():
+    assert encode_value("vm1") == "vm1"
+    assert encode_value(vim.HostSystem("host-1")) == "vim.HostSystem:host-1"
+    assert encode_value([vim.Datastore("datastore-1")]) == ["vim.Datastore:datastore-1"]
+
+
+def test_store_apply(tmpdir):
+    path = str(tmpdir.join("inventory.db"))
+    store = InventoryStore(path)
+
+    with store:
+        generation = store.begin_full_sync()
+        assert store.apply("vm-1", "vmware/VirtualMachine", "enter", [
+            ("name", "assign", "vm1"), ("runtime.host", "assign", vim.HostSystem("host-1"))
+        ]) is True
+        assert store.apply("vm-2", "vmware/VirtualMachine", "enter", [("name", "assign", "vm2")]) is True
+        assert store.apply("host-1", "vmware/HostSystem", "enter", [("name", "assign", "host1")]) is True
+        store.set_meta("version", "1")
+    assert store.end_full_sync(generation) == 0
+    store.close()
+
+    store = InventoryStore(path)
+    assert store.version == "1"
+    assert store.count() == 3
+    assert store.count(core.ResourceTypes.VIRTUAL_MACHINE) == 2
+    assert store.get("vm-1") == {
+        "moref": "vm-1",
+        "type": "vmware/VirtualMachine",
+        "name": "vm1",
+        "properties": {"name": "vm1", "runtime.host": "vim.HostSystem:host-1"},
+    }
+    assert [o["moref"] for o in store.find(type="vmware/VirtualMachine", name="vm2")] == ["vm-2"]
+
+    with store:
+        assert store.apply("vm-1", "vmware/VirtualMachine", "modify", [("name", "assign", "vm1")]) is False
+        assert store.apply("vm-1", "vmware/VirtualMachine", "modify", [("runtime.host", "remove", None)]) is True
+        assert store.apply("vm-2", "vmware/VirtualMachine", "leave", []) is True
+    assert store.get("vm-1")["properties"] == {"name": "vm1"}
+    assert store.get("vm-2") is None
+
+    # full pass without host-1
+    with store:
+        generation = store.begin_full_sync()
+        store.apply("vm-1", "vmware/VirtualMachine", "enter", [("name", "assign", "vm1")])
+    assert store.end_full_sync(generation) == 1
+    assert store.get("host-1") is None
+
+    with store:
+        generation = store.begin_full_sync()
+        assert store.generation == generation
+        store.apply("vm-1", "vmware/VirtualMachine", "modify", [("name", "assign", "vm1")], generation)
+    assert store.end_full_sync(generation) == 0
+
+
+def test_sync_inventory(vsphere_server, vcsim_settings):
+    url = vsphere_server
+    store = InventoryStore()
+
+    client = core.Client(host=url)
+    client.connect()
+    stats = client.sync_inventory(store)
+    assert stats["changed"] == store.count()
+    assert store.count(core.ResourceTypes.VIRTUAL_MACHINE) == len(client.get_all_vms())
+
+    cookie = client.session_cookie
+    client.disconnect(logout=False)
+
+    client = core.Client(host=url)
+    client.connect(session_cookie=cookie)
+    stats = client.sync_inventory(store)
+    assert stats["changed"] == 0
+
+    # other resource types: the filter and its view are replaced
+    filter_moref = store.get_meta("filter")
+    stats = client.sync_inventory(store, resource_types=[core.ResourceTypes.VIRTUAL_MACHINE])
+    assert store.get_meta("filter") != filter_moref
+    assert store.count() == store.count(core.ResourceTypes.VIRTUAL_MACHINE)
+    assert stats["removed"] > 0
+    assert [f._moId for f in client.content.propertyCollector.filter] == [store.get_meta("filter")]
+    assert [v._moId for v in client.content.viewManager.viewList] == [store.get_meta("view")]
+
+    client.stop_sync(store)
+    assert not client.content.propertyCollector.filter
+    assert not client.content.viewManager.viewList
+    assert store.version == ""
+    client.disconnect()
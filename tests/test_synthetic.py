@@ -0,0 +1,50 @@
+from pyVmomi import vim
+
+from mce_lib_vsphere.synthetic import InventoryGenerator, resolve_path
+
+PATHS = ["name", "parent", "runtime.host", "config.hardware.numCPU", "guest.net", "customValue"]
+
+
+def test_generator_is_deterministic():
+    first, second = InventoryGenerator(vms=10, seed=1), InventoryGenerator(vms=10, seed=1)
+    assert str(first.vm_properties(3)) == str(second.vm_properties(3))
+    assert str(InventoryGenerator(vms=10, seed=2).vm_properties(3)) != str(first.vm_properties(3))
+
+
+def test_generator_shape():
+    generator = InventoryGenerator(vms=50, hosts=5, nics_per_vm=(2, 3), custom_fields=4, folder_depth=2)
+    folders = [obj for obj, _ in generator.iter_objects([vim.Folder])]
+    assert len(generator.vm_folders) == 4
+    assert len(folders) == 2 + 2 + 4
+    assert len(list(generator.iter_objects([vim.HostSystem]))) == 5
+
+    vms = list(generator.iter_objects([vim.VirtualMachine]))
+    assert len(vms) == 50
+    for vm, props in vms:
+        assert 2 <= len(props["guest"].net) <= 3
+        assert all(value.key in [field.key for field in generator.field_defs] for value in props["customValue"])
+        assert props["parent"] in generator.vm_folders
+    macs = [nic.macAddress for _, props in vms for nic in props["guest"].net]
+    assert len(set(macs)) == len(macs)
+    assert resolve_path(vms[0][1], "config.hardware.numCPU") in (1, 2, 4, 8)
+    assert resolve_path(vms[0][1], "config.unknown.path") is None
+
+
+def test_synthetic_collect_properties():
+    generator = InventoryGenerator(vms=2500, folder_depth=2)
+    client = generator.client(path_set=PATHS, page_size=1000)
+    collected = list(client.collect_properties([vim.VirtualMachine], PATHS, page_size=1000))
+    assert len(collected) == 2500
+    assert len({vm._moId for vm, _ in collected}) == 2500
+
+    vm, props = collected[42]
+    expected = generator.vm_properties(42)[1]
+    assert props["name"] == expected["name"]
+    assert props["runtime.host"] == expected["runtime"].host
+    assert props["config.hardware.numCPU"] == expected["config"].hardware.numCPU
+    assert [nic.macAddress for nic in props["guest.net"]] == [nic.macAddress for nic in expected["guest"].net]
+
+
+def test_synthetic_empty_collection():
+    client = InventoryGenerator(vms=0).client()
+    assert list(client.collect_properties([vim.VirtualMachine], ["name"])) == []
@@ -0,0 +1,100 @@
+import pytest
+from pyVmomi import vim, vmodl
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.exceptions import FatalError, TaskError, TaskCancelledError, TaskTimeoutError
+from mce_lib_vsphere.replay import Cassette
+from mce_lib_vsphere.tasks import task_error
+
+collector = vmodl.query.PropertyCollector
+
+
+def service_content():
+    return vim.ServiceInstanceContent(
+        rootFolder=vim.Folder("group-d1"),
+        propertyCollector=collector("propertyCollector"),
+        viewManager=vim.view.ViewManager("ViewManager"),
+        about=vim.AboutInfo(
+            name="VMware vCenter Server", fullName="VMware vCenter Server 6.5.0", vendor="VMware, Inc.",
+            version="6.5.0", build="5973321", osType="linux-amd64", productLineId="vpx",
+            apiType="VirtualCenter", apiVersion="6.5",
+        ),
+    )
+
+
+def task_update(moref, state, result=None, error=None):
+    changes = [collector.Change(name="info.state", op="assign", val=state)]
+    if result is not None:
+        changes.append(collector.Change(name="info.result", op="assign", val=result))
+    if error is not None:
+        changes.append(collector.Change(name="info.error", op="assign", val=error))
+    return collector.ObjectUpdate(kind="enter", obj=vim.Task(moref), changeSet=changes)
+
+
+def tasks_client(*update_sets):
+    cassette = Cassette()
+    cassette.add("RetrieveServiceContent", service_content())
+    cassette.add("CreatePropertyCollector", collector("session[1]collector"))
+    cassette.add("CreateListView", vim.view.ListView("session[1]view"))
+    cassette.add("CreateFilter", collector.Filter("session[1]filter"))
+    cassette.add("ModifyListView")
+    for objects in update_sets:
+        update_set = None
+        if objects:
+            update_set = collector.UpdateSet(version=str(len(objects)), filterSet=[
+                collector.FilterUpdate(filter=collector.Filter("session[1]filter"), objectSet=objects)
+            ])
+        cassette.add("WaitForUpdatesEx", update_set)
+    cassette.add("DestroyPropertyFilter")
+    cassette.add("DestroyView")
+    cassette.add("DestroyPropertyCollector")
+    return core.Client.from_cassette(cassette), cassette
+
+
+def test_task_error():
+    error = task_error(vim.Task("task-1"), vim.fault.InvalidState(msg="invalid state"))
+    assert isinstance(error, FatalError)
+    assert error.task._moId == "task-1"
+    assert "invalid state" in str(error)
+    assert isinstance(task_error(vim.Task("task-1"), vmodl.fault.RequestCanceled()), TaskCancelledError)
+
+
+def test_wait_for_tasks():
+    vm = vim.VirtualMachine("vm-1")
+    client, cassette = tasks_client(
+        [task_update("task-1", "running")],
+        [task_update("task-2", "success", result=vm)],
+        None,
+        [task_update("task-1", "success")],
+    )
+    tasks = [vim.Task("task-1"), vim.Task("task-2")]
+
+    results = list(client.wait_for_tasks(tasks, timeout=60))
+
+    assert [(task._moId, result) for task, result in results] == [("task-2", vm), ("task-1", None)]
+    assert cassette.positions["WaitForUpdatesEx"] == 4
+    assert cassette.positions["DestroyPropertyFilter"] == 1
+    assert cassette.positions["DestroyPropertyCollector"] == 1
+
+
+def test_wait_for_tasks_error():
+    fault = vim.fault.InvalidPowerState(msg="powered off", existingState="poweredOff")
+    client, cassette = tasks_client([task_update("task-1", "error", error=fault)])
+
+    with pytest.raises(TaskError) as error:
+        list(client.wait_for_tasks([vim.Task("task-1"), vim.Task("task-2")]))
+    assert isinstance(error.value.fault, vim.fault.InvalidPowerState)
+    assert cassette.positions["DestroyView"] == 1
+
+    client, _ = tasks_client([task_update("task-1", "error", error=fault)])
+    (task, result), = client.wait_for_tasks([vim.Task("task-1")], raise_on_error=False)
+    assert isinstance(result, TaskError)
+
+
+def test_wait_for_tasks_timeout():
+    client, cassette = tasks_client(None)
+
+    with pytest.raises(TaskTimeoutError) as error:
+        list(client.wait_for_tasks([vim.Task("task-1")], timeout=0.01))
+    assert [task._moId for task in error.value.tasks] == ["task-1"]
+    assert cassette.positions["DestroyPropertyFilter"] == 1
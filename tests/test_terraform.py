@@ -0,0 +1,87 @@
+import os
+
+from click.testing import CliRunner
+from pyVmomi import vim
+
+from mce_lib_vsphere import cli
+from mce_lib_vsphere.synthetic import InventoryGenerator
+from mce_lib_vsphere.terraform import TerraformExport, TERRAFORM_PATHS, hcl_string, identifier
+
+PATHS = sorted({path for paths in TERRAFORM_PATHS.values() for path in paths})
+
+
+def test_hcl_string():
+    assert hcl_string('vm "1"') == '"vm \\"1\\""'
+    assert hcl_string("${var.name}") == '"$${var.name}"'
+    assert identifier("web 01.lan") == "web_01_lan"
+    assert identifier("01-web") == "_01-web"
+    assert identifier(None) == "unnamed"
+
+
+def test_terraform_export():
+    generator = InventoryGenerator(vms=20, folder_depth=2)
+    client = generator.client(list(TERRAFORM_PATHS), PATHS, page_size=10)
+
+    export = client.terraform_export()
+    config, imports = export.render()
+
+    assert config.count('resource "vsphere_virtual_machine"') == 20
+    assert config.count('resource "vsphere_folder"') == 6
+    assert 'data "vsphere_datacenter" "DC0"' in config
+    assert 'path = "DC0_F0_0/DC0_F1_0"' in config
+    assert "# group-d1/datacenter-10/group-v11/" in config
+    assert 'to = vsphere_virtual_machine.SYN_VM0\n  id = "/DC0/vm/DC0_F0_0/DC0_F1_0/SYN_VM0"' in imports
+    assert imports.count("import {") == 26
+    assert export.skipped == []
+
+
+def test_terraform_devices():
+    datacenter = vim.Datacenter("datacenter-2")
+    vm_folder = vim.Folder("group-v3")
+    pool = vim.ResourcePool("resgroup-8")
+    datastore = vim.Datastore("datastore-5")
+    network = vim.dvs.DistributedVirtualPortgroup("dvportgroup-9")
+    devices = [
+        vim.vm.device.VirtualVmxnet3(
+            key=4000, backing=vim.vm.device.VirtualEthernetCard.DistributedVirtualPortBackingInfo(
+                port=vim.dvs.PortConnection(portgroupKey="dvportgroup-9", switchUuid="uuid"),
+            ),
+        ),
+        vim.vm.device.VirtualDisk(
+            key=2000, unitNumber=0, capacityInKB=20 * 1024 ** 2,
+            backing=vim.vm.device.VirtualDisk.FlatVer2BackingInfo(fileName="[ds] vm/vm.vmdk", thinProvisioned=True),
+        ),
+    ]
+    objects = [
+        (datacenter, {"name": "DC", "parent": vim.Folder("group-d1")}),
+        (vm_folder, {"name": "vm", "parent": datacenter}),
+        (pool, {"name": "Resources", "parent": datacenter}),
+        (datastore, {"name": "DS", "parent": datacenter}),
+        (network, {"name": "PG ${x}", "parent": datacenter}),
+        (vim.VirtualMachine("vm-1"), {
+            "name": "web", "parent": vm_folder, "resourcePool": pool, "datastore": [datastore],
+            "config.hardware.device": devices,
+        }),
+        (vim.VirtualMachine("vm-2"), {"name": "web", "parent": vm_folder, "resourcePool": pool, "datastore": [datastore]}),
+        (vim.VirtualMachine("vm-3"), {"name": "tpl", "parent": vm_folder, "config.template": True}),
+    ]
+
+    export = TerraformExport(objects)
+    config, imports = export.render()
+
+    assert 'resource "vsphere_virtual_machine" "web_vm-2"' in config
+    assert "network_id = data.vsphere_network.PG_x.id" in config
+    assert 'name = "PG $${x}"' in config
+    assert 'adapter_type = "vmxnet3"' in config
+    assert 'label = "disk0"\n    size = 20\n    unit_number = 0\n    thin_provisioned = true' in config
+    assert export.skipped == [("vm-3", "template")]
+
+
+def test_cli_terraform(tmpdir):
+    generator = InventoryGenerator(vms=5)
+    client = generator.client(list(TERRAFORM_PATHS), PATHS)
+
+    result = CliRunner().invoke(cli.main, ["terraform", "--output", str(tmpdir)], obj={"client": client})
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(str(tmpdir))) == ["imports.tf", "inventory.tf"]
+    assert "inventory.tf" in result.stderr
@@ -0,0 +1,73 @@
+import json
+
+from pyVmomi import vim
+
+from mce_lib_vsphere import core
+from mce_lib_vsphere.topology import Topology, reference_paths, reference_morefs
+
+RECORDS = [
+    ("datacenter-2", "vmware/Datacenter", "DC0", {"parent": ["group-d1"], "datastore": ["datastore-1"]}),
+    ("folder-3", "vmware/Folder", "vm", {"parent": ["datacenter-2"]}),
+    ("host-1", "vmware/HostSystem", "DC0_H0", {"parent": ["datacenter-2"], "datastore": ["datastore-1"]}),
+    ("datastore-1", "vmware/Datastore", "LocalDS_0", {"parent": ["datacenter-2"], "host": ["host-1"]}),
+    ("vm-1", "vmware/VirtualMachine", "DC0_H0_VM0", {
+        "parent": ["folder-3"], "host": ["host-1"], "datastore": ["datastore-1"]
+    }),
+    ("vm-2", "vmware/VirtualMachine", "DC0_H0_VM1", {"parent": ["folder-3"], "host": ["host-1"]}),
+]
+
+
+def test_topology_from_records():
+    topology = Topology.from_records(RECORDS)
+
+    assert len(topology) == 7
+    assert "group-d1" in topology
+    assert topology.types[topology.node("group-d1")] is None
+
+    assert topology.neighbors("vm-1") == ["datastore-1", "folder-3", "host-1"]
+    assert topology.neighbors("vm-1", kind="datastore") == ["datastore-1"]
+    assert topology.neighbors("host-1", kind="host", direction="in") == ["datastore-1", "vm-1", "vm-2"]
+
+    assert topology.ancestors("vm-1") == ["folder-3", "datacenter-2", "group-d1"]
+    assert topology.resource_id("vm-1") == "group-d1/datacenter-2/folder-3/vm-1"
+    assert topology.children("folder-3") == ["vm-1", "vm-2"]
+    subtree = topology.subtree("datacenter-2")
+    assert subtree[0] == "datacenter-2"
+    assert sorted(subtree[1:]) == ["datastore-1", "folder-3", "host-1", "vm-1", "vm-2"]
+    assert subtree.index("folder-3") < subtree.index("vm-1")
+
+
+def test_topology_export():
+    topology = Topology.from_records(RECORDS)
+
+    data = json.loads(topology.to_json())
+    assert len(data["nodes"]) == 7
+    assert {"source": "vm-2", "target": "folder-3", "kind": "parent"} in data["edges"]
+
+    graphml = topology.to_graphml()
+    assert '<node id="vm-1">' in graphml
+    assert '<edge source="vm-2" target="host-1"><data key="kind">host</data></edge>' in graphml
+
+
+def test_reference_paths():
+    assert reference_paths(vim.VirtualMachine)["host"] == "runtime.host"
+    assert reference_paths(vim.ClusterComputeResource)["host"] == "host"
+    assert reference_paths(vim.Folder) == {"parent": "parent"}
+
+    mount = vim.Datastore.HostMount(key=vim.HostSystem("host-1"))
+    assert [ref._moId for ref in reference_morefs([mount])] == ["host-1"]
+    assert reference_morefs(None) == []
+
+
+def test_build_topology(vsphere_server, vcsim_settings):
+    url = vsphere_server
+
+    with core.Client(host=url) as client:
+        client.connect()
+        topology = client.build_topology()
+
+        for vm in client.get_all_vms():
+            assert topology.resource_id(vm._moId) == client.resource_id(vm)
+
+        dc = client.get_all_datacenters()[0]
+        assert dc._moId in topology.subtree("group-d1")